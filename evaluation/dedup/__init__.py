@@ -0,0 +1 @@
+from .minhash import shingles, jaccard, lsh_params, MinHasher, LSHIndex, DedupReport, NearDuplicateFinder, deduplicate_orders, DEDUP_SCOPES, DEDUP_POLICIES
\ No newline at end of file
@@ -0,0 +1,215 @@
+import zlib
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+import numpy as np
+
+# Universal hashing modulo a Mersenne prime: a * x + b stays below 2**62, so uint64 never overflows.
+MERSENNE_PRIME = (1 << 31) - 1
+
+DEDUP_SCOPES = ("encounter", "corpus")
+DEDUP_POLICIES = ("collapse", "flag")
+
+
+def shingles(text: str, k: int = 3) -> Set[int]:
+    """Hashed character k-shingles of a whitespace-normalized, lowercased text."""
+    text = " ".join(str(text).lower().split())
+    if len(text) <= k:
+        return {zlib.crc32(text.encode()) & MERSENNE_PRIME} if text else set()
+    return {zlib.crc32(text[i:i + k].encode()) & MERSENNE_PRIME for i in range(len(text) - k + 1)}
+
+
+def jaccard(a: Set[int], b: Set[int]) -> float:
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+
+def lsh_params(num_perm: int, threshold: float) -> Tuple[int, int]:
+    """Bands and rows (bands * rows <= num_perm) whose S-curve midpoint (1/b)^(1/r) is closest to `threshold`."""
+    best = None
+    for rows in range(1, num_perm + 1):
+        bands = num_perm // rows
+        error = abs((1.0 / bands) ** (1.0 / rows) - threshold)
+        if best is None or error < best[0]:
+            best = (error, bands, rows)
+    return best[1], best[2]
+
+
+@dataclass
+class MinHasher:
+    """MinHash signatures of shingle sets with `num_perm` universal hash functions."""
+    num_perm: int = 64
+    seed: int = 1
+
+    def __post_init__(self):
+        rng = np.random.RandomState(self.seed)
+        self.a = rng.randint(1, MERSENNE_PRIME, size=(self.num_perm, 1)).astype(np.uint64)
+        self.b = rng.randint(0, MERSENNE_PRIME, size=(self.num_perm, 1)).astype(np.uint64)
+
+    def signature(self, shingle_set: Set[int]) -> np.ndarray:
+        if not shingle_set:
+            return np.full(self.num_perm, MERSENNE_PRIME, dtype=np.uint64)
+        x = np.fromiter(shingle_set, dtype=np.uint64, count=len(shingle_set))
+        return ((self.a * x + self.b) % MERSENNE_PRIME).min(axis=1)
+
+
+@dataclass
+class LSHIndex:
+    """Banded LSH over MinHash signatures: items sharing any band bucket are candidates."""
+    bands: int
+    rows: int
+    buckets: List[Dict[bytes, List[int]]] = field(default_factory=list)
+
+    def __post_init__(self):
+        self.buckets = [defaultdict(list) for _ in range(self.bands)]
+
+    def insert(self, item: int, signature: np.ndarray) -> Set[int]:
+        """Add an item and return the previously inserted items colliding with it."""
+        candidates = set()
+        for band, buckets in enumerate(self.buckets):
+            key = signature[band * self.rows:(band + 1) * self.rows].tobytes()
+            bucket = buckets[key]
+            candidates.update(bucket)
+            bucket.append(item)
+        return candidates
+
+
+@dataclass
+class DedupReport:
+    """Near-duplicate predicted orders found before pairing."""
+    scope: str = "encounter"
+    policy: str = "collapse"
+    threshold: float = 0.8
+    num_orders: int = 0
+    num_candidates: int = 0
+    num_duplicates: int = 0
+    counts: Dict[str, int] = field(default_factory=dict)
+    duplicates: List[Dict[str, Any]] = field(default_factory=list)
+    max_examples: int = 100
+
+    def add(self, encounter_id: str, position: int, kept: Tuple[str, int], similarity: float, order: Any):
+        self.num_duplicates += 1
+        self.counts[encounter_id] = self.counts.get(encounter_id, 0) + 1
+        if len(self.duplicates) < self.max_examples:
+            self.duplicates.append({
+                "encounter_id": encounter_id,
+                "position": position,
+                "duplicate_of": {"encounter_id": kept[0], "position": kept[1]},
+                "similarity": similarity,
+                "order": order,
+            })
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "scope": self.scope,
+            "policy": self.policy,
+            "threshold": self.threshold,
+            "num_orders": self.num_orders,
+            "num_candidates": self.num_candidates,
+            "num_duplicates": self.num_duplicates,
+            "num_removed": self.num_duplicates if self.policy == "collapse" else 0,
+            "counts": self.counts,
+            "examples": self.duplicates,
+        }
+
+
+@dataclass
+class NearDuplicateFinder:
+    """Find near-duplicate orders with MinHash + LSH banding, without all-pairs comparison.
+
+    Orders are inserted one by one; LSH candidates are verified with the exact Jaccard
+    similarity of their shingle sets, and an order is a duplicate of the first kept order
+    of the same `order_type` reaching `threshold`. With `scope="encounter"` the index is
+    reset for every encounter, with `scope="corpus"` duplicates are searched across
+    encounters. The `collapse` policy drops duplicates, `flag` only reports them; it is the
+    default, and the only policy, across the corpus, where different encounters legitimately
+    share orders.
+    """
+    threshold: float = 0.8
+    num_perm: int = 64
+    shingle_size: int = 3
+    scope: str = "encounter"
+    policy: Optional[str] = None
+    field: str = "description"
+    seed: int = 1
+
+    def __post_init__(self):
+        if self.scope not in DEDUP_SCOPES:
+            raise ValueError(f"Unknown dedup scope '{self.scope}', expected one of {DEDUP_SCOPES}.")
+        if self.policy is not None and self.policy not in DEDUP_POLICIES:
+            raise ValueError(f"Unknown dedup policy '{self.policy}', expected one of {DEDUP_POLICIES}.")
+        if self.policy is None:
+            self.policy = "flag" if self.scope == "corpus" else "collapse"
+        if self.scope == "corpus" and self.policy == "collapse":
+            raise ValueError("Corpus-wide near-duplicates can only be flagged, not collapsed.")
+        self.hasher = MinHasher(num_perm=self.num_perm, seed=self.seed)
+        self.bands, self.rows = lsh_params(self.num_perm, self.threshold)
+
+    def _new_index(self) -> LSHIndex:
+        return LSHIndex(bands=self.bands, rows=self.rows)
+
+    def __call__(
+        self, encounters: Dict[str, Optional[List[Any]]], report: Optional[DedupReport] = None
+    ) -> Dict[str, List[Any]]:
+        if report is None:
+            report = DedupReport()
+        report.scope, report.policy, report.threshold = self.scope, self.policy, self.threshold
+
+        index = self._new_index()
+        # per kept item: (encounter id, position, order type, shingles)
+        kept: List[Tuple[str, int, str, Set[int]]] = []
+        output = {}
+        for encounter_id, orders in encounters.items():
+            if self.scope == "encounter":
+                index, kept = self._new_index(), []
+            output[encounter_id] = orders
+            if not orders:
+                continue
+
+            filtered = []
+            for position, order in enumerate(orders):
+                filtered.append(order)
+                if not isinstance(order, dict) or not order.get(self.field):
+                    continue
+                report.num_orders += 1
+                order_type = str(order.get("order_type") or "").strip().lower()
+                grams = shingles(order[self.field], self.shingle_size)
+                candidates = index.insert(len(kept), self.hasher.signature(grams))
+                report.num_candidates += len(candidates)
+
+                duplicate_of, similarity = None, 0.0
+                for c in sorted(candidates):
+                    c_encounter, c_position, c_type, c_grams = kept[c]
+                    if c_type != order_type or c_grams is None:
+                        continue
+                    similarity = jaccard(grams, c_grams)
+                    if similarity >= self.threshold:
+                        duplicate_of = (c_encounter, c_position)
+                        break
+
+                if duplicate_of is None:
+                    kept.append((encounter_id, position, order_type, grams))
+                    continue
+                # keep the slot so item ids stay aligned with the LSH index
+                kept.append((encounter_id, position, order_type, None))
+                report.add(encounter_id, position, duplicate_of, similarity, order)
+                if self.policy == "collapse":
+                    filtered.pop()
+            output[encounter_id] = filtered
+        return output
+
+
+def deduplicate_orders(
+    encounters: Dict[str, Optional[List[Any]]],
+    threshold: float = 0.8,
+    scope: str = "encounter",
+    policy: Optional[str] = None,
+    **kwargs,
+) -> Tuple[Dict[str, List[Any]], DedupReport]:
+    """Collapse (or flag) near-duplicate orders; returns the orders and a `DedupReport`."""
+    report = DedupReport()
+    finder = NearDuplicateFinder(threshold=threshold, scope=scope, policy=policy, **kwargs)
+    return finder(encounters, report), report
+
@@ -1,111 +1,42 @@
 #!/usr/bin/env python
 import os
 import json
+import time
 import argparse
 import logging
-from typing import List, Dict, Any, Optional, Tuple, Union
+from collections import defaultdict
+from typing import List, Dict, Any, Optional, TextIO, Tuple, Union
 
 import sys
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from order import Order
+from order import OrderTable, VALID_ORDER_TYPES, IngestionReport
 from pairing import PairingMatcher
 from manager import EvaluationManager
 from preprocessing import PreprocessorConfig
 from metrics.dict import MetricDict
+from metrics.confusion import ConfusionMatrix
+from export import ColumnarExporter
+from dedup import DedupReport, NearDuplicateFinder
+from evaluator import Evaluator, flatten_scores, is_multi_reference, split_references
+from sampling import stratify, stratified_sample, bootstrap_intervals
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
 
-VALID_ORDER_TYPES = {"medication", "lab", "followup", "imaging"}
-VALID_ATTRIBUTES = set(Order.__annotations__.keys())
+DEFAULT_SLICES = {
+    "source": {"type": "source"},
+    "order_type": {"type": "field", "field": "order_type"},
+    "encounter_size": {"type": "encounter_size", "buckets": [1, 3, 6]},
+}
 
-def process_order(obj: Dict[str, Any], metadata: Optional[Dict[str, Any]] = None) -> Tuple[Optional[Dict[str, Any]], bool, bool]:
-    """
-    Process and normalize order object.
-
-    Args:
-        obj: The order object to process
-        metadata: Optional metadata to update the order with
-
-    Returns:
-        Tuple containing:
-        - Processed order (or None if it should be skipped)
-        - Boolean indicating if transcript should be skipped (break)
-        - Boolean indicating if this specific order should be skipped (continue)
-    """
-    # Skip if required fields are missing
-    if "description" not in obj or not obj["description"]:
-        return None, False, True
-
-    # Skip if order type is not in our focus set
-    order_type = obj.get("order_type", "").lower()
-    if order_type not in VALID_ORDER_TYPES:
-        return None, False, True
-
-    # Remove all attributes except the ones we care about
-    obj = {k: v for k, v in obj.items() if k in VALID_ATTRIBUTES and v}
-
-    # Add metadata if provided
-    if metadata is not None:
-        obj.update(metadata)
-
-    return obj, False, False
-
-
-def process_multiple_orders(order_list: List[Dict[str, Any]], metadata_list: List[Dict[str, Any]] = None) -> Tuple[List[Dict[str, Any]], bool]:
-    """
-    Core function to process a list of orders with metadata.
-
-    Args:
-        order_list: List of order objects to process
-        metadata_list: List of metadata objects corresponding to each order
-
-    Returns:
-        Tuple containing:
-        - List of processed orders
-        - Boolean indicating if transcript should be skipped
-    """
-    result = []
-    skip_transcript = False
-
-    # If metadata is None, create empty metadata for each order
-    if metadata_list is None:
-        metadata_list = [{}] * len(order_list)
-
-    # Ensure lengths match
-    assert len(order_list) == len(metadata_list), "Orders and metadata must have the same length."
-
-    # Process each order
-    for order, metadata in zip(order_list, metadata_list):
-        order, should_skip_transcript, should_skip_order = process_order(order, metadata)
-        if should_skip_transcript:
-            skip_transcript = True
-            break
-        if should_skip_order:
-            continue
-        if order is not None:
-            result.append(order)
-
-    return result, skip_transcript
-
-
-def parse_orders(order_list, metadata: Optional[Dict[str, Any]] = None) -> Tuple[List[Dict[str, Any]], bool]:
-    """Parse orders."""
-    metadata_list = [metadata or {}] * len(order_list)
-    return process_multiple_orders(order_list, metadata_list)
-
-
-def evaluate(
-    output_dir: str,
-    truth_file: Union[str, None] = None,
-    pred_file: Union[str, None] = None,
+def load_encounters(
+    truth_file: str,
+    pred_file: str,
     dataset: Union[str, None] = None
-):
-    """Evaluation pipeline."""
-
-    # Load from files
+) -> Tuple[Dict[str, List[Dict[str, Any]]], Dict[str, List[Dict[str, Any]]]]:
+    """Load truth and prediction encounters keyed by transcript id."""
     with open(truth_file, 'r') as f:
         truth_encounters = json.load(f)
         if dataset is not None and dataset in truth_encounters:
@@ -118,18 +49,47 @@ def evaluate(
     if set(truth_encounters.keys()) != set(pred_encounters.keys()):
         raise ValueError("Truth and prediction keys do not match.")
 
+    return truth_encounters, pred_encounters
+
+
+def build_evaluation(
+    output_dir: str,
+    slices: Optional[Dict[str, Dict[str, Any]]] = None,
+    tsv_stream: Optional[TextIO] = None,
+    pairing_cost: str = "overlap",
+    normalization_path: str = "",
+    extra_metrics: bool = False
+) -> Tuple[EvaluationManager, PairingMatcher]:
+    """Create the evaluation manager and pairing matcher.
+
+    `extra_metrics` adds RougeL and Rouge2 on description and reason and a ConfusionMatrix
+    on order_type; the default metrics keep the `scores.json` keys of the leaderboard.
+    """
 
     # Create a preprocessor config for both the manager and pairing matcher
-    preprocessor_config = PreprocessorConfig(lowercase=True, remove_punctuation=True)
+    preprocessor_config = PreprocessorConfig(
+        lowercase=True, remove_punctuation=True, normalization_path=normalization_path
+    )
+
+    description_metrics = ["Match", "Strict", "Rouge1"]
+    reason_metrics = ["Rouge1"]
+    order_type_metrics = ["Strict"]
+    if extra_metrics:
+        description_metrics += ["RougeL", "Rouge2"]
+        reason_metrics += ["RougeL", "Rouge2"]
+        order_type_metrics += ["ConfusionMatrix"]
 
     # Initialize the manager with a basic configuration
     # In a real application, you might want to load this from a config file
     manager = EvaluationManager(
         output_directory=output_dir,
         fields={
-            "description": MetricDict(metrics=["Match", "Strict", "Rouge1"]),
-            "reason": MetricDict(metrics=["Rouge1"]),
-            "order_type": MetricDict(metrics=["Strict"]),
+            "description": MetricDict(metrics=description_metrics),
+            "reason": MetricDict(metrics=reason_metrics),
+            "order_type": MetricDict(
+                metrics=order_type_metrics,
+                parameters={"ConfusionMatrix": {"labels": sorted(VALID_ORDER_TYPES)}}
+            ),
             "provenance": MetricDict(metrics=["MultiLabel"]),
         },
         preprocessings={
@@ -145,52 +105,365 @@ def evaluate(
         ),
         encounter_metrics=MetricDict(
             metrics=["Rouge1"],
-        )
+        ),
+        slices=slices
     )
 
     # Initialize the pairing matcher with the preprocessor config
     pairing = PairingMatcher(
         output_directory=output_dir,
         preprocessing_config=preprocessor_config,
-        field="description"  # Use description field for pairing
+        field="description",  # Use description field for pairing
+        tsv_stream=tsv_stream,
+        cost=pairing_cost
+    )
+    return manager, pairing
+
+
+def build_evaluator(
+    truth_encounters: Dict[str, Any],
+    slices: Optional[Dict[str, Dict[str, Any]]] = None,
+    pairing_cost: str = "overlap",
+    normalization_path: str = "",
+    extra_metrics: bool = False
+) -> Evaluator:
+    """In-memory evaluator with the default configuration, reusable across prediction sets."""
+    manager, pairing = build_evaluation(
+        "", slices=slices, pairing_cost=pairing_cost, normalization_path=normalization_path,
+        extra_metrics=extra_metrics
     )
+    return Evaluator(truth_encounters, manager, pairing)
 
-    # Retrieve orders for each dialog, pair them and keep in accumulator.
-    for idx, key in enumerate(truth_encounters):
-        meta = {"transcript_id": key}
-        truth_orders, skip_transcript = parse_orders(truth_encounters[key], meta)
-        if skip_transcript:
-            logger.warning("Skipping this transcript...")
-            continue
-        pred_orders, _ = parse_orders(pred_encounters[key], meta)
 
-        logger.debug(f"********* {idx} *********")
-        logger.debug(f"Pairing 1: {len(truth_orders)} : {truth_orders}")
-        logger.debug(f"Pairing 2: {len(pred_orders)} : {pred_orders}")
-        logger.debug(f"*************************")
+def load_order_tables(
+    truth_encounters: Dict[str, List[Dict[str, Any]]],
+    pred_encounters: Dict[str, List[Dict[str, Any]]],
+    keys: Optional[List[str]] = None,
+    reports: Optional[Dict[str, IngestionReport]] = None
+) -> Tuple[OrderTable, OrderTable]:
+    """Columnar truth and prediction orders, encounters in the same order.
 
-        pairing(truth_orders, pred_orders)
+    Orders are validated and normalized once here; schema errors go to `reports`
+    (keys `truth` and `pred`) when given.
+    """
+    keys = list(truth_encounters) if keys is None else keys
+    reports = reports or {}
+    truth_table = OrderTable.from_encounters(truth_encounters, keys, report=reports.get("truth"))
+    pred_table = OrderTable.from_encounters(pred_encounters, keys, report=reports.get("pred"))
+    return truth_table, pred_table
+
+
+def pair_encounters(
+    pairing: PairingMatcher,
+    truth_encounters: Dict[str, List[Dict[str, Any]]],
+    pred_encounters: Dict[str, List[Dict[str, Any]]],
+    keys: Optional[List[str]] = None,
+    reports: Optional[Dict[str, IngestionReport]] = None
+):
+    """Retrieve orders for each dialog, pair them and keep in accumulator."""
+    truth_table, pred_table = load_order_tables(truth_encounters, pred_encounters, keys, reports)
+    logger.debug(f"Pairing {len(truth_table)} truth orders with {len(pred_table)} predicted orders "
+                 f"over {truth_table.num_encounters} encounters")
+    pairing.pair_tables(truth_table, pred_table)
+
+
+def pair_multi_references(
+    pairing: PairingMatcher,
+    truth_encounters: Dict[str, Any],
+    pred_encounters: Dict[str, List[Dict[str, Any]]],
+    keys: Optional[List[str]] = None,
+    reports: Optional[Dict[str, IngestionReport]] = None
+):
+    """Pair each encounter against the best of its reference lists (see `split_references`)."""
+    keys = list(truth_encounters) if keys is None else keys
+    reports = reports or {}
+    references = split_references({k: truth_encounters[k] for k in keys})
+    truth_tables = [
+        OrderTable.from_encounters(reference, [k for k in keys if k in reference], report=reports.get("truth"))
+        for reference in references
+    ]
+    pred_table = OrderTable.from_encounters(pred_encounters, keys, report=reports.get("pred"))
+    logger.debug(f"Pairing {len(pred_table)} predicted orders against up to {len(truth_tables)} "
+                 f"references over {pred_table.num_encounters} encounters")
+    pairing.pair_references(truth_tables, pred_table)
+
+
+def deduplicate_predictions(
+    pred_encounters: Dict[str, List[Dict[str, Any]]],
+    output_dir: str,
+    scope: str = "encounter",
+    policy: Optional[str] = None,
+    threshold: float = 0.8
+) -> Dict[str, List[Dict[str, Any]]]:
+    """Collapse or flag near-duplicate predicted orders and write dedup_report.json."""
+    report = DedupReport()
+    finder = NearDuplicateFinder(threshold=threshold, scope=scope, policy=policy)
+    pred_encounters = finder(pred_encounters, report)
+    action = "removed" if finder.policy == "collapse" else "flagged"
+    logger.warning(f"dedup ({scope}): {action} {report.num_duplicates}/{report.num_orders} near-duplicate predicted orders")
 
-    pairings = pairing.get_pairings(transpose=True)
-    # Unpack the pairings tuple to match the new manager.process interface
-    references, predictions, indices = pairings
-    metrics = manager.process(references, predictions, indices)
+    if not os.path.exists(output_dir) and output_dir != "":
+        os.makedirs(output_dir, exist_ok=True)
+    with open(os.path.join(output_dir, "dedup_report.json"), "w") as f:
+        json.dump(report.to_dict(), f, indent=4)
+    return pred_encounters
+
+
+def log_ingestion_reports(reports: Dict[str, IngestionReport]):
+    """Log the schema errors found at ingestion."""
+    for name, report in reports.items():
+        if report.counts:
+            logger.warning(f"{name}: kept {report.num_kept}/{report.num_orders} orders, schema errors: {dict(report.counts)}")
 
-    print(json.dumps(metrics, indent=4))
 
-    reformatted_metrics = {}
-    for K, V in metrics.items():
-        for k, v in V.items():
-            reformatted_metrics[K + "_" + k] = v
+def write_ingestion_reports(reports: Dict[str, IngestionReport], output_dir: str):
+    """Write the ingestion reports to the output directory."""
+    if not os.path.exists(output_dir) and output_dir != "":
+        os.makedirs(output_dir, exist_ok=True)
+
+    with open(os.path.join(output_dir, "ingestion_report.json"), "w") as f:
+        json.dump({name: report.to_dict() for name, report in reports.items()}, f, indent=4)
+
+
+def write_scores(metrics: Dict[str, Any], output_dir: str, filename: str = "scores.json"):
+    """Flatten metrics as `field_metric` keys and write them to the output directory.
+
+    Slice metrics, if any, are written next to it in `slice_scores.json`.
+    """
+    reformatted_metrics = flatten_scores(metrics)
 
     if not os.path.exists(output_dir) and output_dir != "":
         os.makedirs(output_dir, exist_ok=True)
 
-    with open(os.path.join(output_dir, "scores.json"), "w") as f:
+    with open(os.path.join(output_dir, filename), "w") as f:
         json.dump(reformatted_metrics, f, indent=4)
 
+    if metrics.get("slices"):
+        with open(os.path.join(output_dir, "slice_scores.json"), "w") as f:
+            json.dump(metrics["slices"], f, indent=4)
+
+
+def write_best_references(best_references: Dict[str, int], output_dir: str):
+    """Write the index of the reference set each encounter was paired with to `best_references.json`."""
+    if not os.path.exists(output_dir) and output_dir != "":
+        os.makedirs(output_dir, exist_ok=True)
+
+    with open(os.path.join(output_dir, "best_references.json"), "w") as f:
+        json.dump(best_references, f, indent=4)
+
+
+def write_confusion_matrices(manager: EvaluationManager, output_dir: str):
+    """Write the confusion matrices of the evaluated fields to `confusion_matrices.json`."""
+    matrices = {
+        f"{k}/{metric.name}": metric.to_dict()
+        for k, m in manager.fields.items()
+        for metric in m.metrics
+        # Metric.__subclasshook__ makes every metric an instance of ConfusionMatrix.
+        if type(metric) is ConfusionMatrix
+    }
+    if not matrices:
+        return
+
+    if not os.path.exists(output_dir) and output_dir != "":
+        os.makedirs(output_dir, exist_ok=True)
+    with open(os.path.join(output_dir, "confusion_matrices.json"), "w") as f:
+        json.dump(matrices, f, indent=4)
+
+
+def sweep_thresholds(
+    manager: EvaluationManager,
+    pairing: PairingMatcher,
+    thresholds: List[float],
+    output_dir: str
+) -> List[Dict[str, Any]]:
+    """Metric curve over minimum pairing scores, reusing the assignments already computed.
+
+    Written to `threshold_sweep.json` as one entry per threshold with `scores.json` keys.
+    """
+    accumulator = pairing.get_pairings_accumulator()
+    curve = manager.sweep(
+        [p["ref"] for p in accumulator],
+        [p["hyp"] for p in accumulator],
+        [p["index"] for p in accumulator],
+        [p["score"] for p in accumulator],
+        thresholds
+    )
+    curve = [
+        {"threshold": c["threshold"], "num_pairs": c["num_pairs"], **flatten_scores(c["metrics"])}
+        for c in curve
+    ]
+
+    if not os.path.exists(output_dir) and output_dir != "":
+        os.makedirs(output_dir, exist_ok=True)
+    with open(os.path.join(output_dir, "threshold_sweep.json"), "w") as f:
+        json.dump(curve, f, indent=4)
+    return curve
+
+
+def evaluate_sample(
+    output_dir: str,
+    truth_encounters: Dict[str, List[Dict[str, Any]]],
+    pred_encounters: Dict[str, List[Dict[str, Any]]],
+    sample: float,
+    seed: Optional[int] = None,
+    n_boot: int = 200,
+    confidence: float = 0.95,
+    pairing_cost: str = "overlap",
+    normalization_path: str = "",
+    extra_metrics: bool = False
+) -> Dict[str, Any]:
+    """Approximate evaluation on a stratified sample of encounters.
+
+    Encounters are stratified by source prefix and order-type mix and allocated
+    proportionally, so the sample is self-weighting. Metrics are reported as point estimates
+    with bootstrap confidence bounds, along with the projected time of a full evaluation run.
+    """
+    population_size = len(truth_encounters)
+    size = int(round(sample * population_size)) if sample <= 1 else int(sample)
+    multi_reference = any(is_multi_reference(v) for v in truth_encounters.values())
+    # Multi-reference encounters are stratified on their first reference.
+    strata = stratify(split_references(truth_encounters)[0] if multi_reference else truth_encounters)
+    sampled = stratified_sample(strata, max(size, 1), seed=seed)
+    keys = [k for stratum in sampled.values() for k in stratum]
+
+    manager, pairing = build_evaluation(
+        output_dir, pairing_cost=pairing_cost, normalization_path=normalization_path,
+        extra_metrics=extra_metrics
+    )
+
+    # Time a regular pass over the sample to project the full run.
+    start = time.perf_counter()
+    pair_fn = pair_multi_references if multi_reference else pair_encounters
+    pair_fn(pairing, truth_encounters, pred_encounters, keys)
+    references, predictions, indices = pairing.get_pairings(transpose=True)
+    manager.process(references, predictions, indices)
+    elapsed = time.perf_counter() - start
+
+    # Keep pairs per encounter so bootstrap replicates only re-run the metrics.
+    encounter_pairs = defaultdict(list)
+    for p in pairing.get_pairings_accumulator():
+        encounter_pairs[p["ref"]["transcript_id"] if p["ref"] else p["hyp"]["transcript_id"]].append(p)
+
+    def score(encounter_keys: List[str]) -> Dict[str, Any]:
+        refs, preds, idxs = [], [], []
+        for i, key in enumerate(encounter_keys):
+            for p in encounter_pairs.get(key, []):
+                refs.append(p["ref"])
+                preds.append(p["hyp"])
+                idxs.append(i)
+        return manager.process(refs, preds, idxs)
+
+    metrics = bootstrap_intervals(
+        score, sampled, n_boot=n_boot, confidence=confidence, seed=seed
+    )
+
+    output = {
+        "sample": {
+            "num_encounters": len(keys),
+            "population": population_size,
+            "strata": {s: len(v) for s, v in sampled.items()},
+            "confidence": confidence,
+            "bootstrap": n_boot,
+            "elapsed_seconds": elapsed,
+            "projected_full_seconds": elapsed / max(len(keys), 1) * population_size,
+        },
+        "metrics": metrics,
+    }
+
+    if not os.path.exists(output_dir) and output_dir != "":
+        os.makedirs(output_dir, exist_ok=True)
+
+    with open(os.path.join(output_dir, "sample_scores.json"), "w") as f:
+        json.dump(output, f, indent=4)
+
+    return output
+
+
+def evaluate(
+    output_dir: str,
+    truth_file: Union[str, None] = None,
+    pred_file: Union[str, None] = None,
+    dataset: Union[str, None] = None,
+    sample: Union[float, None] = None,
+    seed: Union[int, None] = None,
+    n_boot: int = 200,
+    confidence: float = 0.95,
+    export: bool = False,
+    pairing_cost: str = "overlap",
+    normalization_path: str = "",
+    dedup: Union[str, None] = None,
+    dedup_policy: Optional[str] = None,
+    dedup_threshold: float = 0.8,
+    thresholds: Union[List[float], None] = None,
+    extra_metrics: bool = False,
+    slices: bool = False
+):
+    """Evaluation pipeline."""
+    if sample is not None and (export or thresholds or slices):
+        raise ValueError("Sample evaluation does not support export, threshold sweeps or slices.")
+
+    # Load from files
+    truth_encounters, pred_encounters = load_encounters(truth_file, pred_file, dataset)
+
+    if dedup is not None:
+        pred_encounters = deduplicate_predictions(
+            pred_encounters, output_dir, scope=dedup, policy=dedup_policy, threshold=dedup_threshold
+        )
+
+    if sample is not None:
+        output = evaluate_sample(
+            output_dir, truth_encounters, pred_encounters, sample,
+            seed=seed, n_boot=n_boot, confidence=confidence, pairing_cost=pairing_cost,
+            normalization_path=normalization_path, extra_metrics=extra_metrics
+        )
+        print(json.dumps(output, indent=4))
+        return
+
+    reports = {"truth": IngestionReport(), "pred": IngestionReport()}
+    # With several reference lists per encounter, pairs come from the best-matching one.
+    multi_reference = any(is_multi_reference(v) for v in truth_encounters.values())
+    pair_fn = pair_multi_references if multi_reference else pair_encounters
+    if export and output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+        # Pairings are streamed to the TSV file as encounters are paired.
+        with open(os.path.join(output_dir, "pairings.tsv"), "w", newline="") as tsv_stream:
+            manager, pairing = build_evaluation(
+                output_dir, slices=DEFAULT_SLICES if slices else None, tsv_stream=tsv_stream,
+                pairing_cost=pairing_cost, normalization_path=normalization_path, extra_metrics=extra_metrics
+            )
+            pair_fn(pairing, truth_encounters, pred_encounters, reports=reports)
+    else:
+        manager, pairing = build_evaluation(
+            output_dir, slices=DEFAULT_SLICES if slices else None, pairing_cost=pairing_cost, normalization_path=normalization_path,
+            extra_metrics=extra_metrics
+        )
+        pair_fn(pairing, truth_encounters, pred_encounters, reports=reports)
+    log_ingestion_reports(reports)
+    if export:
+        write_ingestion_reports(reports, output_dir)
+    if multi_reference:
+        write_best_references(pairing.best_references, output_dir)
+
+    pairings = pairing.get_pairings(transpose=True)
+    # Unpack the pairings tuple to match the new manager.process interface
+    references, predictions, indices = pairings
+    exporter = None
+    if export and output_dir:
+        # Columnar export of every pair and encounter, written as encounters are processed.
+        exporter = ColumnarExporter(
+            os.path.join(output_dir, "results"), pairing.get_pairings_accumulator(), list(truth_encounters)
+        )
+    metrics = manager.process(references, predictions, indices, exporter=exporter)
+
+    print(json.dumps(metrics, indent=4))
+
+    write_scores(metrics, output_dir)
+    write_confusion_matrices(manager, output_dir)
+
+    if thresholds:
+        sweep_thresholds(manager, pairing, thresholds, output_dir)
+
     # If output_dir empty string, no export. Else, ...
-    # pairing.export(filename) # export pairings with match scores
     # manager.export(filename) # export metrics for each field
 
 
@@ -201,8 +474,25 @@ if __name__ == "__main__":
     parser.add_argument("-p", "--pred", type=str, help="Prediction file")
     parser.add_argument("-o", "--output", type=str, default="test", help="Output directory path, default no output export")
     parser.add_argument("--debug", action="store_true", help="Set logging level to debug.")
+    parser.add_argument("--export", action="store_true", help="Export pairings.tsv and per-pair/per-encounter results as memory-mappable columns in <output>/results.")
+    parser.add_argument("--pairing-cost", type=str, default="overlap", choices=["overlap", "tfidf"], help="Similarity used to pair orders: word overlap or char n-gram TF-IDF cosine.")
+    parser.add_argument("--normalization", type=str, default="", help="Abbreviation/unit normalization dictionary (TSV or JSON) applied before pairing and scoring, e.g. preprocessing/medical_normalization.tsv.")
+    parser.add_argument("--dedup", type=str, default=None, choices=["encounter", "corpus"], help="Find near-duplicate predicted orders (MinHash-LSH) within each encounter or across the corpus before pairing.")
+    parser.add_argument("--dedup-policy", type=str, default=None, choices=["collapse", "flag"], help="Drop near-duplicates (collapse, default within encounters) or only report them (flag, default and only policy across the corpus) in dedup_report.json.")
+    parser.add_argument("--dedup-threshold", type=float, default=0.8, help="Character-shingle Jaccard similarity above which two orders are near-duplicates.")
+    parser.add_argument("--sweep", type=str, default=None, help="Comma-separated minimum pairing scores, e.g. 0,0.25,0.5,0.75,1; writes the metric curve to threshold_sweep.json.")
+    parser.add_argument("--extra-metrics", action="store_true", help="Also compute RougeL and Rouge2 on description and reason and the order_type confusion matrix (adds keys to scores.json and writes confusion_matrices.json).")
+    parser.add_argument("--slices", action="store_true", help="Also break metrics down by source, order type and encounter size in slice_scores.json.")
+    parser.add_argument("--sample", type=float, default=None, help="Evaluate a stratified sample of encounters: a fraction if <= 1, else a count.")
+    parser.add_argument("--seed", type=int, default=None, help="Random seed for sampling and bootstrap.")
+    parser.add_argument("--bootstrap", type=int, default=200, help="Number of bootstrap replicates for sample confidence bounds.")
+    parser.add_argument("--confidence", type=float, default=0.95, help="Confidence level of the sample bounds.")
 
     args = parser.parse_args()
+    if args.sample is not None and (args.export or args.sweep or args.slices):
+        parser.error("--sample cannot be combined with --export, --sweep or --slices")
+    if args.dedup == "corpus" and args.dedup_policy == "collapse":
+        parser.error("--dedup corpus only flags near-duplicates, it cannot be combined with --dedup-policy collapse")
 
     # Set logging level to debug if debug flag is set
     if args.debug:
@@ -212,5 +502,18 @@ if __name__ == "__main__":
         args.output,
         truth_file=args.truth,
         pred_file=args.pred,
-        dataset=args.dataset
+        dataset=args.dataset,
+        sample=args.sample,
+        seed=args.seed,
+        n_boot=args.bootstrap,
+        confidence=args.confidence,
+        export=args.export,
+        pairing_cost=args.pairing_cost,
+        normalization_path=args.normalization,
+        dedup=args.dedup,
+        dedup_policy=args.dedup_policy,
+        dedup_threshold=args.dedup_threshold,
+        thresholds=[float(t) for t in args.sweep.split(",")] if args.sweep else None,
+        extra_metrics=args.extra_metrics,
+        slices=args.slices
     )
@@ -0,0 +1 @@
+from .evaluator import Evaluator, EvaluationResult, flatten_scores, is_multi_reference, split_references
\ No newline at end of file
@@ -0,0 +1,121 @@
+import copy
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from order import OrderTable, IngestionReport
+from pairing import PairingMatcher
+from manager import EvaluationManager
+
+
+def flatten_scores(metrics: Dict[str, Any]) -> Dict[str, float]:
+    """Metrics as `field_metric` keys, without the slice metrics."""
+    reformatted_metrics = {}
+    for K, V in metrics.items():
+        if K == "slices":
+            continue
+        for k, v in V.items():
+            reformatted_metrics[K + "_" + k] = v
+    return reformatted_metrics
+
+
+def is_multi_reference(orders: Any) -> bool:
+    """Whether the truth of an encounter is a list of reference lists."""
+    return bool(orders) and all(isinstance(o, list) for o in orders)
+
+
+def split_references(truth_encounters: Dict[str, Any]) -> List[Dict[str, List[Dict[str, Any]]]]:
+    """Split multi-reference truth into K `{encounter_id: orders}` dicts.
+
+    The k-th dict holds the k-th reference list of the encounters having one, so every
+    encounter is in the first dict; single-reference encounters only appear there.
+    """
+    references = []
+    for key, orders in truth_encounters.items():
+        for k, reference in enumerate(orders if is_multi_reference(orders) else [orders]):
+            if k == len(references):
+                references.append({})
+            references[k][key] = reference
+    return references
+
+
+@dataclass
+class EvaluationResult:
+    """Output of `Evaluator.score`."""
+    metrics: Dict[str, Any]
+    ingestion: IngestionReport
+    best_references: Dict[str, int] = field(default_factory=dict)
+
+    @property
+    def scores(self) -> Dict[str, float]:
+        """Flat `field_metric` scores, as in `scores.json`."""
+        return flatten_scores(self.metrics)
+
+    @property
+    def slices(self) -> Dict[str, float]:
+        return self.metrics.get("slices", {})
+
+
+class Evaluator:
+    """Reusable evaluation over a fixed truth set, for scoring many prediction sets in memory.
+
+    The manager and pairing matcher are built once, and the truth orders are ingested into
+    order tables with their pairing field preprocessed once. `score` only ingests and
+    pairs the predictions and computes the metrics: it does not read or write files and
+    does not print.
+    """
+
+    def __init__(
+        self,
+        truth_encounters: Dict[str, Any],
+        manager: EvaluationManager,
+        pairing: PairingMatcher
+    ):
+        self.manager = manager
+        self.pairing = pairing
+        self.keys = list(truth_encounters)
+        self.truth_report = IngestionReport()
+        self.multi_reference = any(is_multi_reference(v) for v in truth_encounters.values())
+        if self.multi_reference:
+            self.truth_tables = [
+                OrderTable.from_encounters(reference, [k for k in self.keys if k in reference], report=self.truth_report)
+                for reference in split_references(truth_encounters)
+            ]
+            self.truth_values = None
+        else:
+            self.truth_tables = [OrderTable.from_encounters(truth_encounters, self.keys, report=self.truth_report)]
+            self.truth_values = pairing.prepare_column(self.truth_tables[0])
+
+    @classmethod
+    def from_dict(cls, config: Dict[str, Any], truth_encounters: Dict[str, Any]) -> "Evaluator":
+        """Build from an `EvaluationManager.from_dict` config, with an optional `pairing`
+        entry holding `PairingMatcher` options (`field`, `cost`)."""
+        config = copy.deepcopy(config)
+        pairing_config = config.pop("pairing", {})
+        manager = EvaluationManager.from_dict(config, "")
+        pairing = PairingMatcher(
+            output_directory="",
+            preprocessing_config=manager.preprocessor_config,
+            **pairing_config
+        )
+        return cls(truth_encounters, manager, pairing)
+
+    def score(self, predictions: Dict[str, Optional[List[Dict[str, Any]]]]) -> EvaluationResult:
+        """Pair and score a `{encounter_id: [order, ...]}` prediction set against the truth."""
+        missing = [k for k in self.keys if k not in predictions]
+        if missing or len(predictions) != len(self.keys):
+            raise ValueError("Truth and prediction keys do not match.")
+
+        report = IngestionReport()
+        pred_table = OrderTable.from_encounters(predictions, self.keys, report=report)
+        self.pairing.reset()
+        if self.multi_reference:
+            self.pairing.pair_references(self.truth_tables, pred_table)
+        else:
+            self.pairing.pair_tables(self.truth_tables[0], pred_table, ref_values=self.truth_values)
+
+        references, predictions, indices = self.pairing.get_pairings(transpose=True)
+        metrics = self.manager.process(references, predictions, indices)
+        return EvaluationResult(metrics=metrics, ingestion=report, best_references=dict(self.pairing.best_references))
+
+    def __call__(self, predictions: Dict[str, Optional[List[Dict[str, Any]]]]) -> EvaluationResult:
+        return self.score(predictions)
@@ -0,0 +1 @@
+from .columnar import ColumnarTable, ColumnarExporter, StringColumn, read_table
\ No newline at end of file
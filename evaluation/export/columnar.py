@@ -0,0 +1,214 @@
+import os
+import json
+from typing import Any, Dict, List, Optional, Union
+
+import numpy as np
+
+SCHEMA_FILENAME = "schema.json"
+STRING = "str"
+
+
+def _infer_dtype(value: Any) -> str:
+    if isinstance(value, str):
+        return STRING
+    if isinstance(value, (bool, np.bool_)):
+        return "|u1"
+    if isinstance(value, (int, np.integer)):
+        return "<i4"
+    return "<f4"
+
+
+class StringColumn:
+    """Memory-mapped variable-length UTF-8 strings stored as offsets and data."""
+
+    def __init__(self, offsets: np.ndarray, data: np.ndarray):
+        self.offsets = offsets
+        self.data = data
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i: int) -> str:
+        return bytes(self.data[self.offsets[i]:self.offsets[i + 1]]).decode("utf-8")
+
+
+class ColumnarTable:
+    """Append-only struct-of-arrays table, one raw little-endian file per column.
+
+    Rows are buffered and appended to the column files on `flush`, so the table is written
+    incrementally. The schema (dtype and file of each column, number of rows) is rewritten
+    on every flush and columns can be memory-mapped with `read_table`.
+    Numeric columns are stored as int32/float32 unless a dtype is given.
+    """
+
+    def __init__(self, directory: str, dtypes: Optional[Dict[str, str]] = None):
+        self.directory = directory
+        self.dtypes = dict(dtypes or {})
+        self.columns: List[str] = []
+        self.buffer: Dict[str, List[Any]] = {}
+        self.num_rows = 0
+        self.string_sizes: Dict[str, int] = {}
+        os.makedirs(directory, exist_ok=True)
+
+    def _filename(self, column: str) -> str:
+        return column.replace("/", "__")
+
+    def _init_columns(self, row: Dict[str, Any]):
+        self.columns = list(row.keys())
+        for column in self.columns:
+            self.dtypes.setdefault(column, _infer_dtype(row[column]))
+            self.buffer[column] = []
+            filename = self._filename(column)
+            if self.dtypes[column] == STRING:
+                self.string_sizes[column] = 0
+                np.zeros(1, dtype="<i8").tofile(os.path.join(self.directory, filename + ".offsets"))
+                open(os.path.join(self.directory, filename + ".data"), "wb").close()
+            else:
+                open(os.path.join(self.directory, filename + ".bin"), "wb").close()
+
+    def append(self, row: Dict[str, Any]):
+        if not self.columns:
+            self._init_columns(row)
+        for column in self.columns:
+            self.buffer[column].append(row.get(column))
+
+    def __len__(self) -> int:
+        return self.num_rows + (len(self.buffer[self.columns[0]]) if self.columns else 0)
+
+    def flush(self):
+        if not self.columns or not self.buffer[self.columns[0]]:
+            return
+        for column in self.columns:
+            values = self.buffer[column]
+            filename = os.path.join(self.directory, self._filename(column))
+            if self.dtypes[column] == STRING:
+                encoded = [("" if v is None else str(v)).encode("utf-8") for v in values]
+                offsets = self.string_sizes[column] + np.cumsum([len(e) for e in encoded], dtype="<i8")
+                with open(filename + ".data", "ab") as fp:
+                    fp.write(b"".join(encoded))
+                with open(filename + ".offsets", "ab") as fp:
+                    offsets.tofile(fp)
+                self.string_sizes[column] = int(offsets[-1])
+            else:
+                with open(filename + ".bin", "ab") as fp:
+                    np.asarray(values, dtype=self.dtypes[column]).tofile(fp)
+            self.buffer[column] = []
+        self.num_rows += len(values)
+        self._write_schema()
+
+    def _write_schema(self):
+        schema = {
+            "num_rows": self.num_rows,
+            "columns": {c: {"dtype": self.dtypes[c], "file": self._filename(c)} for c in self.columns},
+        }
+        with open(os.path.join(self.directory, SCHEMA_FILENAME), "w") as fp:
+            json.dump(schema, fp, indent=4)
+
+
+def read_table(directory: str) -> Dict[str, Union[np.ndarray, StringColumn]]:
+    """Memory-map the columns of a table written by `ColumnarTable`."""
+    with open(os.path.join(directory, SCHEMA_FILENAME), "r") as fp:
+        schema = json.load(fp)
+
+    num_rows = schema["num_rows"]
+    output = {}
+    for column, info in schema["columns"].items():
+        path = os.path.join(directory, info["file"])
+        if info["dtype"] == STRING:
+            offsets = np.memmap(path + ".offsets", dtype="<i8", mode="r", shape=(num_rows + 1,))
+            size = int(offsets[-1])
+            data = np.memmap(path + ".data", dtype="u1", mode="r", shape=(size,)) if size else np.zeros(0, dtype="u1")
+            output[column] = StringColumn(offsets, data)
+        elif num_rows:
+            output[column] = np.memmap(path + ".bin", dtype=info["dtype"], mode="r", shape=(num_rows,))
+        else:
+            output[column] = np.zeros(0, dtype=info["dtype"])
+    return output
+
+
+class ColumnarExporter:
+    """Export of every pair and every encounter as two columnar tables.
+
+    The `pairs` table holds the encounter row, the ref/hyp positions in the encounter order
+    lists (-1 when unpaired), the pairing score and the per-pair contribution to every metric
+    accumulator (`field/metric/attribute`). The `encounters` table has one row per id of
+    `encounter_ids`, in that order, with its order counts, including encounters without
+    orders on either side. Rows are flushed every `buffer_rows` pairs, at encounter boundaries.
+
+    The export is a post-pass: `EvaluationManager.process` feeds it while scoring the pairings
+    of a finished pairing run, so the tables are written incrementally but the pairs they
+    describe are all in memory already.
+    """
+
+    PAIR_DTYPES = {"encounter": "<i4", "ref_index": "<i4", "hyp_index": "<i4", "score": "<f4"}
+    ENCOUNTER_DTYPES = {"num_refs": "<i4", "num_hyps": "<i4", "num_paired": "<i4", "score_sum": "<f4"}
+
+    def __init__(
+        self,
+        directory: str,
+        pairings_accumulator: List[Dict[str, Any]],
+        encounter_ids: List[str],
+        buffer_rows: int = 4096
+    ):
+        self.pairings_accumulator = pairings_accumulator
+        self.encounter_ids = list(encounter_ids)
+        self.buffer_rows = buffer_rows
+        self.pairs = ColumnarTable(os.path.join(directory, "pairs"), dtypes=self.PAIR_DTYPES)
+        self.encounters = ColumnarTable(os.path.join(directory, "encounters"), dtypes=self.ENCOUNTER_DTYPES)
+        self._reset_encounter()
+
+    def _reset_encounter(self):
+        self.encounter = None
+        self.num_refs = self.num_hyps = self.num_paired = 0
+        self.score_sum = 0.0
+
+    def _append_encounter(self, encounter: int, num_refs: int = 0, num_hyps: int = 0, num_paired: int = 0, score_sum: float = 0.0):
+        self.encounters.append({
+            "encounter_id": str(self.encounter_ids[encounter]),
+            "num_refs": num_refs,
+            "num_hyps": num_hyps,
+            "num_paired": num_paired,
+            "score_sum": score_sum,
+        })
+
+    def _fill_encounters(self, end: int):
+        # Encounters without pairs (no orders on either side) still get their row.
+        while len(self.encounters) < end:
+            self._append_encounter(len(self.encounters))
+
+    def add_pair(self, position: int, contributions: Dict[str, float]):
+        p = self.pairings_accumulator[position]
+        if self.encounter is None:
+            # Pairing indices count encounters from 1, in the order of `encounter_ids`.
+            self.encounter = p["index"] - 1
+        self.num_refs += p["ref"] is not None
+        self.num_hyps += p["hyp"] is not None
+        self.num_paired += p["ref"] is not None and p["hyp"] is not None
+        self.score_sum += p["score"]
+
+        row = {
+            "encounter": self.encounter,
+            "ref_index": -1 if p.get("ref_index") is None else p["ref_index"],
+            "hyp_index": -1 if p.get("hyp_index") is None else p["hyp_index"],
+            "score": float(p["score"]),
+        }
+        row.update({k: float(v) for k, v in contributions.items()})
+        self.pairs.append(row)
+
+    def end_encounter(self):
+        if self.encounter is None:
+            return
+        self._fill_encounters(self.encounter)
+        self._append_encounter(self.encounter, self.num_refs, self.num_hyps, self.num_paired, self.score_sum)
+        self._reset_encounter()
+        if len(self.pairs) - self.pairs.num_rows >= self.buffer_rows:
+            self.flush()
+
+    def flush(self):
+        self.pairs.flush()
+        self.encounters.flush()
+
+    def close(self):
+        self.end_encounter()
+        self._fill_encounters(len(self.encounter_ids))
+        self.flush()
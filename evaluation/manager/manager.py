@@ -1,12 +1,16 @@
 import os
+import copy
 import json
 from datetime import datetime
+from collections import defaultdict
 from dataclasses import dataclass
-from typing import Dict, List, Generator, Union
+from typing import Any, Dict, List, Generator, Tuple, Union
 
 from preprocessing import PreprocessorConfig, Preprocessor
 from metrics.dict import MetricDict
 from utils.slice import slice_gen
+from manager.slicing import SliceDefinition
+from export import ColumnarExporter
 
 
 @dataclass
@@ -19,6 +23,7 @@ class EvaluationManager:
     latest_output: Union[Dict[str, Dict[str, float]], None] = None
     orders_metrics: MetricDict = None
     encounter_metrics: MetricDict = None  
+    slices: Union[Dict[str, SliceDefinition], None] = None
 
     def __post_init__(self):
         if self.preprocessor_config_path:
@@ -33,6 +38,13 @@ class EvaluationManager:
         if self.preprocessor and self.preprocessings["encounter_level_metrics"]:
             self.encounter_metrics.processor = self.preprocessor
 
+        self.slices = {
+            name: s if isinstance(s, SliceDefinition) else SliceDefinition.from_dict(name, s)
+            for name, s in (self.slices or {}).items()
+        }
+        # One copy of each field's metrics per slice group, created on first use.
+        self.slice_metrics: Dict[Tuple[str, str], MetricDict] = {}
+
     def _prepare_from_dicts(self, items: List[Dict[str, any]], field: str) -> Generator:
         if self.preprocessor and self.preprocessings.get(field):
             out_gen = slice_gen(items, field, self.preprocessor)
@@ -40,19 +52,173 @@ class EvaluationManager:
             out_gen = slice_gen(items, field)
         return out_gen
 
-    def process(self, references: List[Dict[str, any]], predictions: List[Dict[str, any]], indices: List[int]) -> Dict[str, Dict[str, float]]:
+    def reset(self):
+        for m in self.fields.values():
+            m.reset()
+        self.orders_metrics.reset()
+        self.encounter_metrics.reset()
+        self.slice_metrics = {}
+
+    def _slice_metric(self, group: str, field: str, base: MetricDict) -> MetricDict:
+        key = (group, field)
+        if key not in self.slice_metrics:
+            self.slice_metrics[key] = base.clone(name=f"{group}_{field}".replace("/", "_"))
+        return self.slice_metrics[key]
+
+    def _slice_groups(self, references: List[Dict[str, any]], predictions: List[Dict[str, any]], indices: List[int]) -> List[List[str]]:
+        """Group labels (`slice=key`) of every pair, one per slice definition."""
+        groups = [[] for _ in references]
+        for name, definition in self.slices.items():
+            for pair_groups, key in zip(groups, definition.keys(references, predictions, indices)):
+                pair_groups.append(f"{name}={key}")
+        return groups
+
+    def process(
+        self,
+        references: List[Dict[str, any]],
+        predictions: List[Dict[str, any]],
+        indices: List[int],
+        exporter: Union[ColumnarExporter, None] = None
+    ) -> Dict[str, Dict[str, float]]:
+        # Metrics accumulate, start from a clean state so process can be called repeatedly.
+        self.reset()
         output = {}
-        for k, m in self.fields.items():
-            refs = self._prepare_from_dicts(references, k)
-            preds = self._prepare_from_dicts(predictions, k)
-            output[k] = m.compute_all(refs, preds)
+        groups = self._slice_groups(references, predictions, indices)
+        prepared = {
+            k: (list(self._prepare_from_dicts(references, k)), list(self._prepare_from_dicts(predictions, k)))
+            for k in self.fields
+        }
+
+        # Single pass over the pairs: each pair updates the overall metrics and those of its slices.
+        # Pairs of an encounter are contiguous, so the exporter receives them encounter by encounter.
+        previous_index = None
+        for i, (reference, prediction, index, pair_groups) in enumerate(zip(references, predictions, indices, groups)):
+            if exporter is not None and previous_index is not None and index != previous_index:
+                exporter.end_encounter()
+            previous_index = index
 
-        # Order level metrics
-        output["order_level_metrics"] = self.orders_metrics.compute_all(references, predictions, preprocessor=self.preprocessor)
+            contributions = {}
+            for k, m in self.fields.items():
+                ref, pred = prepared[k][0][i], prepared[k][1][i]
+                before = m.state() if exporter is not None else None
+                m.update(ref, pred)
+                if exporter is not None:
+                    contributions.update({f"{k}/{n}": v - before[n] for n, v in m.state().items()})
+                for group in pair_groups:
+                    self._slice_metric(group, k, m).update(ref, pred)
+
+            # Order level metrics
+            before = self.orders_metrics.state() if exporter is not None else None
+            self.orders_metrics.update(reference, prediction, preprocessor=self.preprocessor)
+            if exporter is not None:
+                contributions.update({f"order_level_metrics/{n}": v - before[n] for n, v in self.orders_metrics.state().items()})
+                exporter.add_pair(i, contributions)
+            for group in pair_groups:
+                self._slice_metric(group, "order_level_metrics", self.orders_metrics).update(reference, prediction, preprocessor=self.preprocessor)
+
+        if exporter is not None:
+            exporter.close()
+
+        for k, m in self.fields.items():
+            output[k] = m.compute()
+        output["order_level_metrics"] = self.orders_metrics.compute()
         output["encounter_level_metrics"] = self.encounter_metrics.compute_all(references, predictions, indices, preprocessor=self.preprocessor)
+
+        if self.slices:
+            group_pairs = defaultdict(list)
+            for i, pair_groups in enumerate(groups):
+                for group in pair_groups:
+                    group_pairs[group].append(i)
+            for group, positions in group_pairs.items():
+                encounter_metrics = self._slice_metric(group, "encounter_level_metrics", self.encounter_metrics)
+                encounter_metrics.compute_all(
+                    [references[i] for i in positions],
+                    [predictions[i] for i in positions],
+                    [indices[i] for i in positions],
+                    preprocessor=self.preprocessor
+                )
+            output["slices"] = self.compute_slices()
+
         self.latest_output = output
         return output
 
+    def sweep(
+        self,
+        references: List[Dict[str, any]],
+        predictions: List[Dict[str, any]],
+        indices: List[int],
+        scores: List[float],
+        thresholds: List[float]
+    ) -> List[Dict[str, Any]]:
+        """Metrics for several minimum pairing scores, from a single set of assignments.
+
+        At threshold `t` a pair scoring below `t` is split into an unpaired reference and an
+        unpaired prediction. Pairs whose status is the same at every threshold (unpaired, or
+        scoring at least the largest threshold) update the field and order level metrics once;
+        each threshold then resumes from a copy of that state and only adds the swept pairs.
+        """
+        self.reset()
+        thresholds = sorted(thresholds)
+        top = thresholds[-1] if thresholds else 0.0
+        prepared = {
+            k: (list(self._prepare_from_dicts(references, k)), list(self._prepare_from_dicts(predictions, k)))
+            for k in self.fields
+        }
+
+        def update(fields, orders_metrics, i, ref_side, pred_side):
+            for k, m in fields.items():
+                m.update(prepared[k][0][i] if ref_side else "", prepared[k][1][i] if pred_side else "")
+            orders_metrics.update(
+                references[i] if ref_side else None, predictions[i] if pred_side else None, preprocessor=self.preprocessor
+            )
+
+        swept, num_fixed_pairs = [], 0
+        for i, (reference, prediction, score) in enumerate(zip(references, predictions, scores)):
+            if reference is not None and prediction is not None and score < top:
+                swept.append(i)
+                continue
+            num_fixed_pairs += reference is not None and prediction is not None
+            update(self.fields, self.orders_metrics, i, reference is not None, prediction is not None)
+
+        curve = []
+        for threshold in thresholds:
+            fields, orders_metrics = copy.deepcopy(self.fields), copy.deepcopy(self.orders_metrics)
+            num_pairs = num_fixed_pairs
+            for i in swept:
+                if scores[i] >= threshold:
+                    update(fields, orders_metrics, i, True, True)
+                    num_pairs += 1
+                else:
+                    update(fields, orders_metrics, i, True, False)
+                    update(fields, orders_metrics, i, False, True)
+            # Encounter level metrics need the full pair list of every threshold.
+            split = {i for i in swept if scores[i] < threshold}
+            refs, preds, idxs = [], [], []
+            for i, (reference, prediction, index) in enumerate(zip(references, predictions, indices)):
+                if i in split:
+                    refs.extend([reference, None])
+                    preds.extend([None, prediction])
+                    idxs.extend([index, index])
+                else:
+                    refs.append(reference)
+                    preds.append(prediction)
+                    idxs.append(index)
+            self.encounter_metrics.reset()
+
+            output = {k: m.compute() for k, m in fields.items()}
+            output["order_level_metrics"] = orders_metrics.compute()
+            output["encounter_level_metrics"] = self.encounter_metrics.compute_all(refs, preds, idxs, preprocessor=self.preprocessor)
+            curve.append({"threshold": threshold, "num_pairs": num_pairs, "metrics": output})
+        return curve
+
+    def compute_slices(self) -> Dict[str, float]:
+        """Slice metrics with `slice=key/field/metric` keys."""
+        output = {}
+        for (group, field), m in sorted(self.slice_metrics.items()):
+            for metric, value in m.compute().items():
+                output[f"{group}/{field}/{metric}"] = value
+        return output
+
     def export(self, filename: str = ""):
         if self.output_directory:
             if not filename:
@@ -75,6 +241,7 @@ class EvaluationManager:
 
         order_level_metrics = config.pop("order_level_metrics", {})
         encounter_level_metrics = config.pop("encounter_level_metrics", {})
+        slices = config.pop("slices", {})
 
         # Those metrics are computed on the whole order, not on individual fields
         orders_metrics = encounters_metrics = None
@@ -98,4 +265,5 @@ class EvaluationManager:
         return cls(output_directory, fields, processings, 
                    preprocessor_config=preprocess_config, 
                    orders_metrics=orders_metrics, 
-                   encounter_metrics=encounters_metrics)
\ No newline at end of file
+                   encounter_metrics=encounters_metrics,
+                   slices=slices)
\ No newline at end of file
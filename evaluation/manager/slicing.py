@@ -0,0 +1,59 @@
+from bisect import bisect_right
+from collections import Counter
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+from sampling import source_prefix
+
+SLICE_TYPES = ("source", "field", "encounter_size")
+DEFAULT_SIZE_BUCKETS = [1, 3, 6]
+
+
+def bucket_label(size: int, buckets: List[int]) -> str:
+    """Label of the bucket containing size, e.g. `0`, `1-2`, `3-5` or `6+` for [1, 3, 6]."""
+    position = bisect_right(buckets, size)
+    if position == len(buckets):
+        return f"{buckets[-1]}+"
+    low = buckets[position - 1] if position > 0 else 0
+    high = buckets[position] - 1
+    return str(low) if low == high else f"{low}-{high}"
+
+
+@dataclass
+class SliceDefinition:
+    """Group key of each pair for one breakdown of the metrics.
+
+    - `source`: data source from the transcript id (e.g. `acibench`, `primock57`).
+    - `field`: value of an order field, from the reference or else the prediction.
+    - `encounter_size`: bucket of the number of reference orders in the encounter.
+    """
+    name: str
+    type: str = "field"
+    field: Optional[str] = None
+    buckets: Optional[List[int]] = None
+
+    def __post_init__(self):
+        if self.type not in SLICE_TYPES:
+            raise ValueError(f"Slice type must be one of {SLICE_TYPES}, got {self.type}.")
+        if self.type == "field" and not self.field:
+            raise ValueError(f"Slice {self.name} of type field requires a field.")
+        if self.type == "encounter_size":
+            self.buckets = sorted(self.buckets or DEFAULT_SIZE_BUCKETS)
+
+    def keys(self, references: List[Dict[str, Any]], predictions: List[Dict[str, Any]], indices: List[int]) -> List[str]:
+        if self.type == "source":
+            return [source_prefix(str((r or h).get("transcript_id", ""))) for r, h in zip(references, predictions)]
+
+        if self.type == "field":
+            output = []
+            for r, h in zip(references, predictions):
+                value = r.get(self.field) if r and r.get(self.field) else (h.get(self.field) if h else None)
+                output.append(str(value).lower() if value else "missing")
+            return output
+
+        sizes = Counter(idx for r, idx in zip(references, indices) if r)
+        return [bucket_label(sizes[idx], self.buckets) for idx in indices]
+
+    @classmethod
+    def from_dict(cls, name: str, config: Dict[str, Any]) -> "SliceDefinition":
+        return cls(name=name, **config)
@@ -12,6 +12,13 @@ def compute_pr(true_positives: int, false_cases: int, default: float = 0.0) -> f
     return true_positives / (true_positives + false_cases)
 
 
+if hasattr(int, "bit_count"):
+    popcount = int.bit_count
+else:  # Python < 3.10
+    def popcount(mask: int) -> int:
+        return bin(mask).count("1")
+
+
 def compute_f1(precision: float, recall: float, default: float = 0.0) -> float:
     if not (precision + recall):
         return default
@@ -0,0 +1,78 @@
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from metrics import Metric, compute_f1
+
+MISSING = "missing"
+
+
+@dataclass
+class ConfusionMatrix(Metric):
+    """Confusion counts of a categorical field, rows are references and columns predictions.
+
+    Labels are interned into a vocabulary whose index 0 is the `missing` class, used for the
+    absent side of unpaired orders; each update is one increment of a preallocated NumPy
+    matrix, grown by doubling if an unseen label appears. Matrices of different shards can
+    be combined with `merge`.
+    """
+    name: str = "ConfusionMatrix"
+    labels: Optional[List[str]] = None
+    vocabulary: Dict[str, int] = field(default_factory=dict)
+    counts: np.ndarray = None
+
+    def __post_init__(self):
+        self.vocabulary = {MISSING: 0}
+        for label in self.labels or []:
+            self.vocabulary.setdefault(str(label), len(self.vocabulary))
+        self.counts = np.zeros((len(self.vocabulary),) * 2, dtype=np.int64)
+
+    def intern(self, label: Any) -> int:
+        label = str(label) if label else MISSING
+        i = self.vocabulary.get(label)
+        if i is None:
+            i = self.vocabulary[label] = len(self.vocabulary)
+            if i >= self.counts.shape[0]:
+                grown = np.zeros((2 * i,) * 2, dtype=np.int64)
+                grown[:i, :i] = self.counts
+                self.counts = grown
+        return i
+
+    def update(self, reference: any, prediction: any, **kwargs):
+        if not reference and not prediction:
+            return
+        i, j = self.intern(reference), self.intern(prediction)
+        self.counts[i, j] += 1
+
+    @property
+    def matrix(self) -> np.ndarray:
+        n = len(self.vocabulary)
+        return self.counts[:n, :n]
+
+    def merge(self, other: "ConfusionMatrix") -> "ConfusionMatrix":
+        """Add the counts of another matrix, whatever the order of its vocabulary."""
+        mapping = np.asarray([self.intern(label) for label in other.vocabulary])
+        np.add.at(self.counts, (mapping[:, None], mapping[None, :]), other.matrix)
+        return self
+
+    def compute(self) -> Dict[str, float]:
+        matrix = self.matrix
+        total = matrix.sum()
+        output = {"accuracy": float(np.trace(matrix) / total) if total else 0.0}
+        f1s = []
+        for i in range(1, matrix.shape[0]):
+            relevant, retrieved = matrix[i].sum(), matrix[:, i].sum()
+            if not relevant and not retrieved:
+                continue
+            precision = matrix[i, i] / retrieved if retrieved else 0.0
+            recall = matrix[i, i] / relevant if relevant else 0.0
+            f1s.append(compute_f1(precision, recall))
+        output["macro_f1"] = float(np.mean(f1s)) if f1s else 0.0
+        return output
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"labels": list(self.vocabulary), "matrix": self.matrix.tolist()}
+
+    def reset(self):
+        self.__post_init__()
@@ -1,3 +1,4 @@
+import copy
 from collections import defaultdict
 from typing import Callable, List, Dict, Union, Iterable, Any, Optional
 from dataclasses import dataclass
@@ -8,8 +9,14 @@ from metrics.strict import Strict
 from metrics.match import Match
 from metrics.rouge1 import Rouge1, Rouge1EncounterLevel
 from metrics.multilabel import MultiLabel
+from metrics.provenance_span import ProvenanceSpan
+from metrics.rougel import RougeL, RougeLEncounterLevel
+from metrics.rouge2 import Rouge2, Rouge2EncounterLevel
+from metrics.tfidf import TfidfCosine
+from metrics.confusion import ConfusionMatrix
 
-METRIC_CLS = [Strict, Match, Rouge1, MultiLabel, PropertyAggregate, PropertyAggregateOrderLevel, Rouge1EncounterLevel, GroupedPropertyAggregate, GroupedPropertyAggregateOrderLevel]
+METRIC_CLS = [Strict, Match, Rouge1, MultiLabel, PropertyAggregate, PropertyAggregateOrderLevel, Rouge1EncounterLevel, GroupedPropertyAggregate, GroupedPropertyAggregateOrderLevel,
+              ProvenanceSpan, RougeL, RougeLEncounterLevel, Rouge2, Rouge2EncounterLevel, TfidfCosine, ConfusionMatrix]
 METRICS = {m.name: m for m in METRIC_CLS}
 
 
@@ -62,6 +69,25 @@ class MetricDict:
         for metric in self.metrics:
             metric.reset()
 
+    def state(self) -> Dict[str, float]:
+        """Numeric accumulators of the metrics, keyed `metric/attribute`."""
+        output = {}
+        for metric in self.metrics:
+            for k, v in vars(metric).items():
+                if not k.startswith("_") and isinstance(v, (int, float)) and not isinstance(v, bool):
+                    output[f"{metric.name}/{k}"] = v
+        return output
+
+    def clone(self, name: Optional[str] = None) -> "MetricDict":
+        """Copy with the same metrics and parameters, in a reset state."""
+        new = copy.deepcopy(self)
+        new.reset()
+        if name is not None:
+            new.name = name
+            for metric in new.metrics:
+                metric.field_name = name
+        return new
+
     def compute_all(
         self, references: Iterable, predictions: Iterable, indices: Optional[Iterable[int]] = None, preprocessor=None
     ) -> Dict[str, float]:
@@ -1,22 +1,8 @@
-from collections import defaultdict
 from dataclasses import dataclass
-from typing import Dict, List
-
-from metrics import Metric, compute_f1
-
-def process_list(obj: any) -> List[int]:
-    if isinstance(obj, list):
-        return [int(e) for e in obj if isinstance(e, int) or (isinstance(e, str) and e.isnumeric())]
-    elif isinstance(obj, str):
-        if obj.strip() == "":
-            return []
-        elif obj.startswith("[") and obj.endswith("]"):
-            return [int(e) for e in obj[1:-1].split(",")]
-        elif obj.isnumeric():
-            return [int(obj)]
-    else:
-        print(f"Warning: {obj} is not a list but {type(obj)}")
-        raise ValueError(f"Unsupported type: {type(obj)}")
+from typing import Dict
+
+from metrics import Metric, compute_f1, logger
+from order.ingest import coerce_provenance
 
 @dataclass
 class MultiLabel(Metric):
@@ -35,11 +21,14 @@ class MultiLabel(Metric):
         if not reference and not prediction:
             return
 
-        pred_labels = process_list(prediction)
-        ref_labels = process_list(reference)
+        # Labels are int lists, normalized once at ingestion (see order.ingest); raw values
+        # such as a `"[1, 2]"` string are coerced the same way.
+        pred_labels = prediction if isinstance(prediction, list) else coerce_provenance(prediction)[0]
+        ref_labels = reference if isinstance(reference, list) else coerce_provenance(reference)[0]
+        pred_set = set(pred_labels)
+        ref_set = set(ref_labels)
 
-        print(f"Reference: {reference}, Prediction: {prediction}")
-        print(f"Processed Reference: {ref_labels}, Processed Prediction: {pred_labels}")
+        logger.debug(f"Reference: {reference}, Prediction: {prediction}")
 
         if prediction:
             nb_retrieved = len(pred_labels)
@@ -50,11 +39,11 @@ class MultiLabel(Metric):
             self.sum_nb_relevants += 1
 
         for label in ref_labels:
-            if label in pred_labels:
+            if label in pred_set:
                 recall_nb_correct += 1
 
         for label in pred_labels:
-            if label in ref_labels:
+            if label in ref_set:
                 precision_nb_correct += 1
 
         precision = 0.0
@@ -0,0 +1,87 @@
+from dataclasses import dataclass
+from typing import Dict, Iterable
+
+import numpy as np
+
+from metrics import Metric, compute_f1, popcount
+
+
+def to_bitset(turns: Iterable[int]) -> int:
+    """Integer bitset of turn ids (bit t set for turn t), built without a per-label loop."""
+    if turns is None or len(turns) == 0:
+        return 0
+    turns = np.asarray(turns, dtype=np.int64)
+    turns = turns[turns >= 0]
+    if turns.size == 0:
+        return 0
+    bits = np.zeros(int(turns.max()) + 1, dtype=bool)
+    bits[turns] = True
+    return int.from_bytes(np.packbits(bits, bitorder="little").tobytes(), "little")
+
+
+def dilate(mask: int, k: int) -> int:
+    """Extend every set bit to its +/- k neighbours, in O(log k) shifts."""
+    span = 0
+    while span < k:
+        step = min(span + 1, k - span)
+        mask |= (mask << step) | (mask >> step)
+        span += step
+    return mask
+
+
+@dataclass
+class ProvenanceSpan(Metric):
+    """Provenance overlap on turn-id bitsets with a +/- `tolerance` turn window.
+
+    A predicted turn is correct if it is within `tolerance` turns of a reference turn, and a
+    reference turn is recalled if a predicted turn is within `tolerance` of it. The span IoU is
+    recalled reference turns over reference turns plus unmatched predicted turns, which is the
+    plain set IoU when tolerance is 0.
+    """
+    name: str = "ProvenanceSpan"
+    tolerance: int = 0
+    sum_precision: float = 0
+    sum_recall: float = 0
+    sum_iou: float = 0
+    sum_nb_retrieved: int = 0
+    sum_nb_relevants: int = 0
+    sum_nb_pairs: int = 0
+
+    def update(self, reference: any, prediction: any, **kwargs):
+        ref_mask = to_bitset(reference) if reference else 0
+        pred_mask = to_bitset(prediction) if prediction else 0
+        if not ref_mask and not pred_mask:
+            return
+
+        nb_relevants = popcount(ref_mask)
+        nb_retrieved = popcount(pred_mask)
+        matched_pred = popcount(pred_mask & dilate(ref_mask, self.tolerance))
+        matched_ref = popcount(ref_mask & dilate(pred_mask, self.tolerance))
+
+        if nb_retrieved:
+            self.sum_nb_retrieved += 1
+            self.sum_precision += matched_pred / nb_retrieved
+        if nb_relevants:
+            self.sum_nb_relevants += 1
+            self.sum_recall += matched_ref / nb_relevants
+
+        self.sum_nb_pairs += 1
+        self.sum_iou += matched_ref / (nb_relevants + nb_retrieved - matched_pred)
+
+    def compute(self) -> Dict[str, float]:
+        output = {"precision": 0.0, "recall": 0.0}
+        if self.sum_nb_retrieved > 0:
+            output["precision"] = self.sum_precision / self.sum_nb_retrieved
+        if self.sum_nb_relevants > 0:
+            output["recall"] = self.sum_recall / self.sum_nb_relevants
+        output["f1"] = compute_f1(output["precision"], output["recall"])
+        output["iou"] = self.sum_iou / self.sum_nb_pairs if self.sum_nb_pairs > 0 else 0.0
+        return output
+
+    def reset(self):
+        self.sum_precision = 0.0
+        self.sum_recall = 0.0
+        self.sum_iou = 0.0
+        self.sum_nb_retrieved = 0
+        self.sum_nb_relevants = 0
+        self.sum_nb_pairs = 0
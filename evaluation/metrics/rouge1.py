@@ -1,6 +1,6 @@
 from collections import defaultdict
 from dataclasses import dataclass
-from typing import Dict, List
+from typing import Dict, List, Tuple
 
 from metrics import Metric, compute_f1
 
@@ -16,6 +16,21 @@ def process_text(text: any, processor = None) -> List[str]:
         words = str(text).split()
     return words
 
+def unigram_overlap(ref_words: List[str], pred_words: List[str]) -> Tuple[int, int, int, int]:
+    """Correct predicted words, recalled reference words, and the two sizes."""
+    recall_nb_correct = 0
+    for word in ref_words:
+        if word in pred_words:
+            recall_nb_correct += 1
+
+    precision_nb_correct = 0
+    for word in pred_words:
+        if word in ref_words:
+            precision_nb_correct += 1
+
+    return precision_nb_correct, recall_nb_correct, len(pred_words), len(ref_words)
+
+
 @dataclass
 class Rouge1(Metric):
     name: str = "Rouge1"
@@ -24,6 +39,9 @@ class Rouge1(Metric):
     sum_nb_retrieved: int = 0
     sum_nb_relevants: int = 0
 
+    def _overlap(self, ref_words: List[str], pred_words: List[str]) -> Tuple[int, int, int, int]:
+        return unigram_overlap(ref_words, pred_words)
+
     def update(self, reference: any, prediction: any, **kwargs):
         recall_nb_correct = 0
         precision_nb_correct = 0
@@ -37,22 +55,16 @@ class Rouge1(Metric):
 
         ref_words = process_text(reference)
 
+        precision_nb_correct, recall_nb_correct, pred_size, ref_size = self._overlap(ref_words, pred_words)
+
         if prediction:
-            nb_retrieved = len(pred_words)
+            nb_retrieved = pred_size
             self.sum_nb_retrieved += 1
 
         if reference:
-            nb_relevants = len(ref_words)
+            nb_relevants = ref_size
             self.sum_nb_relevants += 1
 
-        for word in ref_words:
-            if word in pred_words:
-                recall_nb_correct += 1
-
-        for word in pred_words:
-            if word in ref_words:
-                precision_nb_correct += 1
-
         precision = 0.0
         if nb_retrieved > 0:
             precision = precision_nb_correct / nb_retrieved
@@ -90,6 +102,9 @@ class Rouge1EncounterLevel(Metric):
         self.properties = self.properties or []
         self.property_values = defaultdict(lambda: defaultdict(float))
 
+    def _overlap(self, ref_words: List[str], pred_words: List[str]) -> Tuple[int, int, int, int]:
+        return unigram_overlap(ref_words, pred_words)
+
     def update(self, references: any, predictions: any, processor = None, **kwargs):
 
         for prop in self.properties:
@@ -116,21 +131,18 @@ class Rouge1EncounterLevel(Metric):
                 pred_words = process_text(prediction, processor)
                 ref_words = process_text(reference, processor)
 
+                p_correct, r_correct, pred_size, ref_size = self._overlap(ref_words, pred_words)
+
                 if prediction:
                     self.property_values[prop]["retrieved"] += 1
-                    nb_retrieved = len(pred_words)
+                    nb_retrieved = pred_size
 
                 if reference:
                     self.property_values[prop]["relevants"] += 1
-                    nb_relevants = len(ref_words)
-
-                for word in ref_words:
-                    if word in pred_words:
-                        recall_nb_correct += 1
+                    nb_relevants = ref_size
 
-                for word in pred_words:
-                    if word in ref_words:
-                        precision_nb_correct += 1
+                recall_nb_correct += r_correct
+                precision_nb_correct += p_correct
 
                 precision = 0.0
                 if nb_retrieved > 0:
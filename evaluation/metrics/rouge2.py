@@ -0,0 +1,36 @@
+from collections import Counter
+from dataclasses import dataclass
+from typing import Dict, List, Tuple
+
+from metrics.rouge1 import Rouge1, Rouge1EncounterLevel
+from metrics.rougel import token_ids
+
+
+def bigram_counts(words: List[str], ids: Dict[str, int]) -> Counter:
+    """Multiset of bigrams, each hashed into one integer from its two token ids."""
+    tokens = token_ids(words, ids)
+    return Counter((a << 32) | b for a, b in zip(tokens, tokens[1:]))
+
+
+def bigram_overlap(ref_words: List[str], pred_words: List[str]) -> Tuple[int, int, int, int]:
+    ids = {}
+    ref_bigrams = bigram_counts(ref_words, ids)
+    pred_bigrams = bigram_counts(pred_words, ids)
+    overlap = sum((ref_bigrams & pred_bigrams).values())
+    return overlap, overlap, sum(pred_bigrams.values()), sum(ref_bigrams.values())
+
+
+@dataclass
+class Rouge2(Rouge1):
+    name: str = "Rouge2"
+
+    def _overlap(self, ref_words: List[str], pred_words: List[str]) -> Tuple[int, int, int, int]:
+        return bigram_overlap(ref_words, pred_words)
+
+
+@dataclass
+class Rouge2EncounterLevel(Rouge1EncounterLevel):
+    name: str = "Rouge2_encounter_level"
+
+    def _overlap(self, ref_words: List[str], pred_words: List[str]) -> Tuple[int, int, int, int]:
+        return bigram_overlap(ref_words, pred_words)
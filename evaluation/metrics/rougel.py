@@ -0,0 +1,51 @@
+from dataclasses import dataclass
+from typing import Dict, List, Tuple
+
+from metrics import popcount
+from metrics.rouge1 import Rouge1, Rouge1EncounterLevel
+
+def token_ids(words: List[str], ids: Dict[str, int]) -> List[int]:
+    """Intern words as integer ids in `ids`, a table local to one comparison."""
+    return [ids.setdefault(w, len(ids)) for w in words]
+
+
+def lcs_length(a: List[int], b: List[int]) -> int:
+    """Length of the longest common subsequence with the bit-parallel algorithm (Hyyrö, 2004).
+
+    Each token of `a` is a bit in a match mask per token id, and every token of `b` updates
+    the row vector with a few big-integer operations, i.e. O(len(b) * len(a) / word size).
+    """
+    if not a or not b:
+        return 0
+    masks = {}
+    for i, t in enumerate(a):
+        masks[t] = masks.get(t, 0) | (1 << i)
+
+    full = (1 << len(a)) - 1
+    v = full
+    for t in b:
+        u = v & masks.get(t, 0)
+        v = ((v + u) | (v - u)) & full
+    return len(a) - popcount(v)
+
+
+def lcs_overlap(ref_words: List[str], pred_words: List[str]) -> Tuple[int, int, int, int]:
+    ids = {}
+    lcs = lcs_length(token_ids(ref_words, ids), token_ids(pred_words, ids))
+    return lcs, lcs, len(pred_words), len(ref_words)
+
+
+@dataclass
+class RougeL(Rouge1):
+    name: str = "RougeL"
+
+    def _overlap(self, ref_words: List[str], pred_words: List[str]) -> Tuple[int, int, int, int]:
+        return lcs_overlap(ref_words, pred_words)
+
+
+@dataclass
+class RougeLEncounterLevel(Rouge1EncounterLevel):
+    name: str = "RougeL_encounter_level"
+
+    def _overlap(self, ref_words: List[str], pred_words: List[str]) -> Tuple[int, int, int, int]:
+        return lcs_overlap(ref_words, pred_words)
@@ -38,5 +38,5 @@ class Strict(Metric):
 
     def reset(self):
         self.true_positives = 0
-        self.false_positives = 0
-        self.false_negatives = 0
+        self.nb_retrieved = 0
+        self.nb_relevants = 0
@@ -0,0 +1,48 @@
+from dataclasses import dataclass, field
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from metrics import Metric, compute_f1
+from utils.tfidf import CharNgramTfidf
+
+
+@dataclass
+class TfidfCosine(Metric):
+    """Character n-gram TF-IDF cosine similarity, robust to spelling variants ("500mg" / "500 mg").
+
+    Texts are only collected in `update`; `compute` fits the vectorizer on the whole corpus and
+    scores every pair with one sparse row-wise product. Precision averages the similarity over
+    predicted items and recall over reference items, unpaired items counting as 0.
+    """
+    name: str = "TfidfCosine"
+    ngram_range: Tuple[int, int] = (2, 4)
+    references: List[str] = field(default_factory=list)
+    predictions: List[str] = field(default_factory=list)
+
+    def update(self, reference: any, prediction: any, **kwargs):
+        if not reference and not prediction:
+            return
+        self.references.append(str(reference) if reference else "")
+        self.predictions.append(str(prediction) if prediction else "")
+
+    def compute(self) -> Dict[str, float]:
+        output = {"precision": 0.0, "recall": 0.0}
+        if self.references:
+            vectorizer = CharNgramTfidf(ngram_range=tuple(self.ngram_range))
+            vectorizer.fit([t for t in self.references + self.predictions if t])
+            similarity = vectorizer.paired_similarity(
+                vectorizer.transform(self.references), vectorizer.transform(self.predictions)
+            )
+            has_ref = np.asarray([bool(t) for t in self.references])
+            has_pred = np.asarray([bool(t) for t in self.predictions])
+            if has_pred.any():
+                output["precision"] = float(similarity[has_pred].mean())
+            if has_ref.any():
+                output["recall"] = float(similarity[has_ref].mean())
+        output["f1"] = compute_f1(output["precision"], output["recall"])
+        return output
+
+    def reset(self):
+        self.references = []
+        self.predictions = []
@@ -1 +1,3 @@
-from .order import Order
\ No newline at end of file
+from .order import Order, VALID_ORDER_TYPES
+from .ingest import IngestionReport, coerce_provenance, normalize_order, ingest_orders, source_attributes
+from .table import OrderTable, OrderRow
\ No newline at end of file
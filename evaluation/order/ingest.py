@@ -0,0 +1,144 @@
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+import numpy as np
+
+from .order import Order, VALID_ORDER_TYPES
+
+VALID_ATTRIBUTES = set(Order.__annotations__.keys())
+
+NOT_AN_OBJECT = "not_an_object"
+MISSING_DESCRIPTION = "missing_description"
+INVALID_ORDER_TYPE = "invalid_order_type"
+INVALID_PROVENANCE = "invalid_provenance"
+
+
+def _is_int(value: Any) -> bool:
+    return isinstance(value, (int, np.integer)) and not isinstance(value, bool)
+
+
+def coerce_provenance(value: Any) -> Tuple[List[int], bool]:
+    """Sorted turn ids from ints, numeric strings or `"[1, 2]"` strings.
+
+    Returns the turn ids and whether every entry could be parsed.
+    """
+    if value is None or value == "" or value == []:
+        return [], True
+    if _is_int(value):
+        return [int(value)], True
+    if isinstance(value, str):
+        value = value.strip()
+        if value.startswith("[") and value.endswith("]"):
+            value = [e for e in value[1:-1].split(",") if e.strip()]
+        else:
+            value = [value]
+    if not isinstance(value, (list, tuple)):
+        return [], False
+
+    turns, valid = [], True
+    for e in value:
+        if _is_int(e):
+            turns.append(int(e))
+        elif isinstance(e, str) and e.strip().isnumeric():
+            turns.append(int(e.strip()))
+        else:
+            valid = False
+    return sorted(turns), valid
+
+
+def source_attributes(obj: Dict[str, Any]) -> Dict[str, Any]:
+    """Order attributes of an order that have a value, as given before normalization."""
+    return {k: v for k, v in obj.items() if k in VALID_ATTRIBUTES and v}
+
+
+def normalize_order(obj: Any) -> Tuple[Optional[Dict[str, Any]], List[str]]:
+    """Validate and normalize one order.
+
+    Keeps the Order attributes that have a value (in their original key order), lowercases
+    `order_type` and coerces `provenance` to sorted ints. Returns the order, or None when it
+    must be skipped, and the schema errors found.
+    """
+    if not isinstance(obj, dict):
+        return None, [NOT_AN_OBJECT]
+    if not obj.get("description"):
+        return None, [MISSING_DESCRIPTION]
+    order_type = str(obj.get("order_type") or "").strip().lower()
+    if order_type not in VALID_ORDER_TYPES:
+        return None, [INVALID_ORDER_TYPE]
+
+    errors = []
+    output = {}
+    for k, v in obj.items():
+        if k not in VALID_ATTRIBUTES or not v:
+            continue
+        if k == "order_type":
+            v = order_type
+        elif k == "provenance":
+            v, valid = coerce_provenance(v)
+            if not valid:
+                errors.append(INVALID_PROVENANCE)
+            if not v:
+                continue
+        output[k] = v
+    return output, errors
+
+
+@dataclass
+class IngestionReport:
+    """Schema errors collected while ingesting orders.
+
+    An encounter ingested several times (one per reference set) is counted once.
+    """
+    encounter_ids: Set[str] = field(default_factory=set)
+    num_orders: int = 0
+    num_kept: int = 0
+    counts: Counter = field(default_factory=Counter)
+    errors: List[Dict[str, Any]] = field(default_factory=list)
+    max_examples: int = 100
+
+    @property
+    def num_encounters(self) -> int:
+        return len(self.encounter_ids)
+
+    def add(self, encounter_id: str, position: int, order: Any, errors: List[str]):
+        for error in errors:
+            self.counts[error] += 1
+            if len(self.errors) < self.max_examples:
+                self.errors.append({"encounter_id": encounter_id, "position": position, "error": error, "order": order})
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "num_encounters": self.num_encounters,
+            "num_orders": self.num_orders,
+            "num_kept": self.num_kept,
+            "counts": dict(self.counts),
+            "examples": self.errors,
+        }
+
+
+def ingest_orders(
+    encounter_id: str,
+    orders: Optional[List[Any]],
+    report: Optional[IngestionReport] = None,
+    sources: Optional[List[Dict[str, Any]]] = None
+) -> List[Dict[str, Any]]:
+    """Normalize the orders of one encounter, dropping invalid ones.
+
+    When `sources` is given, the `source_attributes` of every kept order are appended to it.
+    """
+    output = []
+    orders = orders or []
+    for position, obj in enumerate(orders):
+        order, errors = normalize_order(obj)
+        if report is not None and errors:
+            report.add(encounter_id, position, obj, errors)
+        if order is not None:
+            output.append(order)
+            if sources is not None:
+                sources.append(source_attributes(obj))
+    if report is not None:
+        report.encounter_ids.add(encounter_id)
+        report.num_orders += len(orders)
+        report.num_kept += len(output)
+    return output
@@ -1,19 +1,46 @@
-from dataclasses import dataclass
-from typing import List, Dict, Any, Union, Optional
+from typing import Dict, Any
+
+
+VALID_ORDER_TYPES = {"medication", "lab", "followup", "imaging"}
 
 
-@dataclass
 class Order:
-    """Generic Order class"""
+    """Generic Order class
+
+    Slotted record: no per-instance `__dict__`, which keeps large order lists compact.
+    """
+    __slots__ = ("description", "order_type", "reason", "provenance")
+
     description: str
     order_type: str
     reason: str
-    provenance: list[str] = None
+    provenance: list[str]
+
+    def __init__(self, description: str, order_type: str, reason: str, provenance: list[str] = None):
+        self.description = description
+        self.order_type = order_type
+        self.reason = reason
+        self.provenance = provenance
+
+    def __repr__(self) -> str:
+        values = ", ".join(f"{k}={getattr(self, k)!r}" for k in self.__slots__)
+        return f"Order({values})"
+
+    def __eq__(self, other: Any) -> bool:
+        if not isinstance(other, Order):
+            return NotImplemented
+        return all(getattr(self, k) == getattr(other, k) for k in self.__slots__)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """Dictionary-like field access, so orders can be used where dicts are expected."""
+        if key not in self.__slots__:
+            return default
+        return getattr(self, key)
 
     def to_dict(self) -> Dict[str, Any]:
         """Convert the Order object to a dictionary."""
-        return self.__dict__.copy()
-    
+        return {k: getattr(self, k) for k in self.__slots__}
+
     @classmethod
     def from_dict(cls, data: Dict[str, Any]) -> 'Order':
         """Create an Order object from a dictionary."""
@@ -0,0 +1,188 @@
+from collections.abc import Mapping
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from .ingest import IngestionReport, ingest_orders
+
+STRING_FIELDS = ("description", "order_type", "reason")
+PROVENANCE_FIELD = "provenance"
+ENCOUNTER_FIELD = "transcript_id"
+
+
+class OrderRow(Mapping):
+    """Read-only view of a table row, used wherever the pipeline expects an order dictionary.
+
+    Values are read from the table columns on access, so pairing and metrics never hold a
+    per-order dictionary. Keys are those of the source order, followed by `transcript_id`.
+    The representation is that of the order as given, before normalization: order and
+    encounter level metrics score `str(order)`.
+    """
+    __slots__ = ("table", "i")
+
+    def __init__(self, table: "OrderTable", i: int):
+        self.table = table
+        self.i = i
+
+    def _keys(self) -> Tuple[str, ...]:
+        return self.table.layouts[self.table.layout[self.i]]
+
+    def __getitem__(self, key: str) -> Any:
+        if key == ENCOUNTER_FIELD:
+            return self.table.encounter_ids[self.table.encounter[self.i]]
+        if key not in self._keys():
+            raise KeyError(key)
+        return self.table.value(self.i, key)
+
+    def __iter__(self) -> Iterator[str]:
+        yield from self._keys()
+        yield ENCOUNTER_FIELD
+
+    def __len__(self) -> int:
+        return len(self._keys()) + 1
+
+    def source(self) -> Dict[str, Any]:
+        """The order attributes as given, followed by `transcript_id`."""
+        source = self.table.sources.get(self.i)
+        if source is None:
+            return dict(self)
+        return {**source, ENCOUNTER_FIELD: self[ENCOUNTER_FIELD]}
+
+    def __repr__(self) -> str:
+        return repr(self.source())
+
+
+@dataclass
+class OrderTable:
+    """Struct-of-arrays storage of the orders of many encounters.
+
+    Orders are stored row-wise contiguous per encounter: one list per string field, the
+    flattened provenance turn ids with their offsets, and the encounter index of each row.
+    `layout` records which keys the source order had (and their order) so that `row`
+    exposes the same keys the evaluation pipeline used to create per order. `sources` keeps
+    the attributes as given of the rows that normalization changed (e.g. an order_type of
+    `Lab` or a provenance of `"[3, 4]"`).
+    """
+    encounter_ids: List[str] = field(default_factory=list)
+    encounter_offsets: np.ndarray = None
+    columns: Dict[str, List[Any]] = None
+    provenance: np.ndarray = None
+    provenance_offsets: np.ndarray = None
+    encounter: np.ndarray = None
+    layouts: List[Tuple[str, ...]] = field(default_factory=list)
+    layout: np.ndarray = None
+    sources: Dict[int, Dict[str, Any]] = field(default_factory=dict)
+
+    def __post_init__(self):
+        if self.columns is None:
+            self.columns = {f: [] for f in STRING_FIELDS}
+        if self.encounter_offsets is None:
+            self.encounter_offsets = np.zeros(len(self.encounter_ids) + 1, dtype=np.int64)
+        if self.provenance is None:
+            self.provenance = np.zeros(0, dtype=np.int32)
+        if self.provenance_offsets is None:
+            self.provenance_offsets = np.zeros(1, dtype=np.int64)
+        if self.encounter is None:
+            self.encounter = np.zeros(0, dtype=np.int32)
+        if self.layout is None:
+            self.layout = np.zeros(0, dtype=np.int16)
+        self._positions = {k: i for i, k in enumerate(self.encounter_ids)}
+
+    @classmethod
+    def from_encounters(
+        cls,
+        encounters: Dict[str, List[Dict[str, Any]]],
+        keys: Optional[List[str]] = None,
+        report: Optional[IngestionReport] = None
+    ) -> "OrderTable":
+        """Build the table from `{encounter_id: [order, ...]}`.
+
+        Every order goes through `ingest_orders` once: invalid orders are skipped (and
+        recorded in the report), order types are lowercased and provenance is sorted ints.
+        """
+        keys = list(encounters) if keys is None else keys
+        columns = {f: [] for f in STRING_FIELDS}
+        provenance, provenance_offsets, encounter, layout = [], [0], [], []
+        layouts, layout_codes = [], {}
+        encounter_offsets = [0]
+        sources = {}
+
+        for e, key in enumerate(keys):
+            given = []
+            for order, source in zip(ingest_orders(key, encounters[key], report, sources=given), given):
+                if source != order:
+                    sources[len(encounter)] = source
+                present = tuple(order)
+                if present not in layout_codes:
+                    layout_codes[present] = len(layouts)
+                    layouts.append(present)
+
+                for f in STRING_FIELDS:
+                    columns[f].append(order.get(f))
+                provenance.extend(order.get(PROVENANCE_FIELD, []))
+                provenance_offsets.append(len(provenance))
+                encounter.append(e)
+                layout.append(layout_codes[present])
+            encounter_offsets.append(len(encounter))
+
+        return cls(
+            encounter_ids=list(keys),
+            encounter_offsets=np.asarray(encounter_offsets, dtype=np.int64),
+            columns=columns,
+            provenance=np.asarray(provenance, dtype=np.int32),
+            provenance_offsets=np.asarray(provenance_offsets, dtype=np.int64),
+            encounter=np.asarray(encounter, dtype=np.int32),
+            layouts=layouts,
+            layout=np.asarray(layout, dtype=np.int16),
+            sources=sources,
+        )
+
+    def __len__(self) -> int:
+        return len(self.encounter)
+
+    def __iter__(self) -> Iterator[OrderRow]:
+        for i in range(len(self)):
+            yield self.row(i)
+
+    def __getitem__(self, i: int) -> OrderRow:
+        return self.row(i)
+
+    @property
+    def num_encounters(self) -> int:
+        return len(self.encounter_ids)
+
+    def __contains__(self, encounter_id: str) -> bool:
+        return encounter_id in self._positions
+
+    def position(self, encounter_id: str) -> int:
+        """Index of an encounter id in the table."""
+        return self._positions[encounter_id]
+
+    def bounds(self, e: int) -> Tuple[int, int]:
+        """Row range `[start, end)` of the e-th encounter."""
+        return int(self.encounter_offsets[e]), int(self.encounter_offsets[e + 1])
+
+    def get_provenance(self, i: int) -> np.ndarray:
+        return self.provenance[self.provenance_offsets[i]:self.provenance_offsets[i + 1]]
+
+    def column(self, name: str) -> List[Any]:
+        """Values of a field for every row (None when missing)."""
+        if name == PROVENANCE_FIELD:
+            return [self.get_provenance(i).tolist() or None for i in range(len(self))]
+        return self.columns[name]
+
+    def value(self, i: int, name: str) -> Any:
+        if name == PROVENANCE_FIELD:
+            return self.get_provenance(i).tolist()
+        return self.columns[name][i]
+
+    def row(self, i: int) -> OrderRow:
+        """Order of a row, with its transcript_id."""
+        return OrderRow(self, i)
+
+    def rows(self, start: int, end: int) -> List[OrderRow]:
+        return [OrderRow(self, i) for i in range(start, end)]
+
+    def encounter_rows(self, e: int) -> List[OrderRow]:
+        return self.rows(*self.bounds(e))
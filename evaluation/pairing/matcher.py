@@ -1,6 +1,8 @@
 import os
+import csv
+import json
 from datetime import datetime
-from typing import List, Dict, Tuple, Union, Generator
+from typing import List, Dict, Optional, Tuple, Union, Generator, TextIO
 from dataclasses import dataclass, field
 
 import numpy as np
@@ -8,9 +10,13 @@ from scipy.optimize import linear_sum_assignment
 
 from preprocessing import Preprocessor, PreprocessorConfig
 from utils.slice import slice_gen
-from order import Order
+from utils.tfidf import CharNgramTfidf
+from order import Order, OrderTable
 from pairing.list_manipulators import *
 
+TSV_FIELDS = list(Order.__annotations__.keys())
+PAIRING_COSTS = ("overlap", "tfidf")
+
 
 @dataclass
 class PairingMatcher:
@@ -20,12 +26,27 @@ class PairingMatcher:
     preprocessing: Union[Preprocessor, None] = None
     pairings_accumulator: Union[List[Tuple[str, str, float]], None] = None
     encounter_index: int = 0
+    tsv_stream: Union[TextIO, None] = None
+    cost: str = "overlap"
+    vectorizer: Union[CharNgramTfidf, None] = None
+    best_references: Union[Dict[str, int], None] = None
 
     def __post_init__(self):
+        if self.cost not in PAIRING_COSTS:
+            raise ValueError(f"Pairing cost must be one of {PAIRING_COSTS}, got {self.cost}.")
+        if self.cost == "tfidf" and self.vectorizer is None:
+            self.vectorizer = CharNgramTfidf()
         if not self.preprocessing:
             self.preprocessing = Preprocessor.from_config(self.preprocessing_config)
+        # Pairings are written to the stream as soon as they are produced. They are still kept in
+        # pairings_accumulator for the metrics and the export, so memory grows with the number of pairs.
+        self._tsv_writer = None
+        if self.tsv_stream is not None:
+            self._tsv_writer = csv.writer(self.tsv_stream, delimiter="\t")
+            self._tsv_writer.writerow(self.tsv_header())
         self.accumulator_reset()
         self.encounter_index = 0
+        self.best_references = {}
 
     def accumulator_reset(self):
         self.pairings_accumulator = []
@@ -52,7 +73,22 @@ class PairingMatcher:
                 match = (local / len(truth_words))
         return match
 
+    def fit_cost(self, texts: List[str]):
+        """Fit the TF-IDF cost on the (preprocessed) texts of the whole corpus."""
+        if self.cost == "tfidf":
+            self.vectorizer.fit([t for t in texts if t])
+
+    def _tfidf_matrix(self, ref: List[str], hyp: List[str]) -> np.array:
+        if not self.vectorizer.fitted:
+            raise ValueError("The tfidf pairing cost must be fitted on the corpus first (fit_cost).")
+        if not ref:
+            return np.array([[]])
+        return self.vectorizer.similarity(self.vectorizer.transform(ref), self.vectorizer.transform(hyp))
+
     def build_metric_matrix(self, ref: Generator[str, None, None], hyp: Generator[str, None, None]) -> np.array:
+        if self.cost == "tfidf":
+            return self._tfidf_matrix(list(ref), list(hyp))
+
         matrix = []
         local_hyp = list(hyp) # Generator needs to be used len(ref) times.
         for order1 in ref:
@@ -75,7 +111,19 @@ class PairingMatcher:
         ref_gen = self._prepare_from_dicts(ref, self.field)
         hyp_gen = self._prepare_from_dicts(hyp, self.field)
         cost_matrix = self.build_metric_matrix(ref_gen, hyp_gen)
-        row_ind, col_ind = linear_sum_assignment(cost_matrix, maximize=True)
+        return self.assign(ref, hyp, cost_matrix)
+
+    def assign(
+        self,
+        ref: List[Dict[str, Union[str, int]]],
+        hyp: List[Dict[str, Union[str, int]]],
+        cost_matrix: np.ndarray,
+        assignment: Optional[Tuple[np.ndarray, np.ndarray]] = None,
+    ) -> Tuple[List[List[Union[Dict[str, Union[str, int]], None]]], List[float]]:
+        """Solve the assignment on the cost matrix (unless given) and accumulate the resulting pairs."""
+        if assignment is None:
+            assignment = linear_sum_assignment(cost_matrix, maximize=True)
+        row_ind, col_ind = assignment
 
         # Make sure cost is above zero else pop out (no actual pair)
         nonzero_costs = cost_matrix[row_ind, col_ind] > 0
@@ -89,22 +137,127 @@ class PairingMatcher:
         row_ind, col_ind = row_ind.tolist(), col_ind.tolist()
         pairings = (slice_items(ref, row_ind), slice_items(hyp, col_ind))  # (N, 2)
         pairings = nest_tup_to_nest_list(zip(*pairings))  # transpose (2, N)
+        positions = list(zip(row_ind, col_ind))
 
         # Add missing elements with None.
         if len(ref) > len(hyp) or len(ref) > len(row_ind):
             miss_pairs = get_miss_items(ref, row_ind)
             scores.extend([0.0] * len(miss_pairs))
             pairings.extend(miss_pairs)
+            positions.extend((i, None) for i in missing_indices(row_ind, len(ref)))
         if len(ref) < len(hyp) or len(hyp) > len(col_ind):
             miss_pairs = get_miss_items(hyp, col_ind, none_side="left")
             scores.extend([0.0] * len(miss_pairs))
             pairings.extend(miss_pairs)
+            positions.extend((None, j) for j in missing_indices(col_ind, len(hyp)))
 
-        for (p1, p2), s in zip(pairings, scores):
-            self.pairings_accumulator.append(dict(ref=p1, hyp=p2, score=s, index=self.encounter_index))
+        for (p1, p2), s, (i, j) in zip(pairings, scores, positions):
+            pair = dict(ref=p1, hyp=p2, score=s, index=self.encounter_index, ref_index=i, hyp_index=j)
+            self.pairings_accumulator.append(pair)
+            if self._tsv_writer is not None:
+                self._tsv_writer.writerow(self.tsv_row(pair))
 
         return pairings, scores
 
+    def prepare_column(self, table: OrderTable) -> List[str]:
+        values = table.column(self.field)
+        if self.preprocessing:
+            return [self.preprocessing(v) if v else "" for v in values]
+        return [v if v else "" for v in values]
+
+    def reset(self):
+        """Clear the pairings of a previous run (and the fitted tfidf cost)."""
+        self.accumulator_reset()
+        self.encounter_index = 0
+        self.best_references = {}
+        if self.cost == "tfidf":
+            self.vectorizer = CharNgramTfidf(ngram_range=self.vectorizer.ngram_range, sublinear_tf=self.vectorizer.sublinear_tf)
+
+    def pair_tables(self, ref: OrderTable, hyp: OrderTable, ref_values: Optional[List[str]] = None):
+        """Pair every encounter of two order tables.
+
+        The pairing field is preprocessed once per table (or given for the reference table
+        when it is reused), and cost matrices are built from column slices; order
+        dictionaries are only materialized for the accumulated pairs.
+        """
+        if ref_values is None:
+            ref_values = self.prepare_column(ref)
+        hyp_values = self.prepare_column(hyp)
+
+        # With the tfidf cost, vectors are built once for the corpus and each encounter's
+        # similarity matrix is one sparse product of row slices.
+        if self.cost == "tfidf":
+            if not self.vectorizer.fitted:
+                self.fit_cost(ref_values + hyp_values)
+            ref_vectors = self.vectorizer.transform(ref_values)
+            hyp_vectors = self.vectorizer.transform(hyp_values)
+
+        for e, encounter_id in enumerate(ref.encounter_ids):
+            r0, r1 = ref.bounds(e)
+            h0, h1 = hyp.bounds(hyp.position(encounter_id))
+            self.encounter_index += 1
+            if self.cost == "tfidf":
+                cost_matrix = self.vectorizer.similarity(ref_vectors[r0:r1], hyp_vectors[h0:h1]) if r1 > r0 else np.array([[]])
+            else:
+                cost_matrix = self.build_metric_matrix(ref_values[r0:r1], hyp_values[h0:h1])
+            self.assign(ref.rows(r0, r1), hyp.rows(h0, h1), cost_matrix)
+
+    def reference_tensor(self, ref_values: List[List[str]], hyp_values: List[str]) -> np.ndarray:
+        """Cost matrices of K reference lists against one hypothesis list, as a zero-padded
+        `(K, max_refs, num_hyps)` tensor built from a single matrix over the concatenated references."""
+        sizes = [len(r) for r in ref_values]
+        tensor = np.zeros((len(ref_values), max(sizes, default=0), len(hyp_values)))
+        flat = [v for r in ref_values for v in r]
+        if not flat or not hyp_values:
+            return tensor
+        if self.cost == "tfidf":
+            matrix = self._tfidf_matrix(flat, hyp_values)
+        else:
+            matrix = self.build_metric_matrix(flat, hyp_values)
+        offsets = np.cumsum([0] + sizes)
+        for k, n in enumerate(sizes):
+            tensor[k, :n] = matrix[offsets[k]:offsets[k + 1]]
+        return tensor
+
+    @staticmethod
+    def best_reference(tensor: np.ndarray, sizes: List[int]) -> Tuple[int, Tuple[np.ndarray, np.ndarray]]:
+        """Solve the assignment of every reference slice and pick the reference with the best
+        normalized pairing score `2 * sum(scores) / (num_refs + num_hyps)` (first one on ties)."""
+        num_hyps = tensor.shape[2]
+        assignments = [linear_sum_assignment(tensor[k, :n], maximize=True) for k, n in enumerate(sizes)]
+        totals = np.asarray([tensor[k, rows, cols].sum() for k, (rows, cols) in enumerate(assignments)])
+        denominators = np.asarray(sizes, dtype=np.float64) + num_hyps
+        scores = np.divide(2 * totals, denominators, out=np.ones_like(totals), where=denominators > 0)
+        best = int(np.argmax(scores))
+        return best, assignments[best]
+
+    def pair_references(self, refs: List[OrderTable], hyp: OrderTable):
+        """Pair every encounter against its best-matching reference list.
+
+        `refs[k]` holds the k-th reference list of the encounters that have one; all
+        encounters are in `refs[0]`. Per encounter, the cost matrices against all its
+        references are stacked into one tensor, every slice is assigned, and only the pairs
+        of the best reference are accumulated. Chosen indices go to `best_references`.
+        """
+        ref_values = [self.prepare_column(t) for t in refs]
+        hyp_values = self.prepare_column(hyp)
+        if self.cost == "tfidf" and not self.vectorizer.fitted:
+            self.fit_cost([v for values in ref_values for v in values] + hyp_values)
+
+        for encounter_id in refs[0].encounter_ids:
+            h0, h1 = hyp.bounds(hyp.position(encounter_id))
+            candidates = [k for k, table in enumerate(refs) if encounter_id in table]
+            bounds = [refs[k].bounds(refs[k].position(encounter_id)) for k in candidates]
+            tensor = self.reference_tensor([ref_values[k][r0:r1] for k, (r0, r1) in zip(candidates, bounds)], hyp_values[h0:h1])
+            sizes = [r1 - r0 for r0, r1 in bounds]
+            best, assignment = self.best_reference(tensor, sizes)
+
+            self.encounter_index += 1
+            self.best_references[encounter_id] = candidates[best]
+            r0, r1 = bounds[best]
+            cost_matrix = tensor[best, :sizes[best]] if sizes[best] else np.array([[]])
+            self.assign(refs[candidates[best]].rows(r0, r1), hyp.rows(h0, h1), cost_matrix, assignment=assignment)
+
     def get_pairings(self, transpose: bool = False):
         output = [[p.get("ref"), p.get("hyp"), p.get("index")] for p in self.pairings_accumulator]
         if transpose:
@@ -117,40 +270,33 @@ class PairingMatcher:
     def get_pairings_accumulator(self):
         return self.pairings_accumulator
 
-    def pairings_to_tsv(self) -> str:
-        doc = []
+    @staticmethod
+    def tsv_header() -> List[str]:
         header = ["transcript_id"]
-        pair_keys = set(Order.__annotations__.keys())
-        for i, p in enumerate(self.pairings_accumulator):
-            # Parse transcript id.
-            transcript_id = (p["ref"] or p["hyp"]).get("transcript_id")
-            if p["ref"]:
-                del p["ref"]["transcript_id"]
-            if p["hyp"]:
-                del p["hyp"]["transcript_id"]
-            line = [transcript_id]
-
-            # Parse field next to each other.
-            for field in pair_keys:
-                for k in {"ref", "hyp"}:
-                    if i == 0:
-                        header.append(f"{k}_{field}")
-                    v = p.get(k)
-                    value = v.get(field, "") if v else ""
-                    write_val = str(value)
-                    if isinstance(value, list) or isinstance(value, str):
-                        write_val = f'"{write_val}"'
-                    line.append(write_val)
-
-            # Parse score.
-            if i == 0:
-                header.append("score")
-            line.append(str(p["score"]))
-
-            doc.append(line)
-        doc = [header] + doc
-        output = "\n".join("\t".join(line) for line in doc)
-        return output
+        for field in TSV_FIELDS:
+            header.extend([f"ref_{field}", f"hyp_{field}"])
+        header.append("score")
+        return header
+
+    @staticmethod
+    def tsv_row(pair: Dict[str, any]) -> List[str]:
+        """Row of a pairing, reading the orders without modifying them."""
+        ref, hyp = pair["ref"], pair["hyp"]
+        row = [(ref or hyp).get("transcript_id", "")]
+        for field in TSV_FIELDS:
+            for order in (ref, hyp):
+                value = order.get(field, "") if order else ""
+                row.append(json.dumps(value) if isinstance(value, list) else str(value))
+        row.append(str(pair["score"]))
+        return row
+
+    def write_tsv(self, fp: TextIO, header: bool = True):
+        """Write the accumulated pairings to a file handle as TSV rows."""
+        writer = csv.writer(fp, delimiter="\t")
+        if header:
+            writer.writerow(self.tsv_header())
+        for pair in self.pairings_accumulator:
+            writer.writerow(self.tsv_row(pair))
 
     def export(self, filename: str = ""):
         if self.output_directory:
@@ -158,8 +304,8 @@ class PairingMatcher:
                 timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
                 filename = f"pairings_{timestamp}"
             output_path = os.path.join(self.output_directory, filename + ".tsv")
-            with open(output_path, "w") as fp:
-                fp.write(self.pairings_to_tsv())
+            with open(output_path, "w", newline="") as fp:
+                self.write_tsv(fp)
 
     def __call__(
         self,
@@ -1,4 +1,5 @@
 from .processor import PreprocessorConfig, Preprocessor
+from .automaton import AhoCorasick, load_replacements
 
 from typing import List, Dict, Any, Union
 from string import punctuation
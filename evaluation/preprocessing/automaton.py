@@ -0,0 +1,123 @@
+import json
+from collections import deque
+from typing import Dict, List, Tuple
+
+
+def load_replacements(path: str) -> Dict[str, str]:
+    """Load `variant -> canonical` replacements from a JSON object or a TSV file.
+
+    TSV lines are `variant<TAB>canonical`; empty lines and lines starting with `#` are ignored.
+    """
+    if path.endswith(".json"):
+        with open(path, "r") as fp:
+            return json.load(fp)
+
+    replacements = {}
+    with open(path, "r") as fp:
+        for line in fp:
+            line = line.rstrip("\n")
+            if not line.strip() or line.lstrip().startswith("#"):
+                continue
+            variant, canonical = line.split("\t", 1)
+            replacements[variant.strip()] = canonical.strip()
+    return replacements
+
+
+class AhoCorasick:
+    """Multi-pattern automaton applying many whole-word replacements in one pass over a text.
+
+    Matches are found with the Aho-Corasick automaton (goto, failure and dictionary suffix
+    links), then applied leftmost-longest without overlaps, so e.g. "twice a day" wins over
+    "a day". A match must start and end on word boundaries (non alphanumeric or text edge).
+    """
+
+    def __init__(self, replacements: Dict[str, str], lowercase: bool = True):
+        self.lowercase = lowercase
+        self.goto: List[Dict[str, int]] = [{}]
+        self.fail: List[int] = [0]
+        self.output: List[Tuple[int, str]] = [None]
+        self.dict_link: List[int] = [0]
+        for variant, canonical in replacements.items():
+            if lowercase:
+                variant = variant.lower()
+            if variant:
+                self._add(variant, canonical)
+        self._build_links()
+
+    @classmethod
+    def from_path(cls, path: str, lowercase: bool = True) -> "AhoCorasick":
+        return cls(load_replacements(path), lowercase=lowercase)
+
+    def __len__(self) -> int:
+        return sum(1 for o in self.output if o is not None)
+
+    def _add(self, pattern: str, replacement: str):
+        state = 0
+        for ch in pattern:
+            nxt = self.goto[state].get(ch)
+            if nxt is None:
+                nxt = len(self.goto)
+                self.goto[state][ch] = nxt
+                self.goto.append({})
+                self.fail.append(0)
+                self.output.append(None)
+                self.dict_link.append(0)
+            state = nxt
+        self.output[state] = (len(pattern), replacement)
+
+    def _build_links(self):
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self.goto[state].items():
+                queue.append(nxt)
+                f = self.fail[state]
+                while f and ch not in self.goto[f]:
+                    f = self.fail[f]
+                self.fail[nxt] = self.goto[f].get(ch, 0)
+                target = self.fail[nxt]
+                self.dict_link[nxt] = target if self.output[target] is not None else self.dict_link[target]
+
+    @staticmethod
+    def _is_boundary(text: str, start: int, end: int) -> bool:
+        return (start == 0 or not text[start - 1].isalnum()) and (end == len(text) or not text[end].isalnum())
+
+    def find(self, text: str) -> List[Tuple[int, int, str]]:
+        """All word-bounded matches as `(start, end, replacement)`."""
+        matches = []
+        goto, fail, output, dict_link = self.goto, self.fail, self.output, self.dict_link
+        state = 0
+        for i, ch in enumerate(text):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            s = state if output[state] is not None else dict_link[state]
+            while s:
+                length, replacement = output[s]
+                start = i + 1 - length
+                if self._is_boundary(text, start, i + 1):
+                    matches.append((start, i + 1, replacement))
+                s = dict_link[s]
+        return matches
+
+    def replace(self, text: str) -> str:
+        source = text.lower() if self.lowercase else text
+        if len(source) != len(text):
+            # Rare case-mapping changing lengths: fall back to the lowercased text.
+            text = source
+        matches = self.find(source)
+        if not matches:
+            return text
+        matches.sort(key=lambda m: (m[0], m[0] - m[1]))
+        pieces, position = [], 0
+        for start, end, replacement in matches:
+            if start < position:
+                continue
+            pieces.append(text[position:start])
+            pieces.append(replacement)
+            position = end
+        pieces.append(text[position:])
+        return "".join(pieces)
+
+    def __call__(self, text: str) -> str:
+        return self.replace(text)
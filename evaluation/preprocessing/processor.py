@@ -4,6 +4,7 @@ import re
 from typing import List, Union
 
 from utils.stop_words import load_stop_words
+from .automaton import AhoCorasick
 
 
 @dataclass
@@ -11,6 +12,7 @@ class PreprocessorConfig:
     lowercase: bool = True
     remove_punctuation: bool = True
     stopword_path: str = ""
+    normalization_path: str = ""
     order_types_to_ignore: set = None
 
     @classmethod
@@ -30,12 +32,16 @@ class PreprocessorConfig:
 class Preprocessor(PreprocessorConfig):
     stopwords: Union[List[str], None] = None
     punctuations: str = ".,?!"
+    normalizer: Union[AhoCorasick, None] = None
 
     def __post_init__(self):
         if self.stopword_path:
             self.stopwords = load_stop_words(self.stopword_path)
         if self.remove_punctuation:
             self.table = str.maketrans("","", self.punctuations)
+        if self.normalization_path:
+            # abbreviations and units are rewritten in one pass over the text
+            self.normalizer = AhoCorasick.from_path(self.normalization_path, lowercase=self.lowercase)
         
         self.number_dash_pattern = re.compile(r'(?<=\d)-')
 
@@ -66,6 +72,8 @@ class Preprocessor(PreprocessorConfig):
             new_t = self._lowercasing(new_t)
         if self.remove_punctuation:
             new_t = self._remove_punctuation(new_t)
+        if self.normalizer is not None:
+            new_t = self.normalizer(new_t)
         if self.stopwords:
             new_t = self._stopword_removal(new_t)
         
@@ -91,7 +99,11 @@ class Preprocessor(PreprocessorConfig):
 
     @classmethod
     def from_config(cls, config: PreprocessorConfig) -> "Preprocessor":
-        return cls(lowercase=config.lowercase, stopword_path=config.stopword_path)
+        return cls(
+            lowercase=config.lowercase,
+            stopword_path=config.stopword_path,
+            normalization_path=config.normalization_path,
+        )
 
     @classmethod
     def from_json_path(cls, path: str) -> "Preprocessor":
@@ -0,0 +1 @@
+from .sampler import source_prefix, order_type_mix, stratify, stratified_sample, bootstrap_intervals, flatten_metrics
\ No newline at end of file
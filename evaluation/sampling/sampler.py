@@ -0,0 +1,106 @@
+import random
+from collections import defaultdict
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+
+def source_prefix(encounter_id: str) -> str:
+    """Data source of an encounter from its id, e.g. `acibench` or `primock57`."""
+    if "_" not in encounter_id:
+        return "other"
+    return encounter_id.split("_", 1)[0]
+
+
+def order_type_mix(orders: List[Dict[str, Any]]) -> str:
+    """Sorted set of order types of an encounter, e.g. `lab+medication`."""
+    types = sorted({str(o["order_type"]).lower() for o in orders if isinstance(o, dict) and o.get("order_type")})
+    return "+".join(types) if types else "none"
+
+
+def stratify(encounters: Dict[str, List[Dict[str, Any]]]) -> Dict[str, List[str]]:
+    """Group encounter ids by source prefix and order-type mix."""
+    strata = defaultdict(list)
+    for key, orders in encounters.items():
+        strata[f"{source_prefix(key)}/{order_type_mix(orders)}"].append(key)
+    return dict(strata)
+
+
+def allocate(
+    strata: Dict[str, List[str]], size: int, rng: Optional[random.Random] = None
+) -> Dict[str, int]:
+    """Proportional allocation of `size` samples over strata, without a per-stratum minimum.
+
+    Quotas `size * N_h / N` are rounded systematically from a random start (the midpoint
+    without `rng`): a stratum gets the floor or the ceiling of its quota, and exactly its
+    quota on average. Every encounter then has the same inclusion probability `size / N`,
+    so the pooled sample is self-weighting.
+    """
+    total = sum(len(keys) for keys in strata.values())
+    size = min(size, total)
+    if total == 0:
+        return {s: 0 for s in strata}
+    start = rng.randrange(total) if rng is not None else total // 2
+    allocation = {}
+    cumulative = 0
+    previous = start // total
+    for s, keys in strata.items():
+        cumulative += len(keys)
+        current = (size * cumulative + start) // total
+        allocation[s] = current - previous
+        previous = current
+    return allocation
+
+
+def stratified_sample(
+    strata: Dict[str, List[str]], size: int, seed: Optional[int] = None
+) -> Dict[str, List[str]]:
+    """Sample encounter ids without replacement within each stratum."""
+    rng = random.Random(seed)
+    allocation = allocate(strata, size, rng=rng)
+    return {s: rng.sample(strata[s], n) for s, n in allocation.items() if n > 0}
+
+
+def flatten_metrics(metrics: Dict[str, Any], prefix: str = "") -> Dict[str, float]:
+    """Flatten nested metric dictionaries into `a/b/c` keys with float values."""
+    output = {}
+    for k, v in metrics.items():
+        key = f"{prefix}/{k}" if prefix else k
+        if isinstance(v, dict):
+            output.update(flatten_metrics(v, key))
+        elif isinstance(v, (int, float)):
+            output[key] = float(v)
+    return output
+
+
+def bootstrap_intervals(
+    score_fn: Callable[[List[str]], Dict[str, Any]],
+    sample: Dict[str, List[str]],
+    n_boot: int = 200,
+    confidence: float = 0.95,
+    seed: Optional[int] = None,
+) -> Dict[str, Dict[str, float]]:
+    """Point estimates and bootstrap confidence bounds of a self-weighting sample.
+
+    `score_fn` maps a list of encounter ids (possibly repeated) to metrics. The sample comes
+    from `stratified_sample`, so every encounter stands for the same share of the population
+    and the pooled encounters need no weighting. Replicates resample the pooled encounters
+    with replacement: resampling within strata would give no spread to strata of one
+    encounter. Ignoring the strata and the finite population only widens the bounds.
+    """
+    rng = random.Random(seed)
+    keys = [k for stratum in sample.values() for k in stratum]
+    point = flatten_metrics(score_fn(keys))
+
+    replicates = defaultdict(list)
+    for _ in range(n_boot):
+        for name, value in flatten_metrics(score_fn(rng.choices(keys, k=len(keys)))).items():
+            replicates[name].append(value)
+
+    alpha = (1.0 - confidence) / 2
+    output = {}
+    for name, estimate in point.items():
+        values = np.asarray(replicates.get(name, [estimate]))
+        low, high = np.quantile(values, [alpha, 1.0 - alpha])
+        output[name] = {"estimate": estimate, "lower": float(low), "upper": float(high)}
+    return output
@@ -0,0 +1,81 @@
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Dict, List, Tuple
+
+import numpy as np
+from scipy import sparse
+
+
+def char_ngrams(text: str, ngram_range: Tuple[int, int]) -> List[str]:
+    """Character n-grams of a text padded with spaces, so word boundaries count."""
+    text = f" {' '.join(text.split())} "
+    low, high = ngram_range
+    return [text[i:i + n] for n in range(low, high + 1) for i in range(len(text) - n + 1)]
+
+
+@dataclass
+class CharNgramTfidf:
+    """Character n-gram TF-IDF vectorizer producing L2-normalized `scipy.sparse` rows.
+
+    Fit once on a corpus; cosine similarities between two sets of texts are then a single
+    sparse product of their matrices (see `similarity`).
+    """
+    ngram_range: Tuple[int, int] = (2, 4)
+    sublinear_tf: bool = True
+    vocabulary: Dict[str, int] = field(default_factory=dict)
+    idf: np.ndarray = None
+
+    @property
+    def fitted(self) -> bool:
+        return self.idf is not None
+
+    def _counts(self, texts: List[str], grow: bool) -> sparse.csr_matrix:
+        indptr, indices, data = [0], [], []
+        for text in texts:
+            counts = Counter(char_ngrams(text, self.ngram_range)) if text else {}
+            for gram, count in counts.items():
+                j = self.vocabulary.get(gram)
+                if j is None:
+                    if not grow:
+                        continue
+                    j = self.vocabulary[gram] = len(self.vocabulary)
+                indices.append(j)
+                data.append(count)
+            indptr.append(len(indices))
+        return sparse.csr_matrix(
+            (np.asarray(data, dtype=np.float64), np.asarray(indices, dtype=np.int64), np.asarray(indptr, dtype=np.int64)),
+            shape=(len(texts), len(self.vocabulary)),
+        )
+
+    def _weight(self, counts: sparse.csr_matrix) -> sparse.csr_matrix:
+        if self.sublinear_tf:
+            counts.data = 1.0 + np.log(counts.data)
+        weighted = counts @ sparse.diags(self.idf)
+        norms = np.sqrt(np.asarray(weighted.multiply(weighted).sum(axis=1)).ravel())
+        norms[norms == 0] = 1.0
+        return sparse.diags(1.0 / norms) @ weighted
+
+    def fit(self, texts: List[str]) -> "CharNgramTfidf":
+        self.vocabulary = {}
+        counts = self._counts(texts, grow=True)
+        df = np.bincount(counts.indices, minlength=len(self.vocabulary))
+        self.idf = np.log((1.0 + len(texts)) / (1.0 + df)) + 1.0
+        return self
+
+    def transform(self, texts: List[str]) -> sparse.csr_matrix:
+        if not self.fitted:
+            raise ValueError("CharNgramTfidf must be fitted before transform.")
+        return sparse.csr_matrix(self._weight(self._counts(texts, grow=False)))
+
+    def fit_transform(self, texts: List[str]) -> sparse.csr_matrix:
+        return self.fit(texts).transform(texts)
+
+    @staticmethod
+    def similarity(a: sparse.csr_matrix, b: sparse.csr_matrix) -> np.ndarray:
+        """Dense cosine similarity matrix between the rows of two normalized matrices."""
+        return (a @ b.T).toarray()
+
+    @staticmethod
+    def paired_similarity(a: sparse.csr_matrix, b: sparse.csr_matrix) -> np.ndarray:
+        """Cosine similarity between aligned rows of two normalized matrices."""
+        return np.asarray(a.multiply(b).sum(axis=1)).ravel()
@@ -0,0 +1,107 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+
+from openai.types.chat import ChatCompletion
+
+
+def is_sampled(settings):
+    """Whether completions are sampled, so that different runids must not share responses."""
+    return settings.get("temperature", 0.0) > 0.0 or settings.get("n", 1) > 1
+
+
+class ResponseCache:
+    """On-disk cache of chat completions in a SQLite file.
+
+    Responses are keyed by a hash of the model, deployment, execution settings, prompt,
+    example and transcript, plus the runid when the settings sample. When the stored
+    responses exceed `max_bytes`, the least recently used ones are evicted. In `offline`
+    mode the cache only replays: misses are not sent to the API.
+    """
+
+    def __init__(self, path, deployment=None, max_bytes=None, offline=False):
+        directory = os.path.dirname(path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        self.path = path
+        self.deployment = deployment
+        self.max_bytes = max_bytes
+        self.offline = offline
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self.connection = sqlite3.connect(path)
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, response TEXT NOT NULL, size INTEGER NOT NULL, "
+            "created REAL NOT NULL, accessed REAL NOT NULL)"
+        )
+        self.connection.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)")
+        self.connection.commit()
+        self.size = self.connection.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    def key(self, model, settings, prompt, transcript, example=None, runid=None):
+        content = {
+            "model": model,
+            "deployment": self.deployment,
+            "settings": settings,
+            "prompt": prompt,
+            "example": example,
+            "transcript": transcript,
+            "runid": runid if is_sampled(settings) else None,
+        }
+        return hashlib.sha256(json.dumps(content, sort_keys=True).encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        row = self.connection.execute("SELECT response FROM responses WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.connection.execute("UPDATE responses SET accessed = ? WHERE key = ?", (time.time(), key))
+        self.connection.commit()
+        return ChatCompletion.model_validate_json(row[0])
+
+    def put(self, key, response):
+        data = response.model_dump_json()
+        size = len(data.encode("utf-8"))
+        now = time.time()
+        previous = self.connection.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+        self.connection.execute(
+            "INSERT OR REPLACE INTO responses (key, response, size, created, accessed) VALUES (?, ?, ?, ?, ?)",
+            (key, data, size, now, now),
+        )
+        self.size += size - (previous[0] if previous else 0)
+        self.evict()
+        self.connection.commit()
+
+    def evict(self):
+        """Drop least recently used responses until the cache fits in `max_bytes`."""
+        if self.max_bytes is None or self.size <= self.max_bytes:
+            return
+        rows = self.connection.execute("SELECT key, size FROM responses ORDER BY accessed ASC")
+        to_delete = []
+        for key, size in rows:
+            if self.size <= self.max_bytes:
+                break
+            to_delete.append((key,))
+            self.size -= size
+        self.connection.executemany("DELETE FROM responses WHERE key = ?", to_delete)
+        self.evictions += len(to_delete)
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "evictions": self.evictions,
+            "entries": self.connection.execute("SELECT COUNT(*) FROM responses").fetchone()[0],
+            "bytes": self.size,
+        }
+
+    def close(self):
+        self.connection.close()
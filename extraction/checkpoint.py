@@ -0,0 +1,64 @@
+import os
+import json
+
+
+def get_checkpoint_path(output_path, runid=None):
+    """JSONL checkpoint next to the final output, e.g. `results/generated_orders_runid1.jsonl`."""
+    base, _ = os.path.splitext(output_path)
+    if runid is not None:
+        base = f"{base}_runid{runid}"
+    return f"{base}.jsonl"
+
+
+class Checkpoint:
+    """Append-only JSONL log of extraction results, one line per encounter.
+
+    Lines are `{"id": ..., "orders": [...], "error": null | "model" | "parsing"}` and are
+    flushed as soon as an encounter finishes, so an interrupted run loses at most the
+    encounters in flight. The last line of an encounter wins.
+    """
+
+    def __init__(self, path, resume=False):
+        directory = os.path.dirname(path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        self.path = path
+        if not resume and os.path.exists(path):
+            os.remove(path)
+        self.fp = open(path, "a")
+        # a crash may have left a partial last line, start the next record on a new one
+        if self.fp.tell() > 0:
+            with open(path, "rb") as f:
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b"\n":
+                    self.fp.write("\n")
+
+    def records(self):
+        """Records of the checkpoint, skipping a line truncated by a crash."""
+        if not os.path.exists(self.path):
+            return {}
+        records = {}
+        with open(self.path, "r") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                records[record["id"]] = record
+        return records
+
+    def completed(self):
+        """Ids of the encounters extracted without error; failed ones are retried on resume."""
+        return {k for k, record in self.records().items() if record.get("error") is None}
+
+    def append(self, encounter_id, orders, error=None):
+        self.fp.write(json.dumps({"id": encounter_id, "orders": orders, "error": error}) + "\n")
+        self.fp.flush()
+
+    def compact(self, encounter_ids):
+        """Orders per encounter in the format of the final output, in `encounter_ids` order."""
+        records = self.records()
+        return {k: records[k]["orders"] if k in records else [] for k in encounter_ids}
+
+    def close(self):
+        self.fp.close()
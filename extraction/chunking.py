@@ -0,0 +1,93 @@
+from dataclasses import dataclass
+from typing import List
+
+import numpy as np
+from scipy.optimize import linear_sum_assignment
+
+from evaluation.order import Order
+from extraction.consensus import order_similarity, DEFAULT_PAIRING_THRESHOLD
+
+DEFAULT_WINDOW_OVERLAP = 10
+
+
+@dataclass
+class Window:
+    """Consecutive turns of a transcript, line `k` of the window text being `turn_ids[k - 1]`."""
+    turn_ids: List[int]
+    text: str
+
+    def remap(self, orders):
+        """Replace the window line numbers of the orders' provenance by transcript turn ids,
+        dropping lines outside of the window."""
+        for order in orders:
+            provenance = []
+            for line in order.provenance or []:
+                try:
+                    line = int(line)
+                except (TypeError, ValueError):
+                    continue
+                if 1 <= line <= len(self.turn_ids):
+                    provenance.append(self.turn_ids[line - 1])
+            order.provenance = provenance
+        return orders
+
+
+def split_windows(turns, window_turns, overlap=DEFAULT_WINDOW_OVERLAP, render=None):
+    """Overlapping windows of `window_turns` turns, each sharing `overlap` turns with the next.
+
+    `turns` are sorted by turn id and `render` turns a list of turns into the window text.
+    """
+    if overlap >= window_turns:
+        raise ValueError("The window overlap must be smaller than the window.")
+    step = window_turns - overlap
+    windows = []
+    for start in range(0, max(len(turns) - overlap, 1), step):
+        window = turns[start:start + window_turns]
+        windows.append(Window([turn["turn_id"] for turn in window], render(window)))
+    return windows
+
+
+def duplicate_score(a, b, shared_turns, threshold=DEFAULT_PAIRING_THRESHOLD):
+    """Score of two orders of different windows being the same order, 0 if they are not.
+
+    They must have similar descriptions of the same type and either cite a common turn or
+    only cite turns of the windows' overlap; citing a common turn scores higher.
+    """
+    similarity = order_similarity(a, b)
+    if similarity < threshold:
+        return 0.0
+    cited_a, cited_b = set(a.provenance), set(b.provenance)
+    if cited_a & cited_b:
+        return 1.0 + similarity
+    if cited_a and cited_b and cited_a <= shared_turns and cited_b <= shared_turns:
+        return similarity
+    return 0.0
+
+
+def merge_window_orders(windows, window_orders, threshold=DEFAULT_PAIRING_THRESHOLD):
+    """Orders of a transcript from the (remapped) orders of its windows.
+
+    The orders of each window are paired one to one with the orders kept from the previous
+    windows (optimal assignment on `duplicate_score`). A paired order is a duplicate: it is
+    dropped and its provenance added to the kept one. Orders of the same window are never
+    merged.
+    """
+    merged = []
+    for j, orders in enumerate(window_orders):
+        turns_j = set(windows[j].turn_ids)
+        paired = set()
+        if merged and orders:
+            scores = np.array([
+                [duplicate_score(previous, order, turns_j & set(windows[i].turn_ids), threshold) for order in orders]
+                for i, previous in merged
+            ])
+            for r, c in zip(*linear_sum_assignment(scores, maximize=True)):
+                if scores[r, c] > 0:
+                    previous = merged[r][1]
+                    previous.provenance = sorted(set(previous.provenance) | set(orders[c].provenance))
+                    paired.add(c)
+        merged.extend(
+            (j, Order(order.description, order.order_type, order.reason, list(order.provenance)))
+            for c, order in enumerate(orders) if c not in paired
+        )
+    return [order for _, order in merged]
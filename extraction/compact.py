@@ -0,0 +1,22 @@
+COMPACT_INSTRUCTIONS = (
+    "In the transcript above, consecutive sentences of a speaker are on one line and every "
+    "sentence is preceded by its number in brackets, e.g. [12]. The provenance is the list of "
+    "the numbers of the sentences the order is extracted from."
+)
+
+
+def render_compact(turns):
+    """Transcript text with one speaker tag per run of same-speaker turns.
+
+    Turns are numbered from 1 in order, `[DOCTOR] [1] First sentence. [2] Second one.`, so
+    that a returned number `k` is the turn `turns[k - 1]` (see `chunking.Window.remap`).
+    """
+    lines = []
+    speaker = None
+    for k, turn in enumerate(turns, 1):
+        if turn["speaker"] != speaker:
+            speaker = turn["speaker"]
+            lines.append(f"[{speaker}]")
+        lines[-1] += f" [{k}] {turn['transcript']}"
+    return "\n".join(lines)
+
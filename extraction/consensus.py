@@ -0,0 +1,82 @@
+import re
+import math
+
+import numpy as np
+from scipy.optimize import linear_sum_assignment
+
+from evaluation.order import Order
+
+WORD_PATTERN = re.compile(r"[a-z0-9]+")
+DEFAULT_MIN_AGREEMENT = 0.5
+DEFAULT_PAIRING_THRESHOLD = 0.5
+
+
+def description_words(order):
+    return set(WORD_PATTERN.findall((order.description or "").lower()))
+
+
+def order_similarity(a, b):
+    """Symmetric word overlap of the descriptions (Dice), 0 across order types."""
+    if a.order_type != b.order_type:
+        return 0.0
+    words_a, words_b = description_words(a), description_words(b)
+    if not words_a and not words_b:
+        return 1.0 if a.description == b.description else 0.0
+    return 2.0 * len(words_a & words_b) / (len(words_a) + len(words_b))
+
+
+def cluster_orders(samples, threshold=DEFAULT_PAIRING_THRESHOLD):
+    """Group the orders of several samples into clusters of the same order.
+
+    Each sample is paired to the existing clusters (represented by their first order) with
+    an optimal assignment, pairs below `threshold` are rejected and unpaired orders open
+    new clusters. A cluster holds at most one order per sample.
+    """
+    clusters = []
+    for orders in samples:
+        if clusters and orders:
+            similarity = np.array([[order_similarity(c[0], o) for o in orders] for c in clusters])
+            rows, cols = linear_sum_assignment(similarity, maximize=True)
+            paired = set()
+            for r, c in zip(rows, cols):
+                if similarity[r, c] >= threshold:
+                    clusters[r].append(orders[c])
+                    paired.add(c)
+            clusters.extend([o] for i, o in enumerate(orders) if i not in paired)
+        else:
+            clusters.extend([o] for o in orders)
+    return clusters
+
+
+def merge_cluster(cluster):
+    """Consensus order of a cluster: the medoid's fields, with the provenance of all members."""
+    if len(cluster) == 1:
+        medoid = cluster[0]
+    else:
+        support = [sum(order_similarity(a, b) for b in cluster) for a in cluster]
+        medoid = cluster[int(np.argmax(support))]
+    provenance = []
+    for order in [medoid] + cluster:
+        for turn in order.provenance or []:
+            if turn not in provenance:
+                provenance.append(turn)
+    return Order(medoid.description, medoid.order_type, medoid.reason, provenance)
+
+
+def min_votes(num_samples, min_agreement=DEFAULT_MIN_AGREEMENT):
+    """Samples an order must be in to be kept, out of `num_samples` requested."""
+    return max(1, math.ceil(min_agreement * num_samples))
+
+
+def consensus_orders(samples, min_agreement=DEFAULT_MIN_AGREEMENT, threshold=DEFAULT_PAIRING_THRESHOLD, num_samples=None):
+    """Vote over the orders extracted in several samples of the same encounter.
+
+    Orders are paired across samples (`cluster_orders`) and an order is kept when it is in
+    at least `min_votes(num_samples, min_agreement)` samples, e.g. 2 of 3 with the default.
+    `num_samples` is the number of samples requested (by default `len(samples)`), so that
+    samples that could not be parsed count as votes against every order.
+    """
+    if not samples:
+        return []
+    votes = min_votes(len(samples) if num_samples is None else num_samples, min_agreement)
+    return [merge_cluster(c) for c in cluster_orders(samples, threshold) if len(c) >= votes]
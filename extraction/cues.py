@@ -0,0 +1,132 @@
+import os
+import re
+import json
+
+DEFAULT_VOCABULARY_PATH = os.path.join(os.path.dirname(__file__), "..", "data", "orders_data.json")
+DEFAULT_CUE_CONTEXT = 3
+STOP_WORDS_PATH = os.path.join(os.path.dirname(__file__), "..", "evaluation", "preprocessing", "nltk_english.txt")
+WORD_PATTERN = re.compile(r"[a-z][a-z0-9\-]+")
+
+# phrases announcing an order, whatever is ordered
+CUE_PATTERNS = [
+    r"order(?:s|ed|ing)?",
+    r"prescri\w*",
+    r"refills?",
+    r"labs?",
+    r"blood ?work",
+    r"x-?rays?",
+    r"follow[- ]?up",
+    r"schedul\w*",
+    r"refer(?:ral|red|ring)?",
+    r"appointments?",
+    r"milligrams?",
+    r"\d+ ?mg",
+    r"mri|ct|cat scan|ultrasound|echo\w*|ekg|ecg|scans?",
+    r"tests?|testing|panel|profile|titers?|imaging|biopsy|culture",
+    r"physical therapy",
+    r"(?:start|put) you on",
+    # common drug name stems, for drugs absent from the vocabulary
+    r"\w+(?:pril|olol|statin|sartan|mycin|cillin|cycline|floxacin|prazole|dipine|formin|azepam|oxetine|triptan)",
+    r"see (?:you|him|her|them)(?: back| again| in)?(?: \w+){0,3} (?:days?|weeks?|months?)",
+    r"come back",
+]
+
+# words of order descriptions too common in dialog to signal an order
+GENERIC_WORDS = {
+    "one", "two", "three", "four", "five", "six", "seven", "eight", "nine", "ten", "eleven", "twelve",
+    "fifteen", "twenty", "thirty", "forty", "fifty", "sixty", "seventy", "eighty", "ninety", "hundred",
+    "day", "days", "daily", "week", "weeks", "month", "months", "year", "years", "hour", "hours",
+    "today", "morning", "night", "time", "times", "every", "once", "twice", "couple", "needed",
+    "until", "about", "back", "come", "see", "take", "stop", "right", "left", "with",
+    "get", "like", "may", "next", "first", "second", "another", "around", "point", "per", "add", "start",
+    "return", "review", "following", "gone", "complete", "function", "levels", "middle", "portion", "zero",
+    "afternoon", "clock", "food", "resolved", "increase", "beforehand", "january", "february", "march",
+    "april", "june", "july", "august", "september", "october", "november", "december",
+    # body parts are discussed throughout a visit, not only when ordering
+    "chest", "heart", "knee", "elbow", "eye", "finger", "kidney", "kidneys", "artery",
+}
+
+
+def load_stop_words(path=STOP_WORDS_PATH):
+    with open(path, "r") as f:
+        return {line.strip() for line in f if line.strip()}
+
+
+def vocabulary_from_orders(data_path=DEFAULT_VOCABULARY_PATH, dataset="train", min_length=3):
+    """Words of the expected order descriptions of a split, without stop and generic words."""
+    with open(data_path, "r") as f:
+        data = json.load(f)
+    excluded = load_stop_words() | GENERIC_WORDS
+    vocabulary = set()
+    for encounter in data[dataset]:
+        for order in encounter.get("expected_orders", []):
+            for word in WORD_PATTERN.findall((order.get("description") or "").lower()):
+                if len(word) >= min_length and word not in excluded:
+                    vocabulary.add(word)
+    return vocabulary
+
+
+class CueDetector:
+    """Local pre-pass finding the turns of a transcript that may place an order.
+
+    A turn is a cue if one of its words is in the vocabulary (a set lookup) or if it matches
+    the cue patterns, compiled into a single regular expression. The selected turns are the
+    cues with `context` turns around them.
+    """
+
+    def __init__(self, vocabulary=(), patterns=CUE_PATTERNS):
+        self.vocabulary = frozenset(vocabulary)
+        self.pattern = re.compile(r"\b(?:" + "|".join(f"(?:{p})" for p in patterns) + r")\b", re.IGNORECASE)
+
+    @classmethod
+    def from_orders(cls, data_path=DEFAULT_VOCABULARY_PATH, dataset="train"):
+        return cls(vocabulary_from_orders(data_path, dataset))
+
+    def is_cue(self, text):
+        if self.pattern.search(text):
+            return True
+        return not self.vocabulary.isdisjoint(WORD_PATTERN.findall(text.lower()))
+
+    def select(self, turns, context=DEFAULT_CUE_CONTEXT):
+        """The turns within `context` turns of a cue, in transcript order."""
+        keep = [False] * len(turns)
+        for i, turn in enumerate(turns):
+            if self.is_cue(turn["transcript"]):
+                for j in range(max(0, i - context), min(len(turns), i + context + 1)):
+                    keep[j] = True
+        return [turn for turn, kept in zip(turns, keep) if kept]
+
+
+def audit_cue_recall(detector, turns, truth_encounters, context=DEFAULT_CUE_CONTEXT):
+    """Orders of the truth that the selected turns would lose.
+
+    An order is covered if one of its provenance turns is selected, and fully covered if
+    all are. Also reports the fraction of turns and characters that would be sent.
+    """
+    num_orders = covered = fully_covered = 0
+    num_turns = num_selected = num_chars = num_selected_chars = 0
+    lost = []
+    for key, orders in truth_encounters.items():
+        encounter_turns = turns.get(key, [])
+        selected = detector.select(encounter_turns, context)
+        selected_ids = {turn["turn_id"] for turn in selected}
+        num_turns += len(encounter_turns)
+        num_selected += len(selected)
+        num_chars += sum(len(turn["transcript"]) for turn in encounter_turns)
+        num_selected_chars += sum(len(turn["transcript"]) for turn in selected)
+        for order in orders:
+            provenance = set(order.get("provenance") or [])
+            num_orders += 1
+            if provenance & selected_ids:
+                covered += 1
+                fully_covered += provenance <= selected_ids
+            else:
+                lost.append({"id": key, "description": order.get("description"), "provenance": order.get("provenance")})
+    return {
+        "orders": num_orders,
+        "recall": covered / num_orders if num_orders else 1.0,
+        "full_recall": fully_covered / num_orders if num_orders else 1.0,
+        "turns_sent": num_selected / num_turns if num_turns else 0.0,
+        "chars_sent": num_selected_chars / num_chars if num_chars else 0.0,
+        "lost_orders": lost,
+    }
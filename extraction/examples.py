@@ -0,0 +1,148 @@
+import os
+import re
+import json
+import pickle
+import random
+import hashlib
+from collections import Counter
+
+import numpy as np
+
+from extraction.transcripts import get_text_from_turns
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+# bumped whenever the pickled store changes, so that older pickles are rebuilt
+INDEX_VERSION = 1
+
+
+def tokenize(text):
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+class ExampleStore:
+    """Few-shot examples preloaded from a dataset split, with a BM25 inverted index.
+
+    The split is read once; each term maps to the documents containing it and their
+    precomputed BM25 term weights, so scoring a query is one vector addition per distinct
+    query term. The store is pickled in a cache directory (`<data file>.<dataset>.bm25.pkl`)
+    and reused as long as the content of the split and `INDEX_VERSION` are unchanged.
+    """
+
+    def __init__(self, ids, transcripts, orders, k1=1.5, b=0.75):
+        self.ids = list(ids)
+        self.transcripts = list(transcripts)
+        self.orders = list(orders)
+        self.positions = {k: i for i, k in enumerate(self.ids)}
+        self.k1 = k1
+        self.b = b
+        self._build_index()
+
+    def _build_index(self):
+        counts = [Counter(tokenize(t)) for t in self.transcripts]
+        lengths = np.asarray([sum(c.values()) for c in counts], dtype=np.float32)
+        avg_length = lengths.mean() if len(lengths) else 0.0
+        postings = {}
+        for doc, c in enumerate(counts):
+            for term, tf in c.items():
+                postings.setdefault(term, ([], []))
+                postings[term][0].append(doc)
+                postings[term][1].append(tf)
+
+        n = len(self.ids)
+        self.index = {}
+        for term, (docs, tfs) in postings.items():
+            docs = np.asarray(docs, dtype=np.int32)
+            tfs = np.asarray(tfs, dtype=np.float32)
+            idf = np.log(1.0 + (n - len(docs) + 0.5) / (len(docs) + 0.5))
+            norm = self.k1 * (1.0 - self.b + self.b * lengths[docs] / avg_length)
+            self.index[term] = (docs, (idf * tfs * (self.k1 + 1.0) / (tfs + norm)).astype(np.float32))
+
+    @staticmethod
+    def read_split(data_path, dataset="train"):
+        with open(data_path, "r") as f:
+            return json.load(f)[dataset]
+
+    @staticmethod
+    def split_digest(split):
+        """Hash of the content of a split, whatever the file it was read from."""
+        return hashlib.sha256(json.dumps(split, sort_keys=True).encode("utf-8")).hexdigest()
+
+    @classmethod
+    def from_data(cls, data_path, dataset="train"):
+        return cls.from_split(cls.read_split(data_path, dataset))
+
+    @classmethod
+    def from_split(cls, split):
+        encounters = [e for e in split if "transcript" in e]
+        return cls(
+            [e["id"] for e in encounters],
+            [get_text_from_turns(e["transcript"]) for e in encounters],
+            [e["expected_orders"] for e in encounters],
+        )
+
+    @staticmethod
+    def index_path(cache_dir, data_path, dataset="train"):
+        return os.path.join(cache_dir, f"{os.path.basename(data_path)}.{dataset}.bm25.pkl")
+
+    @classmethod
+    def load(cls, data_path, dataset="train", cache_dir=None, index_path=None):
+        """Load the store persisted in `cache_dir`, rebuilding (and saving) it if the split or
+        the format changed. Without `cache_dir` or `index_path`, the store is only built.
+
+        The pickle is keyed on a hash of the split, so it is rebuilt when the data changes even
+        if the file keeps its size and modification time.
+        """
+        if index_path is None and cache_dir is None:
+            return cls.from_data(data_path, dataset)
+        index_path = index_path or cls.index_path(cache_dir, data_path, dataset)
+        split = cls.read_split(data_path, dataset)
+        signature = (INDEX_VERSION, dataset, cls.split_digest(split))
+        if os.path.exists(index_path):
+            try:
+                with open(index_path, "rb") as f:
+                    stored_signature, store = pickle.load(f)
+            except (pickle.UnpicklingError, EOFError, AttributeError, ImportError, ValueError, TypeError):
+                stored_signature = None
+            if stored_signature == signature:
+                return store
+
+        store = cls.from_split(split)
+        index_dir = os.path.dirname(index_path)
+        if index_dir and not os.path.exists(index_dir):
+            os.makedirs(index_dir)
+        with open(index_path, "wb") as f:
+            pickle.dump((signature, store), f, protocol=pickle.HIGHEST_PROTOCOL)
+        return store
+
+    def __len__(self):
+        return len(self.ids)
+
+    def scores(self, text):
+        scores = np.zeros(len(self.ids), dtype=np.float32)
+        for term in set(tokenize(text)):
+            posting = self.index.get(term)
+            if posting is not None:
+                docs, weights = posting
+                scores[docs] += weights
+        return scores
+
+    def retrieve(self, text, k=1, exclude=None):
+        """The `k` most similar examples as `(transcript, orders)`, best first.
+
+        `exclude` is an encounter id never returned, e.g. the target itself.
+        """
+        scores = self.scores(text)
+        if exclude in self.positions:
+            scores[self.positions[exclude]] = -np.inf
+        k = min(k, len(self.ids) - (exclude in self.positions))
+        if k <= 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [(self.transcripts[i], self.orders[i]) for i in top]
+
+    def sample(self, exclude=None):
+        """A random example, from another encounter than `exclude`."""
+        candidates = [i for i, k in enumerate(self.ids) if k != exclude]
+        i = random.choice(candidates)
+        return self.transcripts[i], self.orders[i]
@@ -1,11 +1,21 @@
 import os
 import json
-import random
+import asyncio
 import argparse
 from tqdm import tqdm
-from openai import AzureOpenAI, APIConnectionError
+from openai import AsyncAzureOpenAI, APIConnectionError, APIStatusError, RateLimitError
 
 from evaluation.order import Order
+from extraction.rate_limit import AdaptiveRateLimiter, estimate_tokens, get_retry_after, backoff_delay
+from extraction.cache import ResponseCache
+from extraction.checkpoint import Checkpoint, get_checkpoint_path
+from extraction.examples import ExampleStore
+from extraction.transcripts import get_text_from_turns
+from extraction.consensus import consensus_orders, min_votes, DEFAULT_MIN_AGREEMENT
+from extraction.chunking import Window, split_windows, merge_window_orders, DEFAULT_WINDOW_OVERLAP
+from extraction.compact import render_compact, COMPACT_INSTRUCTIONS
+from extraction.cues import CueDetector, audit_cue_recall, DEFAULT_CUE_CONTEXT, DEFAULT_VOCABULARY_PATH
+from extraction.packing import pack_transcripts, render_pack, split_packed_content, DEFAULT_PACK_MAX_ENCOUNTERS
 
 from azure.identity import (
     AzureCliCredential,
@@ -20,6 +30,9 @@ DEFAULT_PTOMPT_PATH = "extraction/basic_prompt.txt"
 DEFAULT_DATA_PATH = "data/orders_data_transcript.json"
 DEFAULT_OUT_PATH = "results/generated_orders.json"
 DEFAULT_EXAMPLE_ID = "acibench_D2N093_virtassist_clinicalnlp_taskB_test1"
+DEFAULT_CONCURRENCY = 8
+DEFAULT_MAX_ATTEMPTS = 8
+DEFAULT_SAMPLING_TEMPERATURE = 0.7
 DEFAULT_EXECUTION_SETTINGS = {
     "max_tokens": 4320,
     "temperature": 0.0,
@@ -44,21 +57,7 @@ def get_token_credential():
     )
     return chained_credential
 
-def load_example(data_path, encounter_id=None, dataset="train"):
-    with open(data_path, 'r') as f:
-        data = json.loads(f.read())
-    
-    data_subset = data[dataset]
-    if encounter_id is None:
-        encounter_id = random.choice(data_subset)["id"]
-
-    single_encounter = [elem for elem in data_subset if elem["id"] == encounter_id][0]
-    transcript = get_text_from_turns(single_encounter["transcript"])
-    orders = single_encounter["expected_orders"]
-
-    return transcript, orders
-
-def get_aoai_model_response(client, prompt, transcript, model="gpt-4o", add_example=None):
+def build_messages(prompt, transcript, model="gpt-4o", add_example=None, num_samples=1):
     # build the messages
     
     if model.startswith("gpt-4"):
@@ -68,46 +67,137 @@ def get_aoai_model_response(client, prompt, transcript, model="gpt-4o", add_exam
         settings = DEFAULT_REASONING_EXECUTION_SETTINGS.copy()
         role = "user"
 
+    # self-consistency: several completions in one request, greedy decoding would repeat one
+    if num_samples > 1:
+        settings["n"] = num_samples
+        if settings["temperature"] == 0.0:
+            settings["temperature"] = DEFAULT_SAMPLING_TEMPERATURE
+            settings["top_p"] = 1.0
+
     # base message
     messages = [
         {"role": role, "content": f"{prompt}\n{transcript}"},
     ]
     
-    # add example if provided
+    # add examples if provided, a single (transcript, orders) pair or a list of them
     if add_example is not None:
-        transcript, orders = add_example
-        extra_message = {
-            "role": role,
-            "content": (
-                "Example of an encounter with the corresponding output we are looking for:\n"
-                "Here is the transcript:\n"
-                f"{transcript}\n"
-                "------------------------\n"
-                "Here are the expected orders:\n"
-                f"{json.dumps(orders, indent=4)}\n"
-            ),
-        }
-    
-        messages.append(extra_message)
+        examples = [add_example] if isinstance(add_example, tuple) else add_example
+        for transcript, orders in examples:
+            extra_message = {
+                "role": role,
+                "content": (
+                    "Example of an encounter with the corresponding output we are looking for:\n"
+                    "Here is the transcript:\n"
+                    f"{transcript}\n"
+                    "------------------------\n"
+                    "Here are the expected orders:\n"
+                    f"{json.dumps(orders, indent=4)}\n"
+                ),
+            }
+            messages.append(extra_message)
 
     # add the trigger message
     messages.append({"role": role, "content": f"{TRIGGER_MESSAGE}\n"})
 
-    # call the openai client
-    try:
-        response = client.chat.completions.create(
-            model=model,
-            messages=messages,
-            **settings
-        )
-    except APIConnectionError as e:
-        return None, True
+    return messages, settings
 
-    return response, False
+async def get_aoai_model_response_async(client, prompt, transcript, model="gpt-4o", add_example=None, limiter=None, max_attempts=DEFAULT_MAX_ATTEMPTS, cache=None, runid=None, num_samples=1):
+    messages, settings = build_messages(prompt, transcript, model=model, add_example=add_example, num_samples=num_samples)
 
+    # replay a cached response if any, offline mode never calls the api
+    if cache is not None:
+        key = cache.key(model, settings, prompt, transcript, example=add_example, runid=runid)
+        response = cache.get(key)
+        if response is not None:
+            return response, False
+        if cache.offline:
+            return None, True
+
+    response, error = await create_completion_async(client, model, messages, settings, limiter=limiter, max_attempts=max_attempts)
+    if cache is not None and not error:
+        cache.put(key, response)
+    return response, error
 
-def get_orders_from_model_response(response):
-    raw_response = response.choices[0].message.content
+async def create_completion_async(client, model, messages, settings, limiter=None, max_attempts=DEFAULT_MAX_ATTEMPTS):
+    # call the async openai client, any failure is an error of this request only
+    if limiter is None:
+        try:
+            response = await client.chat.completions.create(
+                model=model,
+                messages=messages,
+                **settings
+            )
+        except Exception as e:
+            return None, True
+        return response, False
+
+    # with a limiter, 429s are retried here (not by the client) so that it can adapt;
+    # server errors, timeouts and connection errors are retried with exponential backoff
+    tokens = estimate_tokens(messages, settings)
+    client = client.with_options(max_retries=0)
+    for attempt in range(max_attempts):
+        async with limiter.slot(tokens):
+            try:
+                response = await client.chat.completions.create(
+                    model=model,
+                    messages=messages,
+                    **settings
+                )
+            except RateLimitError as e:
+                limiter.on_throttle(get_retry_after(e))
+                continue
+            except APIStatusError as e:
+                if e.status_code < 500:
+                    return None, True
+                delay = get_retry_after(e, default=backoff_delay(attempt))
+            except APIConnectionError as e:
+                # also covers APITimeoutError
+                delay = backoff_delay(attempt)
+            except Exception as e:
+                return None, True
+            else:
+                limiter.on_success()
+                return response, False
+        # wait without holding the request slot
+        await asyncio.sleep(delay)
+
+    return None, True
+
+
+def get_orders_from_model_response(response, min_agreement=DEFAULT_MIN_AGREEMENT):
+    # a single completion is returned as is, several are merged by voting
+    if len(response.choices) == 1:
+        return get_orders_from_content(response.choices[0].message.content)
+
+    samples = []
+    for choice in response.choices:
+        orders_parsed, error = get_orders_from_content(choice.message.content)
+        if not error:
+            samples.append(orders_parsed)
+    # the vote is out of the requested samples, too few parsed ones cannot reach it
+    num_samples = len(response.choices)
+    if len(samples) < min_votes(num_samples, min_agreement):
+        return None, True
+    return consensus_orders(samples, min_agreement=min_agreement, num_samples=num_samples), False
+
+def get_orders_from_packed_response(response, keys, min_agreement=DEFAULT_MIN_AGREEMENT):
+    # per encounter of the pack, as (orders, error), choices are voted on per encounter
+    choices = [split_packed_content(choice.message.content, keys, get_orders_from_content) for choice in response.choices]
+    if len(choices) == 1:
+        return choices[0]
+
+    results = {}
+    for key in keys:
+        samples = [parsed[key][0] for parsed in choices if not parsed[key][1]]
+        if len(samples) < min_votes(len(choices), min_agreement):
+            results[key] = (None, True)
+        else:
+            results[key] = (consensus_orders(samples, min_agreement=min_agreement, num_samples=len(choices)), False)
+    return results
+
+def get_orders_from_content(raw_response):
+    if raw_response is None:
+        return None, True
     raw_response = raw_response.strip()
     raw_response = raw_response.replace("```json", "")
     raw_response = raw_response.replace("```", "")
@@ -127,7 +217,7 @@ def get_orders_from_model_response(response):
             order_obj = Order.from_dict(order)
             orders_parsed.append(order_obj)
         except:
-            print(f"Error creating order in {fname}:\n {order}")
+            print(f"Error creating order:\n {order}")
             return None, True
     
     return orders_parsed, False
@@ -146,9 +236,11 @@ def write_orders_to_file(orders, output_path, runid=None):
     with open(output_path, 'w') as f:
         f.write(json.dumps(orders, indent=4))
 
-def get_text_from_turns(turns):
-    speaker_turns = [f"[{turn['speaker']}] {turn['transcript']}" for turn in sorted(turns, key=lambda x: x['turn_id'])]
-    return "\n".join(speaker_turns)
+def load_turns(input_path, dataset="dev"):
+    # sorted turns per encounter, for the extraction modes working on turns
+    with open(input_path, 'r') as f:
+        data = json.loads(f.read())
+    return {elem["id"]: sorted(elem["transcript"], key=lambda x: x['turn_id']) for elem in data[dataset] if "transcript" in elem}
 
 def load_transcripts(input_path, dataset="dev"):
     # check if the input file exists
@@ -173,19 +265,226 @@ def load_transcripts(input_path, dataset="dev"):
     print(f"failed to load {len(fail_transcripts)} transcripts")
     return transcripts
 
-def get_aoai_client(endpoint, deployment_name):
-    # create the openai client
-    token_provider = get_bearer_token_provider(get_token_credential(), "https://cognitiveservices.azure.com/.default")
+async def extract_orders_async(client, prompt, transcripts, model="gpt-4o", example_loader=None, concurrency=DEFAULT_CONCURRENCY, progress=True, limiter=None, cache=None, runid=None, checkpoint=None, num_samples=1, min_agreement=DEFAULT_MIN_AGREEMENT, pack_tokens=None, pack_max_encounters=DEFAULT_PACK_MAX_ENCOUNTERS, turns=None, window_turns=None, window_overlap=DEFAULT_WINDOW_OVERLAP, compact=False, cue_detector=None, cue_context=DEFAULT_CUE_CONTEXT):
+    """Extract the orders of all transcripts with at most `concurrency` requests in flight.
+
+    With a `limiter`, requests are instead scheduled by it (quota pacing, adaptive
+    concurrency and 429 retries). Each result is appended to the `checkpoint` as soon as
+    it arrives. `example_loader(fname, transcript)` returns the example(s) for a transcript.
+    With `num_samples > 1`, each request asks for that many completions and the orders found
+    in at least a `min_agreement` fraction of the parsed ones are kept.
+    With `pack_tokens`, short transcripts are packed into shared requests of at most that
+    many transcript tokens (see `extraction.packing`); the encounters failing in a pack are
+    extracted again on their own.
+    With `window_turns`, transcripts of more turns (from `turns`) are split into overlapping
+    windows extracted concurrently, and their orders merged (see `extraction.chunking`).
+    With `compact`, transcripts are rendered from `turns` by `render_compact` and the
+    returned sentence numbers are mapped back to turn ids.
+    With a `cue_detector`, only the turns around order cues are sent, and a transcript
+    without cues gets no orders without a request (see `extraction.cues`).
+    Returns the orders per transcript (in the input order)
+    and the numbers of model and parsing errors, counted as in the sequential loop.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    render = render_compact if compact else get_text_from_turns
+
+    # with cues, only the candidate turns are sent; with cues or compact transcripts, the
+    # returned numbers refer to the sent turns and are mapped back to turn ids
+    views = None
+    if cue_detector is not None:
+        turns = {fname: cue_detector.select(turns[fname], cue_context) for fname in transcripts}
+    if compact or cue_detector is not None:
+        views = {fname: Window([turn["turn_id"] for turn in turns[fname]], render(turns[fname])) for fname in transcripts}
+        transcripts = {fname: view.text for fname, view in views.items()}
+
+    def to_turn_ids(fname, orders):
+        if views is None:
+            return orders
+        return views[fname].remap(orders)
+
+    async def request(text, example):
+        if compact:
+            text = f"{text}\n\n{COMPACT_INSTRUCTIONS}"
+        if limiter is None:
+            async with semaphore:
+                return await get_aoai_model_response_async(client, prompt, text, model=model, add_example=example, cache=cache, runid=runid, num_samples=num_samples)
+        return await get_aoai_model_response_async(client, prompt, text, model=model, add_example=example, limiter=limiter, cache=cache, runid=runid, num_samples=num_samples)
+
+    async def process(fname):
+        example = example_loader(fname, transcripts[fname]) if example_loader is not None else None
+        response, error = await request(transcripts[fname], example)
+        if error:
+            return [(fname, [], "model")]
+        orders_parsed, error = get_orders_from_model_response(response, min_agreement=min_agreement)
+        if error:
+            return [(fname, [], "parsing")]
+        return [(fname, to_turn_ids(fname, orders_parsed), None)]
+
+    async def process_pack(keys):
+        if len(keys) == 1:
+            return await process(keys[0])
+        # the examples of the first (longest) encounter stand for the whole pack
+        example = example_loader(keys[0], transcripts[keys[0]]) if example_loader is not None else None
+        response, error = await request(render_pack(transcripts, keys), example)
+        parsed = {} if error else get_orders_from_packed_response(response, keys, min_agreement=min_agreement)
+        results = [(fname, to_turn_ids(fname, parsed[fname][0]), None) for fname in keys if fname in parsed and not parsed[fname][1]]
+        failed = [fname for fname in keys if fname not in parsed or parsed[fname][1]]
+        for retried in await asyncio.gather(*(process(fname) for fname in failed)):
+            results.extend(retried)
+        return results
+
+    async def process_windows(fname):
+        example = example_loader(fname, transcripts[fname]) if example_loader is not None else None
+        windows = split_windows(turns[fname], window_turns, window_overlap, render=render)
+        window_orders = []
+        errors = []
+        for response, error in await asyncio.gather(*(request(window.text, example) for window in windows)):
+            if error:
+                errors.append("model")
+                continue
+            orders_parsed, error = get_orders_from_model_response(response, min_agreement=min_agreement)
+            if error:
+                errors.append("parsing")
+                continue
+            window_orders.append(orders_parsed)
+        # an encounter missing a window is failed, so that a resumed run extracts it again
+        if errors:
+            return [(fname, [], "model" if "model" in errors else "parsing")]
+        window_orders = [window.remap(orders) for window, orders in zip(windows, window_orders)]
+        return [(fname, merge_window_orders(windows, window_orders), None)]
+
+    async def skip(fname):
+        return [(fname, [], None)]
+
+    empty_transcripts = set()
+    if cue_detector is not None:
+        empty_transcripts = {fname for fname in transcripts if not turns[fname]}
+    long_transcripts = set()
+    if window_turns:
+        long_transcripts = {fname for fname in transcripts if len(turns[fname]) > window_turns}
+    tasks = [asyncio.create_task(skip(fname)) for fname in transcripts if fname in empty_transcripts]
+    tasks += [asyncio.create_task(process_windows(fname)) for fname in transcripts if fname in long_transcripts]
+    short_transcripts = {k: v for k, v in transcripts.items() if k not in long_transcripts and k not in empty_transcripts}
+    if pack_tokens:
+        tasks += [asyncio.create_task(process_pack(keys)) for keys in pack_transcripts(short_transcripts, pack_tokens, pack_max_encounters)]
+    else:
+        tasks += [asyncio.create_task(process(fname)) for fname in short_transcripts]
+
+    all_orders = {}
+    num_errs_model = 0
+    num_errs_parsing = 0
+    with tqdm(total=len(transcripts), disable=not progress) as pbar:
+        for task in asyncio.as_completed(tasks):
+            for fname, orders_parsed, error in await task:
+                if error == "model":
+                    num_errs_model += 1
+                elif error == "parsing":
+                    num_errs_parsing += 1
+                all_orders[fname] = [order.to_dict() for order in orders_parsed]
+                if checkpoint is not None:
+                    checkpoint.append(fname, all_orders[fname], error=error)
+                pbar.update(1)
+            pbar.set_postfix(model_errs=num_errs_model, parsing_errs=num_errs_parsing, **(limiter.stats() if limiter is not None else {}))
+
+    all_orders = {fname: all_orders[fname] for fname in transcripts}
+    return all_orders, num_errs_model, num_errs_parsing
+
+def get_aoai_async_client(endpoint, deployment_name, api_key=None):
+    # an api key (e.g. for a local mock endpoint) replaces the azure ad token
+    if api_key is not None:
+        return AsyncAzureOpenAI(
+            azure_endpoint=endpoint,
+            api_key=api_key,
+            api_version=DEFAULT_API_VERSION,
+            azure_deployment=deployment_name,
+        )
 
-    # create openai client using the token provider
-    client = AzureOpenAI(
+    token_provider = get_bearer_token_provider(get_token_credential(), "https://cognitiveservices.azure.com/.default")
+    return AsyncAzureOpenAI(
         azure_endpoint=endpoint,
         azure_ad_token_provider=token_provider,
         api_version=DEFAULT_API_VERSION,
         azure_deployment=deployment_name,
     )
 
-    return client
+def get_example_loader(args):
+    # the train examples are loaded once, not re-read for every transcript
+    if not args.bm25_example:
+        store = ExampleStore.from_data(args.input_path, dataset="train")
+        print(f"loaded {len(store)} examples")
+        return lambda fname, transcript: store.sample(exclude=fname)
+
+    # the BM25 index is cached next to the response cache, or the output
+    cache_dir = os.path.dirname(args.cache_path or args.output_path)
+    store = ExampleStore.load(args.input_path, dataset="train", cache_dir=cache_dir)
+    print(f"loaded {len(store)} examples")
+    return lambda fname, transcript: store.retrieve(transcript, k=args.num_examples, exclude=fname)
+
+def run_cue_audit(args):
+    with open(args.input_path, 'r') as f:
+        data = json.loads(f.read())
+    truth_encounters = {elem["id"]: elem.get("expected_orders", []) for elem in data[args.dataset] if "transcript" in elem}
+    cue_detector = CueDetector.from_orders(args.cue_vocabulary)
+    report = audit_cue_recall(cue_detector, load_turns(args.input_path, args.dataset), truth_encounters, context=args.cue_context)
+
+    base, _ = os.path.splitext(args.output_path)
+    report_path = f"{base}_cue_audit.json"
+    output_dir = os.path.dirname(report_path)
+    if output_dir and not os.path.exists(output_dir):
+        os.makedirs(output_dir)
+    with open(report_path, 'w') as f:
+        f.write(json.dumps(report, indent=4))
+    print(f"#### Cue audit on {args.dataset}: {report['orders']} orders")
+    print(f"  --> Recall (a provenance turn sent): {report['recall']:.4f}")
+    print(f"  --> Full recall (all provenance turns sent): {report['full_recall']:.4f}")
+    print(f"  --> Turns sent: {report['turns_sent']:.4f}, characters sent: {report['chars_sent']:.4f}")
+    print(f"  --> Lost orders written to {report_path}")
+
+async def run_extraction(args, prompt, transcripts):
+    client = get_aoai_async_client(args.endpoint, args.deployment_name, api_key=args.api_key)
+    example_loader = get_example_loader(args) if args.example else None
+    turns = load_turns(args.input_path, args.dataset) if args.window_turns or args.compact or args.cues else None
+    cue_detector = CueDetector.from_orders(args.cue_vocabulary) if args.cues else None
+    limiter = AdaptiveRateLimiter(args.concurrency, tokens_per_minute=args.tpm, requests_per_minute=args.rpm)
+    cache = None
+    if args.cache_path:
+        max_bytes = int(args.cache_max_mb * 1024 * 1024) if args.cache_max_mb else None
+        cache = ResponseCache(args.cache_path, deployment=args.deployment_name, max_bytes=max_bytes, offline=args.offline)
+    elif args.offline:
+        raise ValueError("--offline replays cached responses and requires --cache_path.")
+
+    async with client:
+        for runid in args.runids:
+            print(f"#### Running order extraction for runid {runid}...")
+
+            # results are checkpointed per encounter, a resumed run skips the completed ones
+            checkpoint = Checkpoint(get_checkpoint_path(args.output_path, runid), resume=args.resume)
+            completed = checkpoint.completed() if args.resume else set()
+            pending = {k: v for k, v in transcripts.items() if k not in completed}
+            if completed:
+                print(f"  --> Resuming: {len(completed)} encounters already extracted, {len(pending)} left")
+
+            _, num_errs_model, num_errs_parsing = await extract_orders_async(
+                client, prompt, pending, model=args.model, example_loader=example_loader, concurrency=args.concurrency,
+                limiter=limiter, cache=cache, runid=runid, checkpoint=checkpoint,
+                num_samples=args.num_samples, min_agreement=args.min_agreement,
+                pack_tokens=args.pack_tokens, pack_max_encounters=args.pack_max_encounters,
+                turns=turns, window_turns=args.window_turns, window_overlap=args.window_overlap,
+                compact=args.compact, cue_detector=cue_detector, cue_context=args.cue_context
+            )
+            checkpoint.close()
+
+            all_orders = checkpoint.compact(transcripts.keys())
+            write_orders_to_file(all_orders, args.output_path, runid=runid)
+            print(f"#### Finished order extraction for runid {runid}.")
+            print(f"  --> Number of errors in model response: {num_errs_model}")
+            print(f"  --> Number of errors in parsing response: {num_errs_parsing}")
+            print(f"  --> Requests throttled (429): {limiter.num_throttled}")
+            if cache is not None:
+                print(f"  --> Response cache: {cache.stats()}")
+
+    if cache is not None:
+        cache.close()
 
 if __name__ == "__main__":
     argparser = argparse.ArgumentParser(description="Basic code to run order extraction from transcript")
@@ -198,6 +497,27 @@ if __name__ == "__main__":
     argparser.add_argument("--dataset", type=str, help="train or dev", default="dev")
     argparser.add_argument("--runids", type=int, nargs='+', default=[1], help="List of seeds to use for random operations")
     argparser.add_argument("--example", action='store_true', help="If set, will load an example transcript and orders for the model to use as a reference")
+    argparser.add_argument("--bm25_example", action='store_true', help="With --example, use the most similar train encounters (BM25) instead of a random one")
+    argparser.add_argument("--num_examples", type=int, default=1, help="Number of most similar train encounters used as examples with --bm25_example")
+    argparser.add_argument("--num_samples", type=int, default=1, help="Completions requested per transcript in one call (self-consistency), merged by voting")
+    argparser.add_argument("--min_agreement", type=float, default=DEFAULT_MIN_AGREEMENT, help="Fraction of the samples an order must appear in to be kept with --num_samples")
+    argparser.add_argument("--pack_tokens", type=int, default=None, help="Pack short transcripts into shared requests of at most this many (estimated) transcript tokens")
+    argparser.add_argument("--pack_max_encounters", type=int, default=DEFAULT_PACK_MAX_ENCOUNTERS, help="Maximum number of encounters in a packed request")
+    argparser.add_argument("--window_turns", type=int, default=None, help="Split transcripts of more turns into overlapping windows of this many turns, extracted concurrently")
+    argparser.add_argument("--window_overlap", type=int, default=DEFAULT_WINDOW_OVERLAP, help="Turns shared by consecutive windows with --window_turns")
+    argparser.add_argument("--compact", action='store_true', help="Render transcripts with one speaker tag per run of sentences and numbered sentences, to save prompt tokens")
+    argparser.add_argument("--cues", action='store_true', help="Only send the turns around lexical order cues (drug names, labs, imaging, follow up, ...)")
+    argparser.add_argument("--cue_context", type=int, default=DEFAULT_CUE_CONTEXT, help="Turns kept before and after each cue turn with --cues")
+    argparser.add_argument("--cue_vocabulary", type=str, default=DEFAULT_VOCABULARY_PATH, help="File whose train order descriptions extend the cue vocabulary")
+    argparser.add_argument("--cue_audit", action='store_true', help="Measure the orders of the dataset the cue selection would lose, without calling the API")
+    argparser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY, help="Maximum number of concurrent requests, lowered automatically on 429 responses")
+    argparser.add_argument("--tpm", type=int, default=None, help="Tokens-per-minute quota of the deployment, requests are paced to stay under it")
+    argparser.add_argument("--rpm", type=int, default=None, help="Requests-per-minute quota of the deployment")
+    argparser.add_argument("--resume", action='store_true', help="Skip the encounters already extracted in the JSONL checkpoint of each runid")
+    argparser.add_argument("--cache_path", type=str, default=None, help="SQLite file caching model responses across runs")
+    argparser.add_argument("--cache_max_mb", type=float, default=None, help="Evict least recently used cached responses above this size")
+    argparser.add_argument("--offline", action='store_true', help="Only replay cached responses, never call the API")
+    argparser.add_argument("--api_key", type=str, default=None, help="API key instead of Azure AD authentication (e.g. for a mock endpoint)")
     args = argparser.parse_args()
 
     # load the prompt and transcripts:
@@ -205,39 +525,9 @@ if __name__ == "__main__":
     with open(args.prompt_path, 'r') as f:
         prompt = f.read()
 
-    # get the openai client
-    client = get_aoai_client(args.endpoint, args.deployment_name)
-
-    # run the order extraction
-    for runid in args.runids:
-        print(f"#### Running order extraction for runid {runid}...")
-
-        all_orders = {}
-        num_errs_model = 0
-        num_errs_parsing = 0
-        for fname in tqdm(transcripts.keys()):
-            #print(f"Processing transcript {fname}...")
-
-            transcript = transcripts[fname]
-            example = load_example(args.input_path) if args.example else None
-            response, error = get_aoai_model_response(client, prompt, transcript, model=args.model, add_example=example)
-
-            if error:
-                #print(f"  --> Error getting model response for transcript {fname}")
-                num_errs_model += 1
-                orders_parsed = []
-
-            else:
-                orders_parsed, error = get_orders_from_model_response(response)
-
-                if error:
-                    orders_parsed = []
-                    num_errs_parsing += 1
-                    #print(f"  --> Error parsing response in transcript {fname}")
-
-            all_orders[fname] = [order.to_dict() for order in orders_parsed]
-
-        write_orders_to_file(all_orders, args.output_path, runid=runid)
-        print(f"#### Finished order extraction for runid {runid}.")
-        print(f"  --> Number of errors in model response: {num_errs_model}")
-        print(f"  --> Number of errors in parsing response: {num_errs_parsing}")
\ No newline at end of file
+    # audit the recall of the cue selection against the expected orders, offline
+    if args.cue_audit:
+        run_cue_audit(args)
+    else:
+        # run the order extraction, requests are sent concurrently
+        asyncio.run(run_extraction(args, prompt, transcripts))
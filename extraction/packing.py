@@ -0,0 +1,65 @@
+import json
+
+from extraction.rate_limit import CHARS_PER_TOKEN
+
+DEFAULT_PACK_TOKENS = 6000
+DEFAULT_PACK_MAX_ENCOUNTERS = 8
+PACKED_OUTPUT_INSTRUCTIONS = (
+    "The transcript above contains several independent encounters, each between "
+    "<encounter id=\"...\"> and </encounter> tags. The numbering restarts at 1 in every encounter.\n"
+    "Extract the orders of every encounter separately. The output must be a single json object "
+    "whose keys are the encounter ids and whose values are the arrays of order objects of that "
+    "encounter (an empty array if it has no orders)."
+)
+
+
+def transcript_tokens(transcript):
+    return len(transcript) // CHARS_PER_TOKEN
+
+
+def pack_transcripts(transcripts, token_budget=DEFAULT_PACK_TOKENS, max_encounters=DEFAULT_PACK_MAX_ENCOUNTERS):
+    """Group transcript ids into packs of at most `token_budget` estimated tokens.
+
+    Packs are filled first-fit decreasing, so a transcript over the budget gets a pack of
+    its own and is extracted as usual.
+    """
+    packs = []
+    sizes = []
+    for key in sorted(transcripts, key=lambda k: transcript_tokens(transcripts[k]), reverse=True):
+        tokens = transcript_tokens(transcripts[key])
+        for i, pack in enumerate(packs):
+            if sizes[i] + tokens <= token_budget and len(pack) < max_encounters:
+                pack.append(key)
+                sizes[i] += tokens
+                break
+        else:
+            packs.append([key])
+            sizes.append(tokens)
+    return packs
+
+
+def render_pack(transcripts, keys):
+    """Id-tagged transcripts of a pack, followed by the multi-encounter output schema."""
+    blocks = [f"<encounter id=\"{key}\">\n{transcripts[key]}\n</encounter>" for key in keys]
+    return "\n".join(blocks) + "\n\n" + PACKED_OUTPUT_INSTRUCTIONS
+
+
+def split_packed_content(raw_response, keys, parse_orders):
+    """Split a multi-encounter response into `{key: (orders, error)}`.
+
+    Every encounter is parsed on its own with `parse_orders`, so a malformed or missing
+    entry only fails its encounter. If the response is not a json object at all, every
+    encounter of the pack fails.
+    """
+    raw_response = (raw_response or "").strip().replace("```json", "").replace("```", "")
+    try:
+        json_message = json.loads(raw_response)
+    except json.JSONDecodeError:
+        json_message = None
+    if not isinstance(json_message, dict):
+        return {key: (None, True) for key in keys}
+
+    return {
+        key: parse_orders(json.dumps(json_message[key])) if key in json_message else (None, True)
+        for key in keys
+    }
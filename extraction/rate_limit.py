@@ -0,0 +1,153 @@
+import time
+import random
+import asyncio
+from contextlib import asynccontextmanager
+
+CHARS_PER_TOKEN = 4
+DEFAULT_RETRY_AFTER = 1.0
+DEFAULT_MAX_BACKOFF = 60.0
+
+
+def estimate_tokens(messages, settings, chars_per_token=CHARS_PER_TOKEN):
+    """Tokens a request is charged for by the quota: prompt estimate plus the completion budget."""
+    prompt_tokens = sum(len(m["content"]) for m in messages) // chars_per_token + 4 * len(messages)
+    completion_tokens = settings.get("max_tokens", settings.get("max_completion_tokens", 0)) or 0
+    return prompt_tokens + completion_tokens * settings.get("n", 1)
+
+
+def get_retry_after(error, default=DEFAULT_RETRY_AFTER):
+    """Seconds to wait from the `retry-after-ms` / `retry-after` headers of a 429 response."""
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    for key, scale in (("retry-after-ms", 1e-3), ("retry-after", 1.0)):
+        value = headers.get(key)
+        if value is None:
+            continue
+        try:
+            return max(float(value) * scale, 0.0)
+        except ValueError:
+            continue
+    return default
+
+
+def backoff_delay(attempt, base=DEFAULT_RETRY_AFTER, cap=DEFAULT_MAX_BACKOFF):
+    """Seconds to wait before retry `attempt` (from 0) of a failed request: exponential, with full jitter."""
+    return random.uniform(0.0, min(cap, base * 2 ** attempt))
+
+
+class TokenBucket:
+    """Token bucket refilled continuously at `rate_per_minute / 60` tokens per second."""
+
+    def __init__(self, rate_per_minute, capacity=None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity or rate_per_minute
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self, amount):
+        """Seconds until `amount` tokens are available (0 if they are now)."""
+        self._refill()
+        amount = min(amount, self.capacity)
+        return 0.0 if self.level >= amount else (amount - self.level) / self.rate
+
+    def take(self, amount):
+        self._refill()
+        self.level -= min(amount, self.capacity)
+
+    def drain(self):
+        """Empty the bucket, e.g. after the server reported the quota as exhausted."""
+        self._refill()
+        self.level = min(self.level, 0.0)
+
+
+class AdaptiveRateLimiter:
+    """Client-side scheduler for a deployment with request and token per minute quotas.
+
+    Requests wait for their estimated tokens in a token bucket (and for a request slot if
+    `requests_per_minute` is set), so they are paced at the quota instead of bursting into
+    429s. The number of requests in flight adapts AIMD-style: +1 per window of successful
+    requests, multiplied by `backoff` on a 429, after which every request also waits for the
+    `Retry-After` delay.
+    """
+
+    def __init__(self, max_concurrency, tokens_per_minute=None, requests_per_minute=None, min_concurrency=1, backoff=0.5):
+        self.max_concurrency = max_concurrency
+        self.min_concurrency = min_concurrency
+        self.backoff = backoff
+        self.concurrency = float(max_concurrency)
+        self.tokens = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        self.requests = TokenBucket(requests_per_minute) if requests_per_minute else None
+        self.in_flight = 0
+        self.paused_until = 0.0
+        self.num_throttled = 0
+        self.num_requests = 0
+        self._condition = None
+
+    @property
+    def condition(self):
+        # created lazily so the limiter can be built outside of the event loop
+        if self._condition is None:
+            self._condition = asyncio.Condition()
+        return self._condition
+
+    def _delay(self, tokens):
+        delays = [self.paused_until - time.monotonic()]
+        if self.tokens is not None:
+            delays.append(self.tokens.delay(tokens))
+        if self.requests is not None:
+            delays.append(self.requests.delay(1))
+        return max(delays)
+
+    @asynccontextmanager
+    async def slot(self, tokens):
+        """Hold a request slot for a request estimated at `tokens` tokens."""
+        async with self.condition:
+            while True:
+                if self.in_flight < int(self.concurrency):
+                    delay = self._delay(tokens)
+                    if delay <= 0:
+                        break
+                    try:
+                        await asyncio.wait_for(self.condition.wait(), timeout=delay)
+                    except asyncio.TimeoutError:
+                        pass
+                else:
+                    await self.condition.wait()
+            self.in_flight += 1
+            self.num_requests += 1
+            if self.tokens is not None:
+                self.tokens.take(tokens)
+            if self.requests is not None:
+                self.requests.take(1)
+        try:
+            yield
+        finally:
+            async with self.condition:
+                self.in_flight -= 1
+                self.condition.notify_all()
+
+    def on_success(self):
+        # additive increase: about +1 once every in-flight request succeeded
+        self.concurrency = min(self.max_concurrency, self.concurrency + 1.0 / max(self.concurrency, 1.0))
+
+    def on_throttle(self, retry_after=DEFAULT_RETRY_AFTER):
+        # multiplicative decrease, once per pause since in-flight requests fail together,
+        # and everyone waits for the server's retry delay
+        self.num_throttled += 1
+        now = time.monotonic()
+        if now >= self.paused_until:
+            self.concurrency = max(self.min_concurrency, self.concurrency * self.backoff)
+        self.paused_until = max(self.paused_until, now + retry_after)
+        if self.tokens is not None:
+            self.tokens.drain()
+
+    def stats(self):
+        return {
+            "requests": self.num_requests,
+            "throttled": self.num_throttled,
+            "concurrency": round(self.concurrency, 2),
+        }
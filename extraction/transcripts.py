@@ -0,0 +1,3 @@
+def get_text_from_turns(turns):
+    speaker_turns = [f"[{turn['speaker']}] {turn['transcript']}" for turn in sorted(turns, key=lambda x: x['turn_id'])]
+    return "\n".join(speaker_turns)
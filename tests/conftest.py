@@ -0,0 +1,42 @@
+import os
+import sys
+import json
+import random
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# extraction is imported from the repository root, the evaluation modules from evaluation/
+sys.path[:0] = [ROOT, os.path.join(ROOT, "evaluation")]
+
+DATA_PATH = os.path.join(ROOT, "data", "orders_data.json")
+
+
+@pytest.fixture(scope="session")
+def truth():
+    with open(DATA_PATH) as f:
+        data = json.load(f)
+    return {e["id"]: e["expected_orders"] for e in data["dev"][:40]}
+
+
+@pytest.fixture(scope="session")
+def predictions(truth):
+    """Truth orders with words dropped or added, some orders missing and some spurious."""
+    rng = random.Random(0)
+    output = {}
+    for key, orders in truth.items():
+        output[key] = []
+        for order in orders:
+            if rng.random() < 0.15:
+                continue
+            words = order["description"].split()
+            if len(words) > 1 and rng.random() < 0.5:
+                words.pop(rng.randrange(len(words)))
+            if rng.random() < 0.3:
+                words.append("daily")
+            output[key].append(dict(order, description=" ".join(words)))
+        if rng.random() < 0.3:
+            output[key].append({"description": "chest x-ray", "order_type": "imaging", "reason": "", "provenance": [1]})
+    output[next(iter(output))] = []
+    return output
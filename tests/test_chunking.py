@@ -0,0 +1,35 @@
+from evaluation.order import Order
+from extraction.chunking import Window, split_windows, merge_window_orders
+from extraction.transcripts import get_text_from_turns
+
+
+def turns(n):
+    return [{"turn_id": i, "speaker": "DOCTOR", "transcript": f"sentence {i}"} for i in range(1, n + 1)]
+
+
+def test_windows_overlap_and_cover_the_transcript():
+    windows = split_windows(turns(25), window_turns=10, overlap=4, render=get_text_from_turns)
+    assert [w.turn_ids[0] for w in windows] == [1, 7, 13, 19]
+    assert all(len(set(a.turn_ids) & set(b.turn_ids)) == 4 for a, b in zip(windows, windows[1:]))
+    assert set().union(*(w.turn_ids for w in windows)) == set(range(1, 26))
+
+
+def test_window_lines_are_remapped_to_turn_ids():
+    window = Window([7, 8, 9], "")
+    orders = window.remap([Order("cbc", "lab", "", [1, "3", 4, "x"])])
+    assert orders[0].provenance == [7, 9]
+
+
+def test_duplicates_of_overlapping_windows_are_merged():
+    windows = split_windows(turns(16), window_turns=10, overlap=4, render=get_text_from_turns)
+    window_orders = [
+        [Order("complete blood count", "lab", "", [8]), Order("lisinopril 10 mg", "medication", "", [2])],
+        # same order from the overlap, and a distinct order with a similar description
+        [Order("complete blood count", "lab", "", [8, 9]), Order("complete blood count", "lab", "", [14])],
+    ]
+    merged = merge_window_orders(windows, window_orders)
+    assert [(o.description, o.provenance) for o in merged] == [
+        ("complete blood count", [8, 9]),
+        ("lisinopril 10 mg", [2]),
+        ("complete blood count", [14]),
+    ]
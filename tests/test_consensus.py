@@ -0,0 +1,51 @@
+import json
+from types import SimpleNamespace
+
+from evaluation.order import Order
+from extraction.consensus import consensus_orders, min_votes
+from extraction.extract_orders import get_orders_from_model_response
+
+
+def order(description, order_type="lab", provenance=(1,)):
+    return Order(description, order_type, "", list(provenance))
+
+
+def response(*contents):
+    return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=c)) for c in contents])
+
+
+def test_min_votes():
+    assert min_votes(1) == 1
+    assert min_votes(3) == 2
+    assert min_votes(4) == 2
+    assert min_votes(3, min_agreement=1.0) == 3
+
+
+def test_majority_vote():
+    samples = [
+        [order("complete blood count", provenance=[3]), order("chest x-ray", "imaging")],
+        [order("blood count complete", provenance=[4]), order("lipid panel")],
+        [order("complete blood count", provenance=[3])],
+    ]
+    kept = consensus_orders(samples)
+    assert [o.description for o in kept] == ["complete blood count"]
+    assert kept[0].provenance == [3, 4]
+
+
+def test_orders_of_different_types_are_not_merged():
+    samples = [[order("ultrasound", "imaging")], [order("ultrasound", "lab")]]
+    assert consensus_orders(samples, min_agreement=1.0) == []
+    assert len(consensus_orders(samples)) == 2
+
+
+def test_unparsed_samples_vote_against():
+    samples = [[order("cbc")]]
+    assert consensus_orders(samples) == [order("cbc")]
+    assert consensus_orders(samples, num_samples=3) == []
+
+
+def test_model_response_vote_is_out_of_the_requested_samples():
+    content = json.dumps([{"description": "cbc", "order_type": "lab", "reason": "", "provenance": [1]}])
+    assert get_orders_from_model_response(response(content, "not json", "not json")) == (None, True)
+    assert get_orders_from_model_response(response(content, content, "not json")) == ([order("cbc")], False)
+    assert get_orders_from_model_response(response(content, "[]", "not json")) == ([], False)
@@ -0,0 +1,72 @@
+import json
+import argparse
+
+import pytest
+
+from extraction.cues import CueDetector, audit_cue_recall, vocabulary_from_orders
+from extraction.extract_orders import run_cue_audit
+
+TURNS = [
+    "how are you feeling today",
+    "my knee still hurts when i walk",
+    "any trouble sleeping",
+    "no, not really",
+    "i am going to order an x-ray of the knee",
+    "okay",
+    "and we will add atorvastatin",
+    "sounds good",
+    "anything else",
+    "no",
+    "let us recheck your hemoglobin",
+]
+
+
+def turns(texts=TURNS):
+    return [{"turn_id": i + 1, "speaker": "DOCTOR", "transcript": t} for i, t in enumerate(texts)]
+
+
+def test_cues_from_patterns_and_vocabulary():
+    detector = CueDetector(vocabulary={"hemoglobin"})
+    assert detector.is_cue("I am going to ORDER an MRI")
+    assert detector.is_cue("we will add atorvastatin")
+    assert detector.is_cue("let us recheck your hemoglobin")
+    assert not detector.is_cue("my knee still hurts when i walk")
+
+
+def test_selection_keeps_the_context_of_cues():
+    detector = CueDetector(vocabulary={"hemoglobin"})
+    assert [t["turn_id"] for t in detector.select(turns(), context=0)] == [5, 7, 11]
+    assert [t["turn_id"] for t in detector.select(turns(), context=1)] == [4, 5, 6, 7, 8, 10, 11]
+
+
+def test_audit_reports_lost_orders():
+    truth = {"e1": [
+        {"description": "x-ray knee", "provenance": [2, 5]},
+        {"description": "atorvastatin", "provenance": [7]},
+        {"description": "sleep study", "provenance": [3]},
+    ]}
+    report = audit_cue_recall(CueDetector(), {"e1": turns()}, truth, context=0)
+    assert report["orders"] == 3
+    assert report["recall"] == pytest.approx(2 / 3)
+    assert report["full_recall"] == pytest.approx(1 / 3)
+    assert report["turns_sent"] == pytest.approx(2 / 11)
+    assert report["lost_orders"] == [{"id": "e1", "description": "sleep study", "provenance": [3]}]
+
+
+def test_cue_audit_writes_its_report(tmp_path, capsys):
+    data = {
+        "train": [{"id": "t1", "transcript": turns(["check"]), "expected_orders": [{"description": "Hemoglobin A1c every day"}]}],
+        "dev": [{"id": "e1", "transcript": turns(), "expected_orders": [{"description": "hemoglobin", "provenance": [11]}]}],
+    }
+    input_path = tmp_path / "data.json"
+    input_path.write_text(json.dumps(data))
+    assert vocabulary_from_orders(str(input_path)) == {"hemoglobin", "a1c"}
+
+    args = argparse.Namespace(
+        input_path=str(input_path), dataset="dev", cue_vocabulary=str(input_path), cue_context=0,
+        output_path=str(tmp_path / "out" / "orders.json"),
+    )
+    run_cue_audit(args)
+    report = json.loads((tmp_path / "out" / "orders_cue_audit.json").read_text())
+    assert report["recall"] == 1.0 and report["lost_orders"] == []
+    assert "Recall (a provenance turn sent): 1.0000" in capsys.readouterr().out
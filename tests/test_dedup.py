@@ -0,0 +1,55 @@
+import pytest
+
+from dedup import NearDuplicateFinder, deduplicate_orders, jaccard, shingles
+
+
+def order(description, order_type="medication"):
+    return {"description": description, "order_type": order_type, "reason": "", "provenance": [1]}
+
+
+ENCOUNTERS = {
+    "e1": [
+        order("metformin 500 mg twice daily"),
+        order("metformin 500 mg twice a daily"),
+        order("metformin 500 mg twice daily", "lab"),
+        order("lisinopril 10 mg"),
+        "not an order",
+    ],
+    "e2": [order("metformin 500 mg twice daily"), order("chest x-ray", "imaging")],
+}
+
+
+def test_shingles_and_jaccard():
+    assert jaccard(shingles("complete blood count"), shingles("complete blood count")) == 1.0
+    assert jaccard(shingles("cbc"), shingles("lipid panel")) == 0.0
+
+
+def test_collapse_drops_duplicates_of_the_same_type_within_an_encounter():
+    output, report = deduplicate_orders(ENCOUNTERS, threshold=0.7)
+    assert output["e1"] == [ENCOUNTERS["e1"][i] for i in (0, 2, 3, 4)]
+    assert output["e2"] == ENCOUNTERS["e2"]
+    assert report.num_orders == 6
+    assert report.num_duplicates == 1
+    assert report.duplicates[0]["duplicate_of"] == {"encounter_id": "e1", "position": 0}
+    assert report.to_dict()["num_removed"] == 1
+
+
+def test_flag_keeps_every_order():
+    output, report = deduplicate_orders(ENCOUNTERS, threshold=0.7, policy="flag")
+    assert output == ENCOUNTERS
+    assert report.num_duplicates == 1
+    assert report.to_dict()["num_removed"] == 0
+
+
+def test_corpus_scope_flags_duplicates_across_encounters():
+    output, report = deduplicate_orders(ENCOUNTERS, threshold=0.7, scope="corpus")
+    assert output == ENCOUNTERS
+    assert report.policy == "flag"
+    assert [(d["encounter_id"], d["position"]) for d in report.duplicates] == [("e1", 1), ("e2", 0)]
+
+
+def test_corpus_scope_cannot_collapse():
+    with pytest.raises(ValueError):
+        NearDuplicateFinder(scope="corpus", policy="collapse")
+    with pytest.raises(ValueError):
+        NearDuplicateFinder(scope="dataset")
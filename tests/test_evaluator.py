@@ -0,0 +1,10 @@
+import pytest
+
+from evaluate_oe import build_evaluator
+
+
+def test_evaluator_is_reusable(truth, predictions):
+    evaluator = build_evaluator(truth)
+    first = evaluator.score(predictions).scores
+    assert evaluator.score(truth).scores["description_Rouge1_f1"] == pytest.approx(1.0)
+    assert evaluator.score(predictions).scores == first
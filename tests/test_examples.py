@@ -0,0 +1,66 @@
+import os
+import json
+from math import log
+
+import pytest
+
+from extraction.examples import ExampleStore, tokenize
+
+TRANSCRIPTS = {
+    "e1": "we will check a complete blood count and a lipid panel",
+    "e2": "start metformin 500 mg twice a day for your diabetes",
+    "e3": "let us get a chest x-ray for the cough",
+    "e4": "blood pressure is high, start lisinopril and recheck the blood count",
+}
+
+
+def split(transcripts=TRANSCRIPTS):
+    return [
+        {"id": k, "transcript": [{"turn_id": 1, "speaker": "DOCTOR", "transcript": t}], "expected_orders": [{"description": k}]}
+        for k, t in transcripts.items()
+    ]
+
+
+def bm25_reference(query, documents, k1=1.5, b=0.75):
+    """Okapi BM25 of every document, term by term."""
+    documents = [tokenize(d) for d in documents]
+    avg_length = sum(len(d) for d in documents) / len(documents)
+    scores = []
+    for d in documents:
+        score = 0.0
+        for term in set(tokenize(query)):
+            n = sum(term in other for other in documents)
+            tf = d.count(term)
+            if tf:
+                idf = log(1 + (len(documents) - n + 0.5) / (n + 0.5))
+                score += idf * tf * (k1 + 1) / (tf + k1 * (1 - b + b * len(d) / avg_length))
+        scores.append(score)
+    return scores
+
+
+def test_scores_match_bm25():
+    store = ExampleStore.from_split(split())
+    query = "recheck the blood count and start metformin"
+    assert store.scores(query).tolist() == pytest.approx(bm25_reference(query, store.transcripts), rel=1e-5)
+
+
+def test_retrieve_best_first_excluding_the_target():
+    store = ExampleStore.from_split(split())
+    assert [orders for _, orders in store.retrieve("complete blood count", k=2)] == [[{"description": "e1"}], [{"description": "e4"}]]
+    assert [orders for _, orders in store.retrieve("complete blood count", k=5, exclude="e1")][0] == [{"description": "e4"}]
+    assert len(store.retrieve("blood count", k=5, exclude="e1")) == 3
+
+
+def test_index_is_rebuilt_when_the_split_changes(tmp_path):
+    data_path = tmp_path / "data.json"
+    data_path.write_text(json.dumps({"train": split()}))
+    store = ExampleStore.load(str(data_path), cache_dir=str(tmp_path / "cache"))
+    assert os.path.exists(ExampleStore.index_path(str(tmp_path / "cache"), str(data_path)))
+    assert ExampleStore.load(str(data_path), cache_dir=str(tmp_path / "cache")).ids == store.ids
+
+    # same size and modification time, different content
+    stat = os.stat(data_path)
+    data_path.write_text(json.dumps({"train": split(dict(TRANSCRIPTS, e1=TRANSCRIPTS["e1"].replace("lipid", "lupid")))}))
+    os.utime(data_path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    reloaded = ExampleStore.load(str(data_path), cache_dir=str(tmp_path / "cache"))
+    assert "lupid" in reloaded.transcripts[0]
@@ -0,0 +1,43 @@
+import numpy as np
+import pytest
+
+from evaluate_oe import build_evaluator
+from export import ColumnarTable, ColumnarExporter, read_table
+
+
+def test_columnar_table_round_trip(tmp_path):
+    rows = [
+        {"encounter": i, "score": i / 7, "name": ["", "cbc", "médication", "x-ray"][i % 4], "count": 3 * i}
+        for i in range(10)
+    ]
+    table = ColumnarTable(str(tmp_path / "t"), dtypes={"count": "<i8"})
+    for i, row in enumerate(rows):
+        table.append(row)
+        if i in (2, 3, 7):
+            table.flush()
+    table.flush()
+    assert len(table) == len(rows)
+
+    columns = read_table(str(tmp_path / "t"))
+    assert columns["encounter"].tolist() == [r["encounter"] for r in rows]
+    assert columns["score"].dtype == np.float32
+    assert columns["score"].tolist() == pytest.approx([r["score"] for r in rows])
+    assert columns["count"].dtype == np.int64
+    assert [columns["name"][i] for i in range(len(rows))] == [r["name"] for r in rows]
+
+
+def test_exported_contributions_add_up_to_the_metrics(truth, predictions, tmp_path):
+    evaluator = build_evaluator(truth)
+    evaluator.score(predictions)
+    accumulator = evaluator.pairing.get_pairings_accumulator()
+    exporter = ColumnarExporter(str(tmp_path / "results"), accumulator, list(truth), buffer_rows=16)
+    references, hyps, indices = evaluator.pairing.get_pairings(transpose=True)
+    evaluator.manager.process(references, hyps, indices, exporter=exporter)
+
+    pairs = read_table(str(tmp_path / "results" / "pairs"))
+    encounters = read_table(str(tmp_path / "results" / "encounters"))
+    assert len(pairs["score"]) == len(accumulator)
+    assert [encounters["encounter_id"][i] for i in range(len(truth))] == list(truth)
+    assert int(encounters["num_refs"].sum()) == sum(p["ref"] is not None for p in accumulator)
+    for name, value in evaluator.manager.fields["description"].state().items():
+        assert float(pairs[f"description/{name}"].sum()) == pytest.approx(value, rel=1e-4)
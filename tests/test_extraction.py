@@ -0,0 +1,196 @@
+import re
+import json
+import asyncio
+import argparse
+from types import SimpleNamespace
+
+import openai
+from openai.types.chat import ChatCompletion
+
+from extraction import extract_orders
+from extraction.cache import ResponseCache
+from extraction.checkpoint import Checkpoint
+from extraction.consensus import DEFAULT_MIN_AGREEMENT
+from extraction.cues import DEFAULT_CUE_CONTEXT
+from extraction.chunking import DEFAULT_WINDOW_OVERLAP
+from extraction.packing import DEFAULT_PACK_MAX_ENCOUNTERS
+
+ENCOUNTERS = ["enc_a", "enc_b", "enc_c"]
+
+
+def api_error(cls, status_code=None, headers=None):
+    """An openai exception without an http response behind it."""
+    error = cls.__new__(cls)
+    error.status_code = status_code
+    error.response = SimpleNamespace(status_code=status_code, headers=headers or {})
+    return error
+
+
+def completion(model, content):
+    return ChatCompletion.model_validate({
+        "id": "fake", "object": "chat.completion", "created": 0, "model": model,
+        "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": content}}],
+    })
+
+
+class FakeCompletions:
+    """Answers one order per encounter, after the scripted failures of that encounter."""
+
+    def __init__(self, failures):
+        self.failures = {k: list(v) for k, v in failures.items()}
+        self.calls = {k: 0 for k in ENCOUNTERS}
+
+    async def create(self, model, messages, **settings):
+        text = "\n".join(m["content"] for m in messages)
+        encounter = re.search(r"order for (enc_\w)", text).group(1)
+        self.calls[encounter] += 1
+        failures = self.failures.get(encounter, [])
+        if failures:
+            failure = failures[0] if failures[0] == "always" else failures.pop(0)
+            raise {
+                "429": api_error(openai.RateLimitError, 429, {"retry-after-ms": "0"}),
+                "500": api_error(openai.InternalServerError, 500),
+                "timeout": api_error(openai.APITimeoutError),
+                "always": api_error(openai.InternalServerError, 503),
+                "bug": RuntimeError("unexpected"),
+            }[failure]
+        content = json.dumps([{"description": f"cbc {encounter}", "order_type": "lab", "reason": "", "provenance": [1]}])
+        return completion(model, content)
+
+
+class FakeClient:
+    def __init__(self, failures=None):
+        self.chat = SimpleNamespace(completions=FakeCompletions(failures or {}))
+
+    def with_options(self, **options):
+        return self
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+
+def make_args(tmp_path):
+    data = {"dev": [
+        {"id": k, "transcript": [{"turn_id": 1, "speaker": "DOCTOR", "transcript": f"I will order for {k}."}], "expected_orders": []}
+        for k in ENCOUNTERS
+    ]}
+    input_path = tmp_path / "data.json"
+    input_path.write_text(json.dumps(data))
+    return argparse.Namespace(
+        input_path=str(input_path), output_path=str(tmp_path / "out" / "orders.json"), endpoint="http://localhost",
+        deployment_name="test", api_key="key", model="gpt-4o", dataset="dev", runids=[1], example=False,
+        num_examples=1, bm25_example=False, num_samples=1, min_agreement=DEFAULT_MIN_AGREEMENT, pack_tokens=None,
+        pack_max_encounters=DEFAULT_PACK_MAX_ENCOUNTERS, window_turns=None, window_overlap=DEFAULT_WINDOW_OVERLAP,
+        compact=False, cues=False, cue_context=DEFAULT_CUE_CONTEXT, cue_vocabulary=None, cue_audit=False,
+        concurrency=2, tpm=None, rpm=None, resume=False, cache_path=None, cache_max_mb=None, offline=False,
+    )
+
+
+def run(tmp_path, monkeypatch, client, **options):
+    monkeypatch.setattr(extract_orders, "get_aoai_async_client", lambda *args, **kwargs: client)
+    monkeypatch.setattr(extract_orders, "backoff_delay", lambda attempt: 0.0)
+    args = make_args(tmp_path)
+    vars(args).update(options)
+    transcripts = extract_orders.load_transcripts(args.input_path, args.dataset)
+    asyncio.run(extract_orders.run_extraction(args, "Extract the orders.", transcripts))
+    with open(tmp_path / "out" / "orders_runid1.json") as f:
+        return json.load(f)
+
+
+def test_run_extraction(tmp_path, monkeypatch):
+    client = FakeClient()
+    orders = run(tmp_path, monkeypatch, client)
+    assert list(orders) == ENCOUNTERS
+    for k in ENCOUNTERS:
+        assert orders[k] == [{"description": f"cbc {k}", "order_type": "lab", "reason": "", "provenance": [1]}]
+    assert client.chat.completions.calls == {k: 1 for k in ENCOUNTERS}
+
+
+def test_run_extraction_retries_rate_limits_and_server_errors(tmp_path, monkeypatch, capsys):
+    client = FakeClient({"enc_a": ["429", "429"], "enc_b": ["500"], "enc_c": ["timeout", "500"]})
+    orders = run(tmp_path, monkeypatch, client)
+    assert all(len(orders[k]) == 1 for k in ENCOUNTERS)
+    assert client.chat.completions.calls == {"enc_a": 3, "enc_b": 2, "enc_c": 3}
+    output = capsys.readouterr().out
+    assert "Number of errors in model response: 0" in output
+    assert "Requests throttled (429): 2" in output
+
+
+def test_run_extraction_fails_only_the_failing_encounters(tmp_path, monkeypatch, capsys):
+    client = FakeClient({"enc_b": ["always"], "enc_c": ["bug"]})
+    orders = run(tmp_path, monkeypatch, client)
+    assert len(orders["enc_a"]) == 1
+    assert orders["enc_b"] == [] and orders["enc_c"] == []
+    assert client.chat.completions.calls["enc_b"] == extract_orders.DEFAULT_MAX_ATTEMPTS
+    assert client.chat.completions.calls["enc_c"] == 1
+    assert "Number of errors in model response: 2" in capsys.readouterr().out
+
+
+def test_cached_responses_are_replayed(tmp_path, monkeypatch, capsys):
+    cache_path = str(tmp_path / "cache" / "responses.sqlite")
+    first = run(tmp_path, monkeypatch, FakeClient(), cache_path=cache_path)
+    client = FakeClient()
+    assert run(tmp_path, monkeypatch, client, cache_path=cache_path) == first
+    assert client.chat.completions.calls == {k: 0 for k in ENCOUNTERS}
+    assert "'hits': 3, 'misses': 0" in capsys.readouterr().out
+
+
+def test_offline_never_calls_the_api(tmp_path, monkeypatch, capsys):
+    client = FakeClient()
+    orders = run(tmp_path, monkeypatch, client, cache_path=str(tmp_path / "responses.sqlite"), offline=True)
+    assert orders == {k: [] for k in ENCOUNTERS}
+    assert client.chat.completions.calls == {k: 0 for k in ENCOUNTERS}
+    assert "Number of errors in model response: 3" in capsys.readouterr().out
+
+
+def test_cache_keys_and_eviction(tmp_path):
+    cache = ResponseCache(str(tmp_path / "responses.sqlite"), deployment="test")
+    greedy, sampled = {"temperature": 0.0}, {"temperature": 0.7}
+    assert cache.key("gpt-4o", greedy, "p", "t", runid=1) == cache.key("gpt-4o", greedy, "p", "t", runid=2)
+    assert cache.key("gpt-4o", sampled, "p", "t", runid=1) != cache.key("gpt-4o", sampled, "p", "t", runid=2)
+    assert cache.key("gpt-4o", greedy, "p", "t") != cache.key("gpt-4o", greedy, "p", "t", example="e")
+
+    response = completion("gpt-4o", "[]")
+    cache.put("a", response)
+    cache.max_bytes = cache.size * 2
+    cache.put("b", response)
+    assert cache.get("a").choices[0].message.content == "[]"
+    cache.put("c", response)
+    # b is the least recently used response
+    assert cache.get("b") is None and cache.get("a") is not None and cache.get("c") is not None
+    assert cache.stats()["evictions"] == 1
+    cache.close()
+
+
+def test_resume_only_extracts_the_unfinished_encounters(tmp_path, monkeypatch):
+    orders = run(tmp_path, monkeypatch, FakeClient({"enc_b": ["always"]}))
+    assert orders["enc_b"] == []
+    client = FakeClient()
+    orders = run(tmp_path, monkeypatch, client, resume=True)
+    assert client.chat.completions.calls == {"enc_a": 0, "enc_b": 1, "enc_c": 0}
+    assert all(len(orders[k]) == 1 for k in ENCOUNTERS)
+
+
+def test_checkpoint_skips_a_truncated_line(tmp_path):
+    path = str(tmp_path / "orders_runid1.jsonl")
+    checkpoint = Checkpoint(path)
+    checkpoint.append("enc_a", [{"description": "cbc"}])
+    checkpoint.append("enc_b", [], error="model")
+    checkpoint.fp.write('{"id": "enc_c", "ord')
+    checkpoint.close()
+
+    checkpoint = Checkpoint(path, resume=True)
+    assert checkpoint.completed() == {"enc_a"}
+    checkpoint.append("enc_b", [{"description": "x-ray"}])
+    checkpoint.close()
+    assert checkpoint.compact(ENCOUNTERS) == {
+        "enc_a": [{"description": "cbc"}], "enc_b": [{"description": "x-ray"}], "enc_c": []
+    }
+
+    # without resume the checkpoint starts over
+    checkpoint = Checkpoint(path)
+    assert checkpoint.records() == {}
+    checkpoint.close()
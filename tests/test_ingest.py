@@ -0,0 +1,67 @@
+import pytest
+
+from evaluate_oe import build_evaluator
+from order import IngestionReport, OrderTable, coerce_provenance, normalize_order
+from order.ingest import INVALID_ORDER_TYPE, INVALID_PROVENANCE, MISSING_DESCRIPTION
+
+TRUTH = {
+    "acibench_1": [
+        {"description": "complete blood count", "order_type": "lab", "reason": "anemia", "provenance": [3, 4]},
+        {"description": "metformin 500 mg", "order_type": "medication", "reason": "diabetes", "provenance": [7]},
+    ],
+    "primock57_2": [{"description": "chest x-ray", "order_type": "imaging", "reason": "cough", "provenance": [2]}],
+}
+PREDICTIONS = {
+    "acibench_1": [
+        {"description": "complete blood count", "order_type": "Lab", "reason": "anemia", "provenance": "[4, 3]"},
+        {"description": "metformin 500 mg twice daily", "order_type": "MEDICATION", "reason": "", "provenance": ["7"]},
+    ],
+    "primock57_2": [{"description": "chest x-ray", "order_type": "imaging", "reason": "cough", "provenance": "[2]"}],
+}
+
+
+def test_coerce_provenance():
+    assert coerce_provenance("[4, 3]") == ([3, 4], True)
+    assert coerce_provenance(["7", 2]) == ([2, 7], True)
+    assert coerce_provenance(5) == ([5], True)
+    assert coerce_provenance([1, "x"]) == ([1], False)
+    assert coerce_provenance({"turn": 1}) == ([], False)
+
+
+def test_normalize_order():
+    order, errors = normalize_order({"order_type": " Lab", "description": "cbc", "reason": "", "provenance": "[2, 1]", "x": 1})
+    assert (order, errors) == ({"order_type": "lab", "description": "cbc", "provenance": [1, 2]}, [])
+    assert normalize_order({"description": "cbc", "order_type": "lab", "provenance": ["a"]}) == (
+        {"description": "cbc", "order_type": "lab"}, [INVALID_PROVENANCE]
+    )
+    assert normalize_order({"description": "", "order_type": "lab"}) == (None, [MISSING_DESCRIPTION])
+    assert normalize_order({"description": "cbc", "order_type": "referral"}) == (None, [INVALID_ORDER_TYPE])
+
+
+def test_rows_hold_normalized_values_and_represent_the_source():
+    report = IngestionReport()
+    table = OrderTable.from_encounters(PREDICTIONS, report=report)
+    row = table.row(0)
+    assert dict(row) == {
+        "description": "complete blood count", "order_type": "lab", "reason": "anemia", "provenance": [3, 4],
+        "transcript_id": "acibench_1",
+    }
+    source = {"description": "complete blood count", "order_type": "Lab", "reason": "anemia", "provenance": "[4, 3]"}
+    assert repr(row) == repr(dict(source, transcript_id="acibench_1"))
+    # values left unchanged by normalization are not copied
+    assert sorted(table.sources) == [0, 1, 2]
+    assert str(table.row(1)) == str({
+        "description": "metformin 500 mg twice daily", "order_type": "MEDICATION", "provenance": ["7"],
+        "transcript_id": "acibench_1",
+    })
+    assert report.num_encounters == 2 and report.num_kept == 3
+
+
+def test_order_and_encounter_level_scores_match_the_baseline():
+    """Scores of the baseline evaluation, which scored the orders as given."""
+    scores = build_evaluator(TRUTH).score(PREDICTIONS).scores
+    assert scores["order_type_Strict_f1"] == pytest.approx(1.0)
+    assert scores["order_level_metrics_Rouge1_precision"] == pytest.approx(0.7538850038850039)
+    assert scores["order_level_metrics_Rouge1_recall"] == pytest.approx(0.7538850038850039)
+    assert scores["encounter_level_metrics_Rouge1_precision"] == pytest.approx(0.7945454545454546)
+    assert scores["encounter_level_metrics_Rouge1_recall"] == pytest.approx(0.8145454545454545)
@@ -0,0 +1,192 @@
+import random
+from collections import Counter
+from math import log, sqrt
+
+import numpy as np
+import pytest
+
+from metrics.confusion import ConfusionMatrix
+from metrics.provenance_span import ProvenanceSpan, dilate, to_bitset
+from metrics.rouge1 import Rouge1
+from metrics.rouge2 import bigram_overlap
+from metrics.rougel import RougeL, lcs_length
+from metrics.tfidf import TfidfCosine
+from utils.tfidf import CharNgramTfidf, char_ngrams
+
+WORDS = ["take", "metformin", "500", "mg", "twice", "a", "day", "cbc", "follow", "up"]
+
+
+def span_reference(ref, pred, tolerance):
+    """Set-based span precision, recall and IoU with a +/- tolerance window."""
+    matched_pred = sum(1 for p in pred if any(abs(p - r) <= tolerance for r in ref))
+    matched_ref = sum(1 for r in ref if any(abs(p - r) <= tolerance for p in pred))
+    return matched_pred / len(pred), matched_ref / len(ref), matched_ref / (len(ref) + len(pred) - matched_pred)
+
+
+def test_bitsets():
+    assert to_bitset([0, 3, 3, 5]) == 0b101001
+    assert to_bitset([]) == 0
+    assert to_bitset([-1, 2]) == 0b100
+    assert dilate(0b1000000, 2) == 0b111110000
+    assert dilate(to_bitset([10]), 5) == to_bitset(range(5, 16))
+
+
+def test_provenance_span_matches_sets():
+    rng = random.Random(0)
+    for tolerance in (0, 1, 3):
+        metric = ProvenanceSpan(tolerance=tolerance)
+        precision = recall = iou = 0.0
+        n = 200
+        for _ in range(n):
+            ref = set(rng.sample(range(60), rng.randint(1, 6)))
+            pred = set(rng.sample(range(60), rng.randint(1, 6)))
+            metric.update(list(ref), list(pred))
+            p, r, i = span_reference(ref, pred, tolerance)
+            precision += p
+            recall += r
+            iou += i
+        output = metric.compute()
+        assert output["precision"] == pytest.approx(precision / n)
+        assert output["recall"] == pytest.approx(recall / n)
+        assert output["iou"] == pytest.approx(iou / n)
+
+
+def test_provenance_span_of_unpaired_orders():
+    metric = ProvenanceSpan(tolerance=1)
+    metric.update([4], [])
+    metric.update([], [9])
+    metric.update([], [])
+    output = metric.compute()
+    assert (output["precision"], output["recall"], output["iou"]) == (0.0, 0.0, 0.0)
+    assert metric.sum_nb_pairs == 2
+
+
+
+def lcs_reference(a, b):
+    """Quadratic dynamic programming LCS."""
+    table = [[0] * (len(b) + 1) for _ in range(len(a) + 1)]
+    for i, x in enumerate(a):
+        for j, y in enumerate(b):
+            table[i + 1][j + 1] = table[i][j] + 1 if x == y else max(table[i][j + 1], table[i + 1][j])
+    return table[-1][-1]
+
+
+def baseline_rouge1(ref_words, pred_words):
+    """Per-pair precision and recall as the baseline Rouge1 computed them."""
+    recall_correct = sum(1 for w in ref_words if w in pred_words)
+    precision_correct = sum(1 for w in pred_words if w in ref_words)
+    return precision_correct / len(pred_words), recall_correct / len(ref_words)
+
+
+def random_texts(n, seed=0):
+    rng = random.Random(seed)
+    return [
+        (" ".join(rng.choices(WORDS, k=rng.randint(1, 12))), " ".join(rng.choices(WORDS, k=rng.randint(1, 12))))
+        for _ in range(n)
+    ]
+
+
+def test_lcs_length_matches_dynamic_programming():
+    rng = random.Random(0)
+    for _ in range(500):
+        a = rng.choices(range(6), k=rng.randint(0, 70))
+        b = rng.choices(range(6), k=rng.randint(0, 70))
+        assert lcs_length(a, b) == lcs_reference(a, b)
+
+
+def test_rougel_matches_dynamic_programming():
+    metric = RougeL()
+    precision = recall = 0.0
+    pairs = random_texts(200)
+    for ref, pred in pairs:
+        metric.update(ref, pred)
+        lcs = lcs_reference(ref.split(), pred.split())
+        precision += lcs / len(pred.split())
+        recall += lcs / len(ref.split())
+    output = metric.compute()
+    assert output["precision"] == pytest.approx(precision / len(pairs))
+    assert output["recall"] == pytest.approx(recall / len(pairs))
+
+
+def test_rouge1_matches_baseline():
+    metric = Rouge1()
+    precision = recall = 0.0
+    pairs = random_texts(200, seed=1) + [("Metformin 500 MG", "metformin 500 mg")]
+    for ref, pred in pairs:
+        metric.update(ref, pred)
+        p, r = baseline_rouge1(ref.lower().split(), pred.lower().split())
+        precision += p
+        recall += r
+    # unpaired orders count in one of the two averages only
+    metric.update("cbc", "")
+    metric.update("", "follow up")
+    output = metric.compute()
+    assert output["precision"] == pytest.approx(precision / (len(pairs) + 1))
+    assert output["recall"] == pytest.approx(recall / (len(pairs) + 1))
+
+
+def test_bigram_overlap_counts_repeated_bigrams():
+    for ref, pred in random_texts(200, seed=2):
+        ref, pred = ref.split(), pred.split()
+        ref_bigrams, pred_bigrams = Counter(zip(ref, ref[1:])), Counter(zip(pred, pred[1:]))
+        overlap = sum((ref_bigrams & pred_bigrams).values())
+        assert bigram_overlap(ref, pred) == (overlap, overlap, len(pred) - 1, len(ref) - 1)
+
+
+def tfidf_reference(texts, a, b, ngram_range=(2, 4)):
+    """Dense sublinear TF-IDF cosine of two texts, with the idf of `texts`."""
+    documents = [set(char_ngrams(t, ngram_range)) for t in texts]
+    idf = {g: log((1 + len(texts)) / (1 + sum(g in d for d in documents))) + 1 for d in documents for g in d}
+
+    def vector(text):
+        counts = Counter(g for g in char_ngrams(text, ngram_range) if g in idf)
+        return {g: (1 + log(c)) * idf[g] for g, c in counts.items()}
+
+    u, v = vector(a), vector(b)
+    norm = sqrt(sum(x * x for x in u.values())) * sqrt(sum(x * x for x in v.values()))
+    return sum(x * v.get(g, 0.0) for g, x in u.items()) / norm if norm else 0.0
+
+
+def test_tfidf_similarity_matches_a_dense_computation():
+    texts = ["metformin 500mg", "metformin 500 mg daily", "cbc", "complete blood count", "lipid panel"]
+    vectorizer = CharNgramTfidf().fit(texts)
+    similarity = CharNgramTfidf.similarity(vectorizer.transform(texts), vectorizer.transform(texts + ["x-ray"]))
+    for i, a in enumerate(texts):
+        for j, b in enumerate(texts + ["x-ray"]):
+            assert similarity[i, j] == pytest.approx(tfidf_reference(texts, a, b))
+    assert similarity[0, 1] > 0.5 > similarity[0, 2]
+
+
+def test_tfidf_cosine_counts_unpaired_orders_as_zero():
+    metric = TfidfCosine()
+    metric.update("metformin 500 mg", "metformin 500 mg")
+    metric.update("cbc", "")
+    output = metric.compute()
+    assert output["precision"] == pytest.approx(1.0)
+    assert output["recall"] == pytest.approx(0.5)
+
+
+def test_confusion_matrix_counts_pairs_and_unpaired_orders():
+    metric = ConfusionMatrix(labels=["lab", "medication"])
+    for ref, pred in [("lab", "lab"), ("lab", "medication"), ("medication", "medication"), ("lab", None), (None, "imaging"), (None, None)]:
+        metric.update(ref, pred)
+    assert metric.to_dict() == {
+        "labels": ["missing", "lab", "medication", "imaging"],
+        "matrix": [[0, 0, 0, 1], [1, 1, 1, 0], [0, 0, 1, 0], [0, 0, 0, 0]],
+    }
+    output = metric.compute()
+    assert output["accuracy"] == pytest.approx(2 / 5)
+    # lab: p=1, r=1/3; medication: p=1/2, r=1; imaging: p=0, r=0
+    assert output["macro_f1"] == pytest.approx((0.5 + 2 / 3 + 0.0) / 3)
+
+
+def test_confusion_matrices_merge_whatever_their_vocabulary():
+    pairs = [("lab", "lab"), ("imaging", "lab"), ("followup", None), ("medication", "imaging")] * 3
+    whole = ConfusionMatrix()
+    left, right = ConfusionMatrix(labels=["medication"]), ConfusionMatrix()
+    for i, (ref, pred) in enumerate(pairs):
+        whole.update(ref, pred)
+        (left if i % 2 else right).update(ref, pred)
+    merged = left.merge(right)
+    order = [merged.vocabulary[label] for label in whole.vocabulary]
+    assert np.array_equal(merged.matrix[np.ix_(order, order)], whole.matrix)
@@ -0,0 +1,65 @@
+import json
+
+import numpy as np
+import pytest
+
+from evaluate_oe import build_evaluation, evaluate
+from pairing import PairingMatcher
+
+
+def order(description, order_type="lab"):
+    return {"description": description, "order_type": order_type, "reason": "", "provenance": [1]}
+
+
+TRUTH = {
+    "e1": [
+        [order("lipid panel"), order("chest x-ray", "imaging")],
+        [order("complete blood count"), order("metformin 500 mg", "medication")],
+    ],
+    "e2": [order("hemoglobin a1c")],
+}
+PREDICTIONS = {
+    "e1": [order("metformin 500 mg daily", "medication"), order("complete blood count")],
+    "e2": [order("hemoglobin a1c")],
+}
+
+
+def matcher():
+    _, pairing = build_evaluation("")
+    return pairing
+
+
+def test_reference_tensor_is_zero_padded():
+    pairing = matcher()
+    tensor = pairing.reference_tensor([["cbc"], ["lipid panel", "cbc", "x-ray"]], ["cbc", "x-ray"])
+    assert tensor.shape == (2, 3, 2)
+    assert tensor[0, 1:].tolist() == [[0.0, 0.0], [0.0, 0.0]]
+    assert tensor[1].tolist() == pairing.build_metric_matrix(["lipid panel", "cbc", "x-ray"], ["cbc", "x-ray"]).tolist()
+
+
+def test_best_reference_normalizes_by_the_number_of_orders():
+    # one exact pair out of 1 + 2 orders beats two exact pairs out of 4 + 2 orders
+    tensor = np.zeros((2, 4, 2))
+    tensor[0, 0, 0] = 1.0
+    tensor[1, 0, 0] = tensor[1, 1, 1] = 1.0
+    assert PairingMatcher.best_reference(tensor, [4, 2])[0] == 1
+    assert PairingMatcher.best_reference(tensor, [1, 4])[0] == 0
+    best, (rows, cols) = PairingMatcher.best_reference(tensor, [1, 2])
+    assert best == 1 and sorted(zip(rows.tolist(), cols.tolist())) == [(0, 0), (1, 1)]
+
+
+def test_evaluate_multi_reference_into_a_new_directory(tmp_path):
+    truth_file, pred_file = tmp_path / "truth.json", tmp_path / "pred.json"
+    truth_file.write_text(json.dumps(TRUTH))
+    pred_file.write_text(json.dumps(PREDICTIONS))
+    output_dir = tmp_path / "runs" / "multi"
+    evaluate(str(output_dir), str(truth_file), str(pred_file), slices=True)
+
+    assert json.loads((output_dir / "best_references.json").read_text()) == {"e1": 1, "e2": 0}
+    scores = json.loads((output_dir / "scores.json").read_text())
+    single_dir = tmp_path / "single"
+    single_truth = {"e1": TRUTH["e1"][1], "e2": TRUTH["e2"]}
+    truth_file.write_text(json.dumps(single_truth))
+    evaluate(str(single_dir), str(truth_file), str(pred_file))
+    assert scores == pytest.approx(json.loads((single_dir / "scores.json").read_text()))
+    assert scores["order_type_Strict_f1"] == pytest.approx(1.0)
@@ -0,0 +1,28 @@
+import json
+
+from evaluation.order import Order
+from extraction.extract_orders import get_orders_from_content
+from extraction.packing import pack_transcripts, render_pack, split_packed_content, transcript_tokens
+
+
+def test_packs_respect_the_budget():
+    transcripts = {f"e{i}": "x" * (400 * (i % 5 + 1)) for i in range(20)}
+    transcripts["long"] = "x" * 40000
+    packs = pack_transcripts(transcripts, token_budget=1000, max_encounters=3)
+    assert sorted(k for pack in packs for k in pack) == sorted(transcripts)
+    assert ["long"] in packs
+    for pack in packs:
+        assert len(pack) <= 3
+        if len(pack) > 1:
+            assert sum(transcript_tokens(transcripts[k]) for k in pack) <= 1000
+
+
+def test_packed_response_is_split_per_encounter():
+    keys = ["a", "b", "c"]
+    assert all(f'<encounter id="{k}">' in render_pack({k: k for k in keys}, keys) for k in keys)
+    content = json.dumps({"a": [{"description": "cbc", "order_type": "lab", "reason": "", "provenance": [2]}], "b": []})
+    parsed = split_packed_content(f"```json\n{content}\n```", keys, get_orders_from_content)
+    assert parsed["a"] == ([Order("cbc", "lab", "", [2])], False)
+    assert parsed["b"] == ([], False)
+    assert parsed["c"] == (None, True)
+    assert split_packed_content("not json", keys, get_orders_from_content) == {k: (None, True) for k in keys}
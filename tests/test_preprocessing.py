@@ -0,0 +1,37 @@
+from preprocessing import AhoCorasick
+
+REPLACEMENTS = {
+    "a day": "daily",
+    "twice a day": "bid",
+    "milligrams": "mg",
+    "mg": "mg",
+    "blood pressure": "bp",
+    "pressure check": "PRESSURE CHECK",
+}
+
+
+def test_longest_match_wins_at_the_same_start():
+    automaton = AhoCorasick(REPLACEMENTS)
+    assert automaton("metformin 500 milligrams twice a day") == "metformin 500 mg bid"
+    assert automaton("one a day") == "one daily"
+
+
+def test_leftmost_match_wins_over_overlapping_later_match():
+    # "blood pressure" starts first, so the overlapping "pressure check" is not applied
+    assert AhoCorasick(REPLACEMENTS)("blood pressure check") == "bp check"
+
+
+def test_matches_are_word_bounded():
+    automaton = AhoCorasick(REPLACEMENTS)
+    assert automaton("amg a daydream") == "amg a daydream"
+    assert automaton("(twice a day)") == "(bid)"
+
+
+def test_find_reports_all_matches():
+    matches = AhoCorasick(REPLACEMENTS).find("twice a day")
+    assert sorted(matches) == [(0, 11, "bid"), (6, 11, "daily")]
+
+
+def test_matching_is_case_insensitive():
+    assert AhoCorasick(REPLACEMENTS)("Twice A Day") == "bid"
+    assert AhoCorasick(REPLACEMENTS, lowercase=False)("Twice A Day") == "Twice A Day"
@@ -0,0 +1,55 @@
+import pytest
+
+from sampling import stratify, stratified_sample, bootstrap_intervals
+from sampling.sampler import allocate
+
+
+def encounters():
+    output = {f"acibench_{i}": [{"order_type": "lab"}] for i in range(30)}
+    output.update({f"primock57_{i}": [{"order_type": "Medication"}, {"order_type": "lab"}] for i in range(10)})
+    output.update({f"other{i}": [] for i in range(5)})
+    return output
+
+
+def test_strata_are_source_and_order_type_mix():
+    strata = stratify(encounters())
+    assert {s: len(keys) for s, keys in strata.items()} == {
+        "acibench/lab": 30, "primock57/lab+medication": 10, "other/none": 5
+    }
+
+
+def test_allocation_is_proportional():
+    strata = stratify(encounters())
+    allocation = allocate(strata, 9)
+    assert allocation == {"acibench/lab": 6, "primock57/lab+medication": 2, "other/none": 1}
+    assert sum(allocate(strata, 100).values()) == 45
+
+
+def test_sample_is_reproducible_and_within_strata():
+    strata = stratify(encounters())
+    sample = stratified_sample(strata, 9, seed=3)
+    assert sample == stratified_sample(strata, 9, seed=3)
+    assert sum(len(keys) for keys in sample.values()) == 9
+    for s, keys in sample.items():
+        assert len(set(keys)) == len(keys) and set(keys) <= set(strata[s])
+
+
+def test_bootstrap_bounds_contain_the_estimate():
+    values = {key: float(i % 7) for i, key in enumerate(encounters())}
+    sample = stratified_sample(stratify(encounters()), 20, seed=0)
+
+    def score_fn(keys):
+        return {"mean": {"value": sum(values[k] for k in keys) / len(keys)}}
+
+    intervals = bootstrap_intervals(score_fn, sample, n_boot=300, confidence=0.9, seed=0)
+    keys = [k for stratum in sample.values() for k in stratum]
+    bound = intervals["mean/value"]
+    assert bound["estimate"] == pytest.approx(sum(values[k] for k in keys) / len(keys))
+    assert bound["lower"] < bound["estimate"] < bound["upper"]
+    assert bootstrap_intervals(score_fn, sample, n_boot=300, confidence=0.9, seed=0) == intervals
+
+
+def test_bootstrap_of_a_constant_has_no_spread():
+    sample = {"s": ["a", "b", "c"]}
+    intervals = bootstrap_intervals(lambda keys: {"f1": 0.5}, sample, n_boot=20, seed=1)
+    assert intervals == {"f1": {"estimate": 0.5, "lower": 0.5, "upper": 0.5}}
@@ -0,0 +1,41 @@
+import pytest
+
+from evaluate_oe import DEFAULT_SLICES, build_evaluator
+from manager.slicing import SliceDefinition, bucket_label
+
+
+def test_bucket_labels():
+    assert [bucket_label(n, [1, 3, 6]) for n in (0, 1, 2, 3, 5, 6, 40)] == ["0", "1-2", "1-2", "3-5", "3-5", "6+", "6+"]
+
+
+def test_slice_keys():
+    references = [{"transcript_id": "acibench_1", "order_type": "Lab"}, None, {"transcript_id": "primock57_2", "order_type": ""}]
+    predictions = [None, {"transcript_id": "acibench_1", "order_type": "imaging"}, {"transcript_id": "primock57_2"}]
+    indices = [0, 0, 1]
+    assert SliceDefinition("s", "source").keys(references, predictions, indices) == ["acibench", "acibench", "primock57"]
+    assert SliceDefinition("t", "field", "order_type").keys(references, predictions, indices) == ["lab", "imaging", "missing"]
+    assert SliceDefinition("n", "encounter_size").keys(references, predictions, indices) == ["1-2", "1-2", "1-2"]
+
+
+def test_invalid_slices_are_rejected():
+    with pytest.raises(ValueError):
+        SliceDefinition("s", "speaker")
+    with pytest.raises(ValueError):
+        SliceDefinition("t", "field")
+
+
+def test_slice_metrics_match_a_run_on_the_slice(truth, predictions):
+    evaluator = build_evaluator(truth, slices=DEFAULT_SLICES)
+    slices = evaluator.score(predictions).metrics["slices"]
+    references, hyps, indices = evaluator.pairing.get_pairings(transpose=True)
+    manager = build_evaluator(truth).manager
+    for name, definition in evaluator.manager.slices.items():
+        keys = definition.keys(references, hyps, indices)
+        for key in set(keys):
+            positions = [i for i, k in enumerate(keys) if k == key]
+            expected = manager.process(
+                [references[i] for i in positions], [hyps[i] for i in positions], [indices[i] for i in positions]
+            )
+            for field in ("description", "order_type", "order_level_metrics", "encounter_level_metrics"):
+                for metric, value in expected[field].items():
+                    assert slices[f"{name}={key}/{field}/{metric}"] == pytest.approx(value)
@@ -0,0 +1,37 @@
+import pytest
+
+from evaluate_oe import build_evaluator
+from evaluator import flatten_scores
+
+
+def split_below(accumulator, threshold):
+    """Pairs of a run where pairs scoring below `threshold` are left unpaired."""
+    references, predictions, indices = [], [], []
+    for p in accumulator:
+        if p["ref"] is not None and p["hyp"] is not None and p["score"] < threshold:
+            references.extend([p["ref"], None])
+            predictions.extend([None, p["hyp"]])
+            indices.extend([p["index"], p["index"]])
+        else:
+            references.append(p["ref"])
+            predictions.append(p["hyp"])
+            indices.append(p["index"])
+    return references, predictions, indices
+
+
+def test_sweep_matches_a_recompute_at_each_threshold(truth, predictions):
+    evaluator = build_evaluator(truth, extra_metrics=True)
+    evaluator.score(predictions)
+    accumulator = evaluator.pairing.get_pairings_accumulator()
+    thresholds = [0.0, 0.3, 0.5, 0.8, 1.0]
+    curve = evaluator.manager.sweep(
+        [p["ref"] for p in accumulator], [p["hyp"] for p in accumulator], [p["index"] for p in accumulator],
+        [p["score"] for p in accumulator], thresholds
+    )
+    assert [c["threshold"] for c in curve] == thresholds
+
+    recompute = build_evaluator(truth, extra_metrics=True)
+    for entry in curve:
+        expected = flatten_scores(recompute.manager.process(*split_below(accumulator, entry["threshold"])))
+        assert flatten_scores(entry["metrics"]) == pytest.approx(expected)
+    assert curve[0]["num_pairs"] >= curve[-1]["num_pairs"]